@@ -6,12 +6,17 @@ __version__ = "0.1.0"
 
 # Экспортируем основные классы и функции
 from .scraper.scraper import AvitoScraper, scrape
+from .scraper.runner import scrape_categories
 from .client.sql.SQLight import DatabaseClient
+from .client.sql.storage import StorageClient, create_storage_client
 
 __all__ = [
     "AvitoScraper",
     "scrape",
+    "scrape_categories",
     "DatabaseClient",
+    "StorageClient",
+    "create_storage_client",
 ]
 
 
@@ -0,0 +1,16 @@
+"""
+Конфигурация для модуля archive (сжатый архив сырых HTML-страниц)
+"""
+
+import os
+
+# Корень архива: blobs/<2 символа хеша>/<хеш>.<кодек> и index.db
+DEFAULT_ARCHIVE_DIR = "data/archive"
+
+# Кодек сжатия: "zstd" (нужен пакет zstandard) или "gzip"; при отсутствии zstandard используется gzip
+DEFAULT_CODEC = os.environ.get("AVITO_ARCHIVE_CODEC", "zstd")
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+# Политика хранения по умолчанию: сколько последних запусков каждой категории оставлять
+DEFAULT_KEEP_RUNS = 30
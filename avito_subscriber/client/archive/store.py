@@ -0,0 +1,254 @@
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from .config import DEFAULT_ARCHIVE_DIR, DEFAULT_CODEC, ZSTD_LEVEL, GZIP_LEVEL, DEFAULT_KEEP_RUNS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# RawPageStore - архив сырых HTML-страниц: сжатые блобы, адресуемые хешем содержимого, и индекс
+# -- put_page - сохраняет страницу запуска (одинаковые страницы хранятся один раз)
+# -- get_page - читает страницу по (run, category, page)
+# -- list_pages - номера страниц запуска категории
+# -- list_runs - запуски в архиве (run, category)
+# -- import_directory - переносит директорию data/raw/<run>_<category> в архив
+# -- apply_retention - удаляет из индекса старые запуски
+# -- compact - удаляет блобы без ссылок из индекса
+# -- get_stats - объем архива и коэффициент дедупликации/сжатия
+
+INDEX_DDL = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    run TEXT NOT NULL,
+    category TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run, category, page)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages(hash);
+CREATE INDEX IF NOT EXISTS idx_pages_category_run ON pages(category, run);
+"""
+
+CODEC_EXTENSIONS = {"zstd": "zst", "gzip": "gz"}
+RAW_DIR_PATTERN = re.compile(r'^(\d{8}_\d{6})_(.+)$')
+PAGE_FILE_PATTERN = re.compile(r'^items_page_(\d+)\.html$')
+
+
+def resolve_codec(codec: str = DEFAULT_CODEC) -> str:
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError(f"Неизвестный кодек: {codec}. Доступны: {', '.join(CODEC_EXTENSIONS)}")
+    if codec == "zstd" and zstandard is None:
+        return "gzip"
+    return codec
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Блоб сжат zstd, но пакет zstandard не установлен")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class RawPageStore:
+
+    def __init__(self, base_dir: str = DEFAULT_ARCHIVE_DIR, codec: str = DEFAULT_CODEC):
+        self.base_dir = base_dir
+        self.codec = resolve_codec(codec)
+        os.makedirs(os.path.join(base_dir, "blobs"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(base_dir, "index.db"), timeout=30.0, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(INDEX_DDL)
+
+    def _blob_path(self, content_hash: str, codec: str) -> str:
+        return os.path.join(self.base_dir, "blobs", content_hash[:2], f"{content_hash}.{CODEC_EXTENSIONS[codec]}")
+
+    #  ---------WRITE---------------
+    def put_page(self, run: str, category: str, page: int, html: str) -> str:
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+
+        known = self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if not known:
+            blob_path = self._blob_path(content_hash, self.codec)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            compressed = compress(data, self.codec)
+            # Пишем во временный файл и переименовываем: читатель никогда не увидит недописанный блоб
+            tmp_path = f"{blob_path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, blob_path)
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blobs (hash, codec, size, stored_size) VALUES (?, ?, ?, ?)",
+                (content_hash, self.codec, len(data), len(compressed)),
+            )
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (run, category, page, hash) VALUES (?, ?, ?, ?)",
+            (run, category, page, content_hash),
+        )
+        self.conn.commit()
+        return content_hash
+
+    def import_directory(self, data_dir: str) -> int:
+        match = RAW_DIR_PATTERN.match(os.path.basename(os.path.normpath(data_dir)))
+        if not match:
+            raise ValueError(f"Имя директории не похоже на <YYYYmmdd_HHMMSS>_<категория>: {data_dir}")
+        run, category = match.groups()
+
+        imported = 0
+        for html_file in sorted(os.listdir(data_dir)):
+            page_match = PAGE_FILE_PATTERN.match(html_file)
+            if not page_match:
+                continue
+            try:
+                with open(os.path.join(data_dir, html_file), "r", encoding="utf-8") as f:
+                    self.put_page(run, category, int(page_match.group(1)), f.read())
+            except UnicodeDecodeError as e:
+                print(f"Пропущен файл {html_file}: не UTF-8 ({e})")
+                continue
+            imported += 1
+        print(f"Импортировано {imported} страниц из {data_dir} (run={run}, category={category})")
+        return imported
+
+    #  ---------READ---------------
+    def get_page(self, run: str, category: str, page: int) -> str:
+        row = self.conn.execute(
+            "SELECT b.hash, b.codec FROM pages p JOIN blobs b ON b.hash = p.hash "
+            "WHERE p.run = ? AND p.category = ? AND p.page = ?",
+            (run, category, page),
+        ).fetchone()
+        if not row:
+            raise FileNotFoundError(f"Страница {page} запуска {run}_{category} не найдена в архиве {self.base_dir}")
+        with open(self._blob_path(*row), "rb") as f:
+            return decompress(f.read(), row[1]).decode("utf-8")
+
+    def list_pages(self, run: str, category: str) -> List[int]:
+        rows = self.conn.execute(
+            "SELECT page FROM pages WHERE run = ? AND category = ? ORDER BY page", (run, category)
+        )
+        return [row[0] for row in rows]
+
+    def list_runs(self, category: Optional[str] = None) -> List[Tuple[str, str]]:
+        sql = "SELECT DISTINCT run, category FROM pages"
+        params: tuple = ()
+        if category:
+            sql += " WHERE category = ?"
+            params = (category,)
+        return [tuple(row) for row in self.conn.execute(sql + " ORDER BY run, category", params)]
+
+    def iter_pages(self, run: str, category: str) -> Iterator[Tuple[int, str]]:
+        for page in self.list_pages(run, category):
+            yield page, self.get_page(run, category, page)
+
+    #  ---------RETENTION---------------
+    def apply_retention(self, keep_runs: int = DEFAULT_KEEP_RUNS, older_than_days: Optional[int] = None) -> int:
+        """Оставляет keep_runs последних запусков каждой категории и (опционально) удаляет запуски старше N дней."""
+        removed = 0
+        categories = [row[0] for row in self.conn.execute("SELECT DISTINCT category FROM pages")]
+        for category in categories:
+            runs = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT run FROM pages WHERE category = ? ORDER BY run DESC", (category,)
+            )]
+            expired = set(runs[keep_runs:])
+            if older_than_days is not None:
+                threshold = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y%m%d_%H%M%S")
+                expired.update(run for run in runs if run < threshold)
+            for run in expired:
+                removed += self.conn.execute(
+                    "DELETE FROM pages WHERE run = ? AND category = ?", (run, category)
+                ).rowcount
+        self.conn.commit()
+        print(f"Удалено из индекса {removed} страниц")
+        return removed
+
+    def compact(self) -> int:
+        orphans = self.conn.execute(
+            "SELECT hash, codec FROM blobs WHERE hash NOT IN (SELECT DISTINCT hash FROM pages)"
+        ).fetchall()
+        for content_hash, codec in orphans:
+            try:
+                os.remove(self._blob_path(content_hash, codec))
+            except FileNotFoundError:
+                pass
+        self.conn.executemany("DELETE FROM blobs WHERE hash = ?", [(row[0],) for row in orphans])
+        self.conn.commit()
+        self.conn.execute("VACUUM")
+        print(f"Удалено {len(orphans)} блобов без ссылок")
+        return len(orphans)
+
+    def get_stats(self) -> dict:
+        pages, logical_size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM pages p JOIN blobs b ON b.hash = p.hash"
+        ).fetchone()
+        blobs, unique_size, stored_size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+        ).fetchone()
+        return {
+            'pages': pages,
+            'blobs': blobs,
+            'runs': len(self.list_runs()),
+            'logical_bytes': logical_size,
+            'unique_bytes': unique_size,
+            'stored_bytes': stored_size,
+            'ratio': logical_size / stored_size if stored_size else 0.0,
+        }
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Архив сырых HTML-страниц Avito")
+    arg_parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR)
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Размер архива и степень сжатия")
+    import_parser = commands.add_parser("import", help="Перенести директории data/raw/<run>_<категория> в архив")
+    import_parser.add_argument("dirs", nargs="+")
+    retain_parser = commands.add_parser("retain", help="Удалить старые запуски из индекса")
+    retain_parser.add_argument("--keep", type=int, default=DEFAULT_KEEP_RUNS, help="Сколько последних запусков категории оставить")
+    retain_parser.add_argument("--older-than-days", type=int, default=None)
+    commands.add_parser("compact", help="Удалить блобы, на которые не ссылается индекс")
+    args = arg_parser.parse_args()
+
+    with RawPageStore(args.archive_dir) as store:
+        if args.command == "import":
+            for data_dir in args.dirs:
+                store.import_directory(data_dir)
+        elif args.command == "retain":
+            store.apply_retention(args.keep, args.older_than_days)
+        elif args.command == "compact":
+            store.compact()
+        print(store.get_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import asyncio
+import itertools
+import json
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from .config import (
+    CHROME_BINARY, CHROME_CANDIDATES, CDP_ENDPOINT, CHROME_ARGS, USER_AGENT, IMAGE_URL_PATTERNS,
+    LAUNCH_TIMEOUT, COMMAND_TIMEOUT, NAVIGATION_TIMEOUT,
+)
+from ..selenium.config import RESOURCE_BLOCKING_PROFILES, DEFAULT_BLOCKING_PROFILE
+
+# find_chrome_binary - путь к Chrome/Chromium для локального запуска
+# CDPBrowser - асинхронный клиент Chrome DevTools Protocol: одно websocket-соединение на браузер, вкладки - сессии в нем
+# -- start - запускает локальный браузер (или подключается к endpoint) и читает ответы в фоновой задаче
+# -- send - отправляет команду (в браузер или в сессию вкладки) и ждет ответ
+# -- wait_for_event - future, который завершится при следующем событии method в сессии
+# -- new_tab - открывает вкладку с настройками блокировки ресурсов профиля
+# -- close - закрывает вкладки, соединение и запущенный браузер
+# CDPTab - вкладка браузера, аналог SeleniumParser для asyncio
+# -- goto - переходит на URL и ждет DOMContentLoaded/load (по page_load_strategy профиля)
+# -- execute_script / execute_async_script - те же скрипты, что и в WebDriver (arguments, done-колбэк)
+# -- title - заголовок страницы (проверка страницы блокировки)
+
+WS_URL_PATTERN = re.compile(r"DevTools listening on (ws://\S+)")
+
+
+class CDPError(Exception):
+    pass
+
+
+def find_chrome_binary() -> Optional[str]:
+    if CHROME_BINARY:
+        return CHROME_BINARY
+    for candidate in CHROME_CANDIDATES:
+        path = shutil.which(candidate)
+        if path:
+            return path
+    return None
+
+
+class CDPBrowser:
+
+    def __init__(self, endpoint: str = CDP_ENDPOINT, blocking_profile: str = DEFAULT_BLOCKING_PROFILE,
+                 command_timeout: float = COMMAND_TIMEOUT):
+        if websockets is None:
+            raise ImportError("Для CDP-клиента нужен websockets: pip install 'avito-subscriber[async]'")
+        if blocking_profile not in RESOURCE_BLOCKING_PROFILES:
+            raise ValueError(f"Неизвестный профиль блокировки: {blocking_profile}. Доступны: {', '.join(RESOURCE_BLOCKING_PROFILES)}")
+        self.endpoint = endpoint # None - запустить локальный браузер
+        self.blocking_profile = blocking_profile
+        self.command_timeout = command_timeout
+        self.process = None
+        self.user_data_dir = None
+        self.ws = None
+        self.tabs: List["CDPTab"] = []
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._waiters: Dict[tuple, List[asyncio.Future]] = defaultdict(list)
+        self._reader = None
+
+    async def start(self) -> "CDPBrowser":
+        endpoint = self.endpoint or await self._launch()
+        self.ws = await websockets.connect(endpoint, max_size=None, ping_interval=None)
+        self._reader = asyncio.create_task(self._read_loop())
+        print(f"CDP: подключение к браузеру {endpoint}")
+        return self
+
+    async def _launch(self) -> str:
+        binary = find_chrome_binary()
+        if not binary:
+            raise CDPError("Chrome/Chromium не найден: задайте AVITO_CHROME_BINARY или AVITO_CDP_ENDPOINT")
+        self.user_data_dir = tempfile.mkdtemp(prefix="avito_cdp_")
+        self.process = await asyncio.create_subprocess_exec(
+            binary, *CHROME_ARGS, f"--user-data-dir={self.user_data_dir}", "about:blank",
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+        )
+
+        # Адрес DevTools браузер печатает в stderr после старта (порт выбирается сам: --remote-debugging-port=0)
+        async def read_endpoint() -> str:
+            while True:
+                line = await self.process.stderr.readline()
+                if not line:
+                    raise CDPError("браузер завершился до открытия DevTools")
+                match = WS_URL_PATTERN.search(line.decode(errors="replace"))
+                if match:
+                    return match.group(1)
+
+        endpoint = await asyncio.wait_for(read_endpoint(), LAUNCH_TIMEOUT)
+        # stderr дальше не читается: без этого буфер канала заполнится и браузер встанет
+        asyncio.create_task(self._drain_stderr())
+        return endpoint
+
+    async def _drain_stderr(self):
+        while self.process and await self.process.stderr.read(65536):
+            pass
+
+    async def _read_loop(self):
+        try:
+            async for message in self.ws:
+                data = json.loads(message)
+                if "id" in data:
+                    future = self._pending.pop(data["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in data:
+                        future.set_exception(CDPError(data["error"].get("message", str(data["error"]))))
+                    else:
+                        future.set_result(data.get("result", {}))
+                    continue
+                for future in self._waiters.pop((data.get("sessionId"), data.get("method")), []):
+                    if not future.done():
+                        future.set_result(data.get("params", {}))
+        except Exception as e:
+            print(f"CDP: соединение прервано: {e}")
+        finally:
+            error = CDPError("соединение с браузером закрыто")
+            for future in [*self._pending.values(), *(f for waiters in self._waiters.values() for f in waiters)]:
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            self._waiters.clear()
+
+    async def send(self, method: str, params: dict = None, session_id: str = None, timeout: float = None) -> dict:
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self.ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout or self.command_timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def wait_for_event(self, method: str, session_id: str = None) -> asyncio.Future:
+        # Подписка до отправки команды, иначе быстрое событие может прийти раньше ожидания
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[(session_id, method)].append(future)
+        return future
+
+    async def new_tab(self) -> "CDPTab":
+        target = await self.send("Target.createTarget", {"url": "about:blank"})
+        attached = await self.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+        tab = CDPTab(self, target["targetId"], attached["sessionId"], RESOURCE_BLOCKING_PROFILES[self.blocking_profile])
+        await tab.setup()
+        self.tabs.append(tab)
+        return tab
+
+    async def close(self):
+        for tab in list(self.tabs):
+            try:
+                await tab.close()
+            except Exception:
+                pass
+        if self.process:
+            try:
+                await self.send("Browser.close", timeout=5)
+            except Exception:
+                pass
+        if self.ws:
+            await self.ws.close()
+        if self._reader:
+            await self._reader
+        if self.process:
+            try:
+                await asyncio.wait_for(self.process.wait(), 10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+            self.process = None
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+        print("CDP: браузер закрыт")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class CDPTab:
+
+    def __init__(self, browser: CDPBrowser, target_id: str, session_id: str, profile: dict):
+        self.browser = browser
+        self.target_id = target_id
+        self.session_id = session_id
+        self.profile = profile
+        self.pages_loaded = 0
+
+    async def send(self, method: str, params: dict = None, timeout: float = None) -> dict:
+        return await self.browser.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    async def setup(self):
+        await self.send("Page.enable")
+        await self.send("Network.enable")
+        await self.send("Network.setUserAgentOverride", {"userAgent": USER_AGENT})
+        blocked_urls = list(self.profile["blocked_urls"])
+        if self.profile["prefs"].get("profile.managed_default_content_settings.images") == 2:
+            blocked_urls += IMAGE_URL_PATTERNS
+        if blocked_urls:
+            await self.send("Network.setBlockedURLs", {"urls": blocked_urls})
+
+    async def goto(self, url: str, timeout: float = NAVIGATION_TIMEOUT):
+        # "eager" как в WebDriver: не ждем картинки и iframe, только DOMContentLoaded
+        event = "Page.domContentEventFired" if self.profile["page_load_strategy"] == "eager" else "Page.loadEventFired"
+        loaded = self.browser.wait_for_event(event, self.session_id)
+        try:
+            result = await self.send("Page.navigate", {"url": url})
+            if result.get("errorText"):
+                raise CDPError(f"{url}: {result['errorText']}")
+            await asyncio.wait_for(loaded, timeout)
+        finally:
+            loaded.cancel()
+        self.pages_loaded += 1
+
+    async def evaluate(self, expression: str, await_promise: bool = False, timeout: float = None) -> Any:
+        result = await self.send(
+            "Runtime.evaluate",
+            {"expression": expression, "returnByValue": True, "awaitPromise": await_promise},
+            timeout=timeout,
+        )
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CDPError(details.get("exception", {}).get("description") or details.get("text", "ошибка скрипта"))
+        return result.get("result", {}).get("value")
+
+    async def execute_script(self, script: str, *args) -> Any:
+        # Тело скрипта WebDriver: return ... и arguments[i]
+        return await self.evaluate(f"(function() {{ {script} }}).apply(null, {json.dumps(list(args))})")
+
+    async def execute_async_script(self, script: str, *args, timeout: float = None) -> Any:
+        # Асинхронный скрипт WebDriver: последний аргумент - колбэк завершения
+        expression = f"new Promise((done) => (function() {{ {script} }}).apply(null, [...{json.dumps(list(args))}, done]))"
+        return await asyncio.wait_for(self.evaluate(expression, await_promise=True, timeout=timeout), timeout)
+
+    async def title(self) -> str:
+        try:
+            return await self.evaluate("document.title") or ""
+        except CDPError:
+            return ""
+
+    async def close(self):
+        if self in self.browser.tabs:
+            self.browser.tabs.remove(self)
+            await self.browser.send("Target.closeTarget", {"targetId": self.target_id})
@@ -0,0 +1,30 @@
+"""
+Конфигурация для модуля cdp (асинхронный клиент Chrome DevTools Protocol)
+"""
+
+import os
+
+# Браузер для локального запуска: путь из окружения или первый найденный в PATH
+CHROME_BINARY = os.environ.get("AVITO_CHROME_BINARY")
+CHROME_CANDIDATES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+
+# Готовый браузер с открытым DevTools (ws://host:9222/devtools/browser/<id>) вместо локального запуска
+CDP_ENDPOINT = os.environ.get("AVITO_CDP_ENDPOINT")
+
+CHROME_ARGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--window-size=1920,1080",
+    "--remote-debugging-port=0",
+]
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+
+# Запрет картинок из профиля блокировки переводится в шаблоны Network.setBlockedURLs
+IMAGE_URL_PATTERNS = ["*.jpg", "*.jpeg", "*.png", "*.webp", "*.gif", "*.avif"]
+
+# Таймауты, сек: запуск браузера, ответ на команду, навигация
+LAUNCH_TIMEOUT = 20.0
+COMMAND_TIMEOUT = 30.0
+NAVIGATION_TIMEOUT = 30.0
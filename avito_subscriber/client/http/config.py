@@ -0,0 +1,30 @@
+"""
+Конфигурация для модуля http (пул соединений requests для загрузки страниц без браузера)
+"""
+
+import os
+
+# Соединений в пуле на хост: keep-alive переиспользует TCP/TLS между страницами
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# Повторы на сетевых ошибках и ответах RETRY_STATUSES: пауза backoff_factor * 2^(n-1) сек, Retry-After учитывается
+# 429 не повторяется: повторы только снова упираются в ограничение, скрейпер сразу переходит в браузер (CHALLENGE_STATUSES)
+RETRIES = 3
+BACKOFF_FACTOR = 1.0
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Таймауты, сек: соединение, чтение ответа
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 20.0
+
+# Заголовки как у браузера Selenium: сервер отдает ту же разметку, что и Chrome
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# Cookies сессии между запусками (по категории), None - не сохранять
+COOKIES_DIR = os.environ.get("AVITO_HTTP_COOKIES_DIR", "data/cookies")
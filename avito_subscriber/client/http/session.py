@@ -0,0 +1,101 @@
+import json
+import os
+import time
+from typing import Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import (
+    POOL_CONNECTIONS, POOL_MAXSIZE, RETRIES, BACKOFF_FACTOR, RETRY_STATUSES, CONNECT_TIMEOUT, READ_TIMEOUT, HEADERS,
+    COOKIES_DIR,
+)
+
+# HttpClient - загрузка страниц без браузера: один requests.Session с пулом keep-alive соединений
+# -- get - GET с повторами и экспоненциальной паузой (urllib3 Retry), ответ распаковывается из gzip автоматически
+# -- set_cookies - переносит cookies (например, из браузера после страницы проверки) в сессию
+# -- load_cookies / save_cookies - cookies сессии между запусками
+# -- get_metrics - запросы, повторы, объем и время ответов
+
+
+class PageRetry(Retry):
+    # По умолчанию urllib3 повторяет 429 с Retry-After даже вне status_forcelist: ограничение частоты
+    # не повторяем, его обрабатывает скрейпер (переход в браузер)
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+
+class HttpClient:
+
+    def __init__(self, cookies_name: str = None, cookies_dir: str = COOKIES_DIR, retries: int = RETRIES,
+                 backoff_factor: float = BACKOFF_FACTOR, headers: Dict[str, str] = None):
+        self.session = requests.Session()
+        self.session.headers.update({**HEADERS, **(headers or {})})
+        retry = PageRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False, # после исчерпания повторов отдаем последний ответ, статус проверяет вызывающий
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.cookies_path = os.path.join(cookies_dir, f"{cookies_name}.json") if cookies_name and cookies_dir else None
+        self.metrics = {"requests": 0, "retries": 0, "bytes": 0, "wire_bytes": 0, "elapsed": 0.0}
+        self.load_cookies()
+
+    def get(self, url: str, timeout: tuple = (CONNECT_TIMEOUT, READ_TIMEOUT)) -> requests.Response:
+        started = time.perf_counter()
+        response = self.session.get(url, timeout=timeout)
+        self.metrics["requests"] += 1
+        self.metrics["elapsed"] += time.perf_counter() - started
+        self.metrics["bytes"] += len(response.content)
+        # Content-Length у сжатого ответа - размер до распаковки
+        self.metrics["wire_bytes"] += int(response.headers.get("Content-Length") or len(response.content))
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None:
+            self.metrics["retries"] += len(retries.history)
+        return response
+
+    def set_cookies(self, cookies: List[dict]):
+        # Формат driver.get_cookies() и save_cookies: name, value, domain, path
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    def load_cookies(self):
+        if not self.cookies_path or not os.path.exists(self.cookies_path):
+            return
+        try:
+            with open(self.cookies_path, "r", encoding="utf-8") as f:
+                self.set_cookies(json.load(f))
+        except Exception as e:
+            print(f"Не удалось загрузить cookies {self.cookies_path}: {e}")
+
+    def save_cookies(self):
+        if not self.cookies_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cookies_path), exist_ok=True)
+            with open(self.cookies_path, "w", encoding="utf-8") as f:
+                json.dump([
+                    {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                    for c in self.session.cookies
+                ], f)
+        except Exception as e:
+            print(f"Ошибка при сохранении cookies: {e}")
+
+    def get_metrics(self) -> dict:
+        return dict(self.metrics)
+
+    def close(self):
+        self.save_cookies()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Замер трафика и времени загрузки страницы с разными профилями блокировки ресурсов.
+
+Запуск (нужен Chrome или Selenium Grid):
+    python -m avito_subscriber.client.selenium.bench_blocking [url] [повторов] [selenium_grid_url]
+"""
+
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+from .selenium import SeleniumParser
+from .config import RESOURCE_BLOCKING_PROFILES
+from avito_subscriber.scraper.config import SCRAPING_URLS, ITEMS_CONTAINER_SELECTOR, WAIT_TIME
+
+
+def measure_profile(profile: str, url: str, repeats: int, remote_selenium_url: str = None) -> dict:
+    samples = []
+    with SeleniumParser(remote_selenium_url=remote_selenium_url, blocking_profile=profile) as parser:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            parser.go_to_page(url)
+            parser.wait_for_element(By.CSS_SELECTOR, ITEMS_CONTAINER_SELECTOR, timeout=WAIT_TIME)
+            elapsed = time.perf_counter() - started
+            metrics = parser.get_page_metrics()
+            metrics['elapsed'] = elapsed
+            samples.append(metrics)
+
+    return {
+        key: sum(sample[key] for sample in samples) / len(samples)
+        for key in ('bytes', 'requests', 'dom_content_loaded_ms', 'elapsed')
+    }
+
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else SCRAPING_URLS["macbook_pro"]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    remote_selenium_url = sys.argv[3] if len(sys.argv) > 3 else None
+
+    results = {profile: measure_profile(profile, url, repeats, remote_selenium_url) for profile in RESOURCE_BLOCKING_PROFILES}
+
+    print(f"\nURL: {url}, повторов: {repeats}")
+    for profile, result in results.items():
+        print(
+            f"{profile:<6} {result['bytes'] / 1024:9.0f} КБ  {result['requests']:6.0f} запросов  "
+            f"DOMContentLoaded {result['dom_content_loaded_ms']:7.0f} мс  страница готова за {result['elapsed']:5.2f} сек"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Конфигурация для модуля selenium
+"""
+
+import os
+
+# Профили блокировки ресурсов браузера:
+#   prefs - настройки профиля Chrome (2 = запретить),
+#   blocked_urls - шаблоны для CDP Network.setBlockedURLs (шрифты, аналитика),
+#   page_load_strategy - "eager" не ждет картинки/iframe, driver.get возвращается после DOMContentLoaded.
+# src у <img> остается в DOM, поэтому парсер по-прежнему извлекает ссылки на изображения.
+RESOURCE_BLOCKING_PROFILES = {
+    "off": {
+        "prefs": {},
+        "blocked_urls": [],
+        "page_load_strategy": "normal",
+    },
+    "lite": {
+        "prefs": {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+            "profile.default_content_setting_values.geolocation": 2,
+        },
+        "blocked_urls": [
+            "*.woff", "*.woff2", "*.ttf", "*.otf",
+            "*.mp4", "*.webm",
+            "*mc.yandex.ru*", "*yandex.ru/metrika*", "*an.yandex.ru*",
+            "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+            "*top-fwz1.mail.ru*", "*vk.com/rtrg*", "*criteo*", "*adfox*",
+        ],
+        "page_load_strategy": "eager",
+    },
+}
+DEFAULT_BLOCKING_PROFILE = os.environ.get("AVITO_BLOCKING_PROFILE", "lite")
+
+# Несколько вкладок в одной сессии (SeleniumParser.load_pages): без этих флагов Chrome замедляет фоновые вкладки
+BACKGROUND_TAB_OPTIONS = [
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+]
+# Пауза между обходами вкладок, сек
+TAB_POLL_INTERVAL = 0.1
+
+# Темп запросов и ожидание готовности страницы (см. pacing.Pacer)
+PACING_SETTINGS = {
+    "default_timeout": 15.0,      # таймаут готовности, пока задержка категории не выучена
+    "min_timeout": 5.0,
+    "max_timeout": 30.0,
+    "timeout_deviations": 4.0,    # таймаут = среднее + k * стандартное отклонение
+    "latency_alpha": 0.3,         # вес нового замера в EWMA
+    "quiet_ms": 300,              # сколько DOM списка должен не меняться, чтобы считаться готовым
+    "requests_per_minute": 20,
+    "jitter": 0.5,                # интервал * uniform(1 - jitter, 1 + jitter)
+    "block_backoff": 2.0,
+    "max_backoff": 8.0,
+    "recovery": 0.9,
+}
+
+# Признаки страницы блокировки в заголовке
+BLOCK_PAGE_MARKERS = ("Доступ ограничен", "Подтвердите, что вы не робот")
+
+# Выученные задержки по категориям и метрики запусков для настройки темпа
+PACING_STATE_DIR = "data/pacing"
+PACING_METRICS_FILE = "data/metrics/pacing.jsonl"
@@ -0,0 +1,190 @@
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime
+
+from selenium.common.exceptions import TimeoutException
+
+from .config import PACING_SETTINGS, BLOCK_PAGE_MARKERS, PACING_STATE_DIR, PACING_METRICS_FILE
+
+# Pacer - темп и ожидания для одной категории
+# -- throttle - выдерживает паузу перед запросом страницы по бюджету запросов с джиттером
+# -- next_delay - резервирует следующий слот бюджета и возвращает паузу до него (для asyncio.sleep)
+# -- wait_until_ready - ждет готовности списка объявлений (MutationObserver: DOM перестал меняться)
+# -- record_readiness - учитывает результат ожидания готовности, полученный не через WebDriver (CDP)
+# -- readiness_timeout - таймаут ожидания по выученной задержке готовности категории
+# -- get_metrics - метрики темпа: пропускная способность, доля блокировок, задержки
+# -- save - сохраняет выученную задержку и дописывает метрики запуска для настройки
+
+# Ждем появления контейнера, затем тишины в его поддереве quiet_ms миллисекунд
+READINESS_SCRIPT = """
+const [containerSelector, itemSelector, quietMs, done] = arguments;
+const started = performance.now();
+let observer = null, quietTimer = null, poll = null;
+const finish = () => {
+    if (observer) observer.disconnect();
+    clearInterval(poll);
+    done({items: document.querySelectorAll(itemSelector).length, waited_ms: performance.now() - started});
+};
+const arm = () => { clearTimeout(quietTimer); quietTimer = setTimeout(finish, quietMs); };
+const attach = () => {
+    const container = document.querySelector(containerSelector);
+    if (!container) return false;
+    observer = new MutationObserver(arm);
+    observer.observe(container, {childList: true, subtree: true});
+    arm();
+    return true;
+};
+if (!attach()) { poll = setInterval(() => { if (attach()) clearInterval(poll); }, 50); }
+"""
+
+
+def is_block_title(title: str) -> bool:
+    return any(marker in (title or "") for marker in BLOCK_PAGE_MARKERS)
+
+
+class Pacer:
+
+    def __init__(self, category: str, default_timeout: float = PACING_SETTINGS["default_timeout"], settings: dict = None,
+                 state_dir: str = PACING_STATE_DIR):
+        self.category = category
+        self.settings = {**PACING_SETTINGS, **(settings or {})}
+        self.default_timeout = default_timeout
+        self.state_path = os.path.join(state_dir, f"{category}.json")
+
+        # Выученная задержка готовности (EWMA среднего и дисперсии, сек)
+        self.latency_mean = None
+        self.latency_var = 0.0
+        self.interval_multiplier = 1.0 # растет при блокировках, возвращается к 1 при успехах
+        self._load_state()
+
+        self.last_request_at = None
+        self.started_at = time.monotonic()
+        self.metrics = {"pages": 0, "ready": 0, "timeouts": 0, "blocked": 0, "delay_total": 0.0, "wait_total": 0.0}
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.latency_mean = state.get("latency_mean")
+            self.latency_var = state.get("latency_var", 0.0)
+            self.interval_multiplier = state.get("interval_multiplier", 1.0)
+        except Exception as e:
+            print(f"Не удалось загрузить состояние темпа {self.state_path}: {e}")
+
+    def readiness_timeout(self) -> float:
+        if self.latency_mean is None:
+            return self.default_timeout
+        timeout = self.latency_mean + self.settings["timeout_deviations"] * math.sqrt(self.latency_var)
+        return min(max(timeout, self.settings["min_timeout"]), self.settings["max_timeout"])
+
+    def _observe_latency(self, seconds: float):
+        alpha = self.settings["latency_alpha"]
+        if self.latency_mean is None:
+            self.latency_mean = seconds
+            return
+        diff = seconds - self.latency_mean
+        self.latency_mean += alpha * diff
+        self.latency_var = (1 - alpha) * (self.latency_var + alpha * diff * diff)
+
+    def next_delay(self) -> float:
+        # Минимальный интервал между запросами из бюджета requests_per_minute, каждый раз со своим джиттером.
+        # Слот резервируется сразу: параллельные запросы одной категории выстраиваются друг за другом
+        interval = 60.0 / self.settings["requests_per_minute"] * self.interval_multiplier
+        jitter = self.settings["jitter"]
+        target = interval * random.uniform(1 - jitter, 1 + jitter)
+        now = time.monotonic()
+        delay = 0.0 if self.last_request_at is None else max(0.0, self.last_request_at + target - now)
+        self.metrics["delay_total"] += delay
+        self.last_request_at = now + delay
+        return delay
+
+    def throttle(self):
+        delay = self.next_delay()
+        if delay:
+            print(f"Пауза перед запросом: {delay:.2f} сек")
+            time.sleep(delay)
+
+    def is_blocked(self, driver) -> bool:
+        try:
+            title = driver.title or ""
+        except Exception:
+            return False
+        return is_block_title(title)
+
+    def wait_until_ready(self, driver, container_selector: str, item_selector: str, timeout: float = None) -> bool:
+        """
+        Ждет, пока контейнер объявлений появится и его DOM перестанет меняться.
+        Возвращает False по таймауту или на странице блокировки.
+        """
+        timeout = timeout or self.readiness_timeout()
+        started = time.monotonic()
+        # Таймаут скриптов - настройка всей сессии: после ожидания возвращаем прежний, иначе остальные
+        # execute_async_script (извлечение в браузере) унаследуют последний адаптивный таймаут
+        previous_timeout = driver.timeouts.script
+        try:
+            driver.set_script_timeout(timeout)
+            result = driver.execute_async_script(READINESS_SCRIPT, container_selector, item_selector, self.settings["quiet_ms"])
+        except TimeoutException:
+            result = None
+        finally:
+            driver.set_script_timeout(previous_timeout)
+        return self.record_readiness(result, time.monotonic() - started, self.is_blocked(driver), timeout)
+
+    def record_readiness(self, result: dict, waited: float, blocked: bool, timeout: float) -> bool:
+        """result - ответ READINESS_SCRIPT (None по таймауту), blocked - открылась страница блокировки."""
+        self.metrics["pages"] += 1
+        self.metrics["wait_total"] += waited
+
+        if blocked:
+            self.metrics["blocked"] += 1
+            self.interval_multiplier = min(self.interval_multiplier * self.settings["block_backoff"], self.settings["max_backoff"])
+            print(f"Страница блокировки. Интервал между запросами увеличен в {self.interval_multiplier:.1f} раз")
+            return False
+
+        if not result or not result.get("items"):
+            self.metrics["timeouts"] += 1
+            print(f"Объявления не появились за {timeout:.1f} сек")
+            return False
+
+        self.metrics["ready"] += 1
+        self._observe_latency(waited)
+        self.interval_multiplier = max(1.0, self.interval_multiplier * self.settings["recovery"])
+        print(f"Страница готова за {waited:.2f} сек ({result['items']} объявлений), таймаут {timeout:.1f} сек")
+        return True
+
+    def get_metrics(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        pages = self.metrics["pages"]
+        return {
+            "category": self.category,
+            **self.metrics,
+            "elapsed": elapsed,
+            "pages_per_minute": self.metrics["ready"] / elapsed * 60 if elapsed else 0.0,
+            "block_rate": self.metrics["blocked"] / pages if pages else 0.0,
+            "timeout_rate": self.metrics["timeouts"] / pages if pages else 0.0,
+            "latency_mean": self.latency_mean,
+            "latency_std": math.sqrt(self.latency_var),
+            "readiness_timeout": self.readiness_timeout(),
+            "interval_multiplier": self.interval_multiplier,
+        }
+
+    def save(self, metrics_file: str = PACING_METRICS_FILE):
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "latency_mean": self.latency_mean,
+                    "latency_var": self.latency_var,
+                    "interval_multiplier": self.interval_multiplier,
+                }, f)
+
+            os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+            with open(metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"timestamp": datetime.now().isoformat(), **self.get_metrics()}, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"Ошибка при сохранении метрик темпа: {e}")
@@ -0,0 +1,123 @@
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List
+
+from .selenium import SeleniumParser
+from .config import DEFAULT_BLOCKING_PROFILE
+
+# SessionPool - пул прогретых сессий SeleniumParser, переиспользуемых между запусками
+# -- session - выдает сессию на время блока with и возвращает ее в пул
+# -- _acquire - берет свободную живую сессию или создает новую в пределах size
+# -- _release - возвращает сессию в пул либо закрывает ее (сбой, лимит страниц)
+# -- close - закрывает все сессии пула
+# get_session_pool - общий пул процесса для заданных параметров
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_PAGES_PER_SESSION = 200
+
+
+class SessionPool:
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, headless: bool = True, remote_selenium_url: str = None,
+                 max_pages_per_session: int = DEFAULT_MAX_PAGES_PER_SESSION, blocking_profile: str = DEFAULT_BLOCKING_PROFILE,
+                 tabs: int = 1):
+        self.size = size
+        self.headless = headless
+        self.remote_selenium_url = remote_selenium_url
+        self.max_pages_per_session = max_pages_per_session
+        self.blocking_profile = blocking_profile
+        self.tabs = tabs # вкладок на сессию: страницы грузятся параллельно в одном браузере
+        self.idle: List[SeleniumParser] = []
+        self.in_use = 0
+        self.created = 0
+        self.recycled = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def session(self):
+        parser = self._acquire()
+        failed = False
+        try:
+            yield parser
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(parser, failed)
+
+    def _acquire(self) -> SeleniumParser:
+        with self._condition:
+            while not self.idle and self.in_use >= self.size:
+                self._condition.wait()
+
+            while self.idle:
+                parser = self.idle.pop()
+                if parser.is_alive():
+                    self.in_use += 1
+                    return parser
+                print("Сессия WebDriver из пула не отвечает. Пересоздаем.")
+                self._discard(parser)
+
+            self.in_use += 1
+
+        # Создаем браузер вне блокировки: запуск занимает секунды и не должен блокировать другие потоки
+        try:
+            parser = SeleniumParser(headless=self.headless, remote_selenium_url=self.remote_selenium_url,
+                                    blocking_profile=self.blocking_profile, tabs=self.tabs)
+        except Exception:
+            with self._condition:
+                self.in_use -= 1
+                self._condition.notify()
+            raise
+        self.created += 1
+        return parser
+
+    def _release(self, parser: SeleniumParser, failed: bool = False):
+        exhausted = parser.pages_loaded >= self.max_pages_per_session
+        if failed or exhausted or not parser.is_alive():
+            reason = "сбой" if failed else "лимит страниц" if exhausted else "сессия не отвечает"
+            print(f"Сессия WebDriver закрыта ({reason}), загружено страниц: {parser.pages_loaded}")
+            self._discard(parser)
+            parser = None
+
+        with self._condition:
+            self.in_use -= 1
+            if parser is not None:
+                self.idle.append(parser)
+            self._condition.notify()
+
+    def _discard(self, parser: SeleniumParser):
+        self.recycled += 1
+        try:
+            parser.close()
+        except Exception as e:
+            print(f"Ошибка при закрытии сессии WebDriver: {e}")
+
+    def close(self):
+        with self._condition:
+            idle, self.idle = self.idle, []
+        for parser in idle:
+            parser.close()
+
+    def get_stats(self) -> dict:
+        return {
+            'size': self.size,
+            'idle': len(self.idle),
+            'in_use': self.in_use,
+            'created': self.created,
+            'recycled': self.recycled,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@lru_cache(maxsize=None)
+def get_session_pool(size: int = DEFAULT_POOL_SIZE, headless: bool = True, remote_selenium_url: str = None,
+                     max_pages_per_session: int = DEFAULT_MAX_PAGES_PER_SESSION,
+                     blocking_profile: str = DEFAULT_BLOCKING_PROFILE, tabs: int = 1) -> SessionPool:
+    return SessionPool(size, headless, remote_selenium_url, max_pages_per_session, blocking_profile, tabs)
@@ -3,6 +3,8 @@ import random
 import os
 import datetime
 import subprocess
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
@@ -10,17 +12,90 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
+from .config import RESOURCE_BLOCKING_PROFILES, DEFAULT_BLOCKING_PROFILE, BACKGROUND_TAB_OPTIONS, TAB_POLL_INTERVAL
+from .pacing import is_block_title
 
+# discover_local_chrome - находит браузер и ChromeDriver (результат кешируется на процесс)
 # SeleniumParser
 # -- __init__ - инициализирует WebDriver
+# -- execute_cdp - выполняет команду Chrome DevTools Protocol (локально и через Selenium Grid)
+# -- get_page_metrics - возвращает объем трафика и время загрузки текущей страницы
+# -- is_alive - проверяет, что сессия WebDriver жива
 # -- go_to_page - переходит на страницу
 # -- refresh_page - обновляет страницу
 # -- save_html - сохраняет HTML страницы
 # -- wait_for_element - ожидает элемент
+# -- has_element - проверяет наличие элемента без ожидания
 # -- handle_pagination - обрабатывает пагинацию
+# -- open_tabs - открывает вкладки в той же сессии браузера (до count штук)
+# -- load_pages - грузит страницы в нескольких вкладках и отдает их в порядке готовности
+
+# Переход без ожидания загрузки: driver.get заблокировал бы сессию до DOMContentLoaded.
+# Метка остается на старом документе, пока новый не заменит его
+NAVIGATE_SCRIPT = "window.__avitoPending = true; window.location.href = arguments[0];"
+
+# Вкладка, которую больше не ждут: отменить загрузку и оставить пустую страницу
+STOP_TAB_SCRIPT = "window.stop(); window.location.replace('about:blank');"
+
+# Состояние вкладки за один вызов: сменился ли документ, число карточек и сколько мс список не менялся
+TAB_STATE_SCRIPT = """
+const [containerSelector, itemSelector] = arguments;
+if (window.__avitoPending) return {pending: true, title: document.title};
+const container = document.querySelector(containerSelector);
+if (container && !window.__avitoObserver) {
+    window.__avitoLastMutation = performance.now();
+    window.__avitoObserver = new MutationObserver(() => { window.__avitoLastMutation = performance.now(); });
+    window.__avitoObserver.observe(container, {childList: true, subtree: true});
+}
+return {
+    pending: false,
+    title: document.title,
+    items: document.querySelectorAll(itemSelector).length,
+    quiet_ms: container ? performance.now() - window.__avitoLastMutation : 0,
+};
+"""
+
+
+@lru_cache(maxsize=1)
+def discover_local_chrome() -> Tuple[Optional[str], str]:
+    """
+    Ищет браузер и ChromeDriver один раз на процесс: subprocess и webdriver-manager
+    стоят секунды, а результат между запусками не меняется.
+    Возвращает (binary_location или None для google-chrome, путь к chromedriver).
+    """
+    binary_location = None
+    # Диагностика: проверяем наличие Chrome/Chromium
+    try:
+        chrome_version = subprocess.run(['google-chrome', '--version'], capture_output=True, text=True)
+        print(f"Chrome версия: {chrome_version.stdout.strip()}")
+    except FileNotFoundError:
+        try:
+            chromium_version = subprocess.run(['chromium-browser', '--version'], capture_output=True, text=True)
+            print(f"Chromium версия: {chromium_version.stdout.strip()}")
+            binary_location = '/usr/bin/chromium-browser'
+        except FileNotFoundError:
+            print("ВНИМАНИЕ: Ни Google Chrome, ни Chromium не найдены в системе!")
+            print("Установите Chrome: apt-get install -y google-chrome-stable")
+            print("Или Chromium: apt-get install -y chromium-browser")
+    
+    # Попытка использовать системный chromedriver если есть
+    system_chromedriver = '/usr/bin/chromedriver'
+    if os.path.exists(system_chromedriver):
+        print(f"Используем системный ChromeDriver: {system_chromedriver}")
+        driver_path = system_chromedriver
+    else:
+        print("Загружаем ChromeDriver через webdriver-manager...")
+        driver_path = ChromeDriverManager().install()
+
+    return binary_location, driver_path
+
 
 class SeleniumParser:
-    def __init__(self, headless=True, remote_selenium_url=None):
+    def __init__(self, headless=True, remote_selenium_url=None, blocking_profile=DEFAULT_BLOCKING_PROFILE, tabs=1):
+        if blocking_profile not in RESOURCE_BLOCKING_PROFILES:
+            raise ValueError(f"Неизвестный профиль блокировки: {blocking_profile}. Доступны: {', '.join(RESOURCE_BLOCKING_PROFILES)}")
+        profile = RESOURCE_BLOCKING_PROFILES[blocking_profile]
+
         options = webdriver.ChromeOptions()
          
         critical_options = [
@@ -54,6 +129,8 @@ class SeleniumParser:
         ]
 
         chrome_options = critical_options # + stability_options + optimization_options
+        if tabs > 1:
+            chrome_options = chrome_options + BACKGROUND_TAB_OPTIONS
         
         for option in chrome_options:
             options.add_argument(option)
@@ -61,42 +138,71 @@ class SeleniumParser:
         # User agent для избежания блокировки
         options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36')
 
+        # Блокировка ресурсов: prefs и стратегия загрузки задаются до старта браузера
+        options.page_load_strategy = profile["page_load_strategy"]
+        if profile["prefs"]:
+            options.add_experimental_option("prefs", profile["prefs"])
+
+        self.options = options
+        self.remote_selenium_url = remote_selenium_url
+        self.blocking_profile = blocking_profile
+        self.pages_loaded = 0 # счетчик загрузок страниц для пула сессий
+        self.tabs = tabs # вкладок по умолчанию для load_pages
+        self.blocked_urls = profile["blocked_urls"] # Network.setBlockedURLs действует на одну вкладку, повторяется в open_tabs
+        self.driver = self._create_driver(options, remote_selenium_url)
+        self.tab_handles: List[str] = [self.driver.current_window_handle]
+        self._block_urls(self.blocked_urls)
+
+    def execute_cdp(self, cmd: str, params: dict = None):
+        if not hasattr(self.driver, "execute_cdp_cmd"):
+            # webdriver.Remote не знает CDP-команду, но Selenium Grid проксирует ее для Chromium
+            self.driver.command_executor._commands.setdefault(
+                "executeCdpCommand", ("POST", "/session/$sessionId/goog/cdp/execute")
+            )
+            return self.driver.execute("executeCdpCommand", {"cmd": cmd, "params": params or {}})["value"]
+        return self.driver.execute_cdp_cmd(cmd, params or {})
+
+    def _block_urls(self, patterns):
+        if not patterns:
+            return
+        try:
+            self.execute_cdp("Network.enable")
+            self.execute_cdp("Network.setBlockedURLs", {"urls": list(patterns)})
+            print(f"Блокировка ресурсов ({self.blocking_profile}): {len(patterns)} шаблонов URL")
+        except Exception as e:
+            print(f"Предупреждение: не удалось включить блокировку URL через CDP: {e}")
+
+    def get_page_metrics(self) -> dict:
+        """Объем переданных данных и время загрузки текущей страницы по Performance API."""
+        return self.driver.execute_script("""
+            const nav = performance.getEntriesByType('navigation')[0] || {};
+            const resources = performance.getEntriesByType('resource');
+            const bytes = resources.reduce((sum, r) => sum + (r.transferSize || 0), nav.transferSize || 0);
+            return {
+                bytes: bytes,
+                requests: resources.length + 1,
+                dom_content_loaded_ms: nav.domContentLoadedEventEnd || 0,
+                load_ms: nav.loadEventEnd || nav.duration || 0,
+            };
+        """)
+
+    @staticmethod
+    def _create_driver(options, remote_selenium_url=None):
         try:
             if remote_selenium_url:
                 # Используем удаленный Selenium Grid
                 print(f"Подключение к удаленному Selenium: {remote_selenium_url}")
-                self.driver = webdriver.Remote(command_executor=remote_selenium_url, options=options)
+                driver = webdriver.Remote(command_executor=remote_selenium_url, options=options)
                 print("WebDriver успешно подключен к удаленному Selenium Grid.")
             else:
-                # Локальная инициализация (оригинальный код)
-                # Диагностика: проверяем наличие Chrome/Chromium
-                chrome_found = False
-                try:
-                    chrome_version = subprocess.run(['google-chrome', '--version'], capture_output=True, text=True)
-                    print(f"Chrome версия: {chrome_version.stdout.strip()}")
-                    chrome_found = True
-                except FileNotFoundError:
-                    try:
-                        chromium_version = subprocess.run(['chromium-browser', '--version'], capture_output=True, text=True)
-                        print(f"Chromium версия: {chromium_version.stdout.strip()}")
-                        options.binary_location = '/usr/bin/chromium-browser'
-                        chrome_found = True
-                    except FileNotFoundError:
-                        print("ВНИМАНИЕ: Ни Google Chrome, ни Chromium не найдены в системе!")
-                        print("Установите Chrome: apt-get install -y google-chrome-stable")
-                        print("Или Chromium: apt-get install -y chromium-browser")
+                binary_location, driver_path = discover_local_chrome()
+                if binary_location:
+                    options.binary_location = binary_location
+                service = ChromeService(executable_path=driver_path)
                 
-                # Попытка использовать системный chromedriver если есть
-                system_chromedriver = '/usr/bin/chromedriver'
-                if os.path.exists(system_chromedriver):
-                    print(f"Используем системный ChromeDriver: {system_chromedriver}")
-                    service = ChromeService(executable_path=system_chromedriver)
-                else:
-                    print("Загружаем ChromeDriver через webdriver-manager...")
-                    service = ChromeService(executable_path=ChromeDriverManager().install())
-                
-                self.driver = webdriver.Chrome(service=service, options=options)
+                driver = webdriver.Chrome(service=service, options=options)
                 print("WebDriver успешно инициализирован локально.")
+            return driver
             
         except Exception as e:
             print(f"Ошибка инициализации WebDriver: {e}")
@@ -111,10 +217,20 @@ class SeleniumParser:
                 print("Проверьте, что Selenium Grid доступен по адресу:", remote_selenium_url)
             raise
 
+    def is_alive(self) -> bool:
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
     def go_to_page(self, url: str):
         try:
             print(f"Переход на страницу: {url}")
             self.driver.get(url)
+            self.pages_loaded += 1
         except Exception as e:
             print(f"Ошибка при переходе на URL {url}: {e}")
     
@@ -144,7 +260,19 @@ class SeleniumParser:
             print(f"Элемент ({locator_type}, {locator_value}) не найден за {timeout} секунд.")
             raise
 
-    def handle_pagination(self, next_button_locator_type: By, next_button_locator_value: str, max_pages: int = None, delay_between_pages: float = random.uniform(1.0, 3.0)):
+    def has_element(self, locator_type: By, locator_value: str) -> bool:
+        try:
+            return bool(self.driver.find_elements(locator_type, locator_value))
+        except Exception:
+            return False
+
+    def handle_pagination(self, next_button_locator_type: By, next_button_locator_value: str, max_pages: int = None,
+                          delay_between_pages: float = None, pacer=None, ready_selectors: tuple = None):
+        """
+        Листает страницы кликом по кнопке "Далее". Пауза перед кликом берется из pacer (бюджет запросов)
+        или delay_between_pages; без них - случайная 1-3 сек на каждый переход.
+        Готовность новой страницы проверяется через pacer.wait_until_ready(*ready_selectors).
+        """
         page_count = 0
         while True:
             if max_pages is not None and page_count >= max_pages:
@@ -155,6 +283,7 @@ class SeleniumParser:
             yield self.driver
 
             page_count += 1
+            self.pages_loaded += 1
 
             try:
                 wait = WebDriverWait(self.driver, 5)
@@ -163,10 +292,15 @@ class SeleniumParser:
                 )
 
                 old_html_element = self.driver.find_element(By.TAG_NAME, "html")
-                next_button.click()
 
-                print(f"Ожидание загрузки новой страницы (задержка {delay_between_pages} сек)...")
-                time.sleep(1)
+                if pacer:
+                    pacer.throttle()
+                else:
+                    delay = delay_between_pages if delay_between_pages is not None else random.uniform(1.0, 3.0)
+                    print(f"Пауза перед переходом на следующую страницу: {delay:.2f} сек")
+                    time.sleep(delay)
+
+                next_button.click()
 
                 try:
                     wait.until(EC.staleness_of(old_html_element))
@@ -174,6 +308,10 @@ class SeleniumParser:
                 except TimeoutException:
                     print("Предупреждение: Не удалось подтвердить обновление страницы через staleness_of.")
 
+                if pacer and ready_selectors and not pacer.wait_until_ready(self.driver, *ready_selectors):
+                    print("Новая страница не готова. Завершение пагинации.")
+                    break
+
             except (NoSuchElementException, TimeoutException):
                 print("Не удалось найти кнопку 'Далее'. Завершение пагинации.")
                 break
@@ -184,6 +322,78 @@ class SeleniumParser:
                 print(f"Произошла непредвиденная ошибка при пагинации: {e}")
                 break
 
+    def open_tabs(self, count: int) -> List[str]:
+        while len(self.tab_handles) < count:
+            self.driver.switch_to.new_window('tab')
+            self.tab_handles.append(self.driver.current_window_handle)
+            self._block_urls(self.blocked_urls)
+        return self.tab_handles[:count]
+
+    def load_pages(self, pages: Iterable[Tuple[Any, str]], ready_selectors: tuple, pacer, tabs: int = None,
+                   poll_interval: float = TAB_POLL_INTERVAL) -> Iterator[Tuple[Any, bool]]:
+        """
+        Грузит страницы pages - пары (ключ, url), которые берутся по одной по мере освобождения вкладок -
+        в tabs вкладках одного браузера. Пока страницы грузятся, обходит вкладки и отдает (ключ, готова ли)
+        в порядке готовности; до следующей итерации driver переключен на вкладку отданной страницы.
+        Темп запросов и таймауты готовности - из pacer, как у wait_until_ready.
+        Если потребитель прервал цикл, незавершенные загрузки во вкладках останавливаются.
+        """
+        handles = self.open_tabs(tabs or self.tabs)
+        pages = iter(pages)
+        free = list(reversed(handles))
+        in_flight = {} # handle -> (ключ, начало загрузки, таймаут)
+        next_start = None
+        exhausted = False
+        try:
+            while in_flight or not exhausted:
+                # Новая страница уходит в свободную вкладку, когда подошел ее слот в бюджете запросов
+                if free and not exhausted:
+                    if next_start is None:
+                        next_start = time.monotonic() + pacer.next_delay()
+                    if time.monotonic() >= next_start:
+                        page = next(pages, None)
+                        if page is None:
+                            exhausted = True
+                        else:
+                            key, url = page
+                            handle = free.pop()
+                            self.driver.switch_to.window(handle)
+                            print(f"Переход на страницу во вкладке {handles.index(handle) + 1}: {url}")
+                            self.driver.execute_script(NAVIGATE_SCRIPT, url)
+                            self.pages_loaded += 1
+                            in_flight[handle] = (key, time.monotonic(), pacer.readiness_timeout())
+                            next_start = None
+                            continue
+
+                for handle, (key, started, timeout) in list(in_flight.items()):
+                    self.driver.switch_to.window(handle)
+                    try:
+                        state = self.driver.execute_script(TAB_STATE_SCRIPT, *ready_selectors) or {}
+                    except Exception:
+                        state = {} # документ сменился во время вызова
+                    waited = time.monotonic() - started
+                    blocked = not state.get("pending", True) and is_block_title(state.get("title"))
+                    ready = (not state.get("pending", True) and state.get("items", 0) > 0
+                             and state.get("quiet_ms", 0) >= pacer.settings["quiet_ms"])
+                    if not (ready or blocked or waited >= timeout):
+                        continue
+                    del in_flight[handle]
+                    yield key, pacer.record_readiness(state if ready else None, waited, blocked, timeout)
+                    free.append(handle)
+
+                if in_flight or not exhausted:
+                    time.sleep(poll_interval)
+        finally:
+            # Потребитель мог остановиться раньше: вкладки со страницами за последней не должны грузиться дальше
+            # (сессия из пула возвращается с тихими вкладками)
+            for handle in in_flight:
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.execute_script(STOP_TAB_SCRIPT)
+                except Exception as e:
+                    print(f"Не удалось остановить загрузку во вкладке {handles.index(handle) + 1}: {e}")
+            self.driver.switch_to.window(handles[0])
+
     def close(self):
         if self.driver:
             self.driver.quit()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('.')
+
+import pytest
+
+from avito_subscriber.client.selenium.config import RESOURCE_BLOCKING_PROFILES
+from avito_subscriber.client.selenium.selenium import SeleniumParser
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+    def new_window(self, kind):
+        self.driver.handles.append(f"tab{len(self.driver.handles)}")
+        self.driver.current_window_handle = self.driver.handles[-1]
+
+
+class FakeDriver:
+    """Запоминает CDP-команды вместе с вкладкой, в которой они выполнены: CDP действует на текущую цель"""
+
+    def __init__(self):
+        self.handles = ["tab0"]
+        self.current_window_handle = "tab0"
+        self.switch_to = FakeSwitchTo(self)
+        self.cdp_calls = []
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp_calls.append((self.current_window_handle, cmd, params))
+        return {}
+
+
+@pytest.mark.parametrize("blocking_profile", ["lite", "off"])
+def test_url_blocking_applied_per_tab(blocking_profile, monkeypatch):
+    """Network.setBlockedURLs выполняется в каждой вкладке сессии, а не только в первой"""
+    monkeypatch.setattr(SeleniumParser, "_create_driver", staticmethod(lambda options, remote_selenium_url=None: FakeDriver()))
+    parser = SeleniumParser(blocking_profile=blocking_profile, tabs=3)
+    handles = parser.open_tabs(3)
+    assert handles == ["tab0", "tab1", "tab2"]
+
+    patterns = RESOURCE_BLOCKING_PROFILES[blocking_profile]["blocked_urls"]
+    blocked = {handle: params["urls"] for handle, cmd, params in parser.driver.cdp_calls if cmd == "Network.setBlockedURLs"}
+    assert blocked == ({handle: patterns for handle in handles} if patterns else {})
+
+    # Уже открытые вкладки не блокируются повторно
+    parser.open_tabs(2)
+    assert len(parser.driver.cdp_calls) == 2 * len(blocked)
+    print("Блокировка URL применяется к каждой вкладке")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
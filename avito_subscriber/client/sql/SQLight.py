@@ -1,31 +1,47 @@
 import sqlite3
 import os
-import json
 from typing import Dict, Any, List
-from .config import DEFAULT_DB_PATH, DB_CONNECTION_SETTINGS
+from .config import DEFAULT_DB_PATH, DB_CONNECTION_SETTINGS, DB_PERFORMANCE_PROFILES, DEFAULT_DB_PROFILE, DEFAULT_SENT_ITEMS_TABLE
 from .schema import *
+from .normalize import parse_rating, parse_timestamp, parse_published_date, get_param_rows, get_badge_rows
+from .storage import StorageClient, ITEM_ID_INDEX
 
-# DatabaseClient
+# DatabaseClient - хранилище StorageClient на SQLite (upsert, индекс просмотренных и запросы - в storage.py)
 # -- __init__ - инициализирует соединение с базой данных
-# -- connect - подключается к базе данных
+# -- connect - подключается к базе данных и применяет профиль PRAGMA
 # -- disconnect - отключается от базы данных
 # -- close - закрывает соединение с базой данных
 # -- execute_query - выполняет SQL запрос
 # -- create_category_table - создает таблицу для конкретной категории
+# -- migrate_category_table - доводит таблицу категории до CATEGORY_SCHEMA_VERSION, заполняя новые колонки и таблицы
+# -- create_category_indexes - создает индексы таблицы категории (идемпотентно)
+# -- create_search_index - создает полнотекстовый индекс FTS5 категории (если SQLite собран с FTS5)
+# -- rebuild_search_index - перестраивает полнотекстовый индекс по таблице категории
+# -- create_sent_items_table - создает индекс просмотренных объявлений и заполняет его уже известными
+# -- _write_changes - пишет изменившиеся строки пачки executemany в одной транзакции, при сбое - построчно
 
-class DatabaseClient:
+
+class DatabaseClient(StorageClient):
     
-    def __init__(self, db_path: str = DEFAULT_DB_PATH, name_marker: str = None):
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, name_marker: str = None, profile: str = DEFAULT_DB_PROFILE,
+                 sent_items_table: str = DEFAULT_SENT_ITEMS_TABLE):
+        super().__init__(name_marker)
         self.db_path = db_path
-        self.category_name = generate_category_table_name(name_marker)
+        self.sent_items_table = sent_items_table
+        self.upsert_sql = get_upsert_sql(self.category_name)
+        self.price_history_sql = get_price_history_insert_sql(self.category_name)
+        self.profile = profile
         self.conn = None
         self.cursor = None
-        self.connect()
-        self.create_category_table()
 
         # Создаем директорию для базы данных если она не существует
-        if not os.path.exists(self.db_path):
-            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(self.db_path):
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.connect()
+        self.create_category_table()
+        self.create_sent_items_table()
 
         # Проверяем соединение с базой данных
         if not self.conn:
@@ -38,11 +54,18 @@ class DatabaseClient:
             self.conn = sqlite3.connect(self.db_path, **DB_CONNECTION_SETTINGS)
             self.conn.row_factory = sqlite3.Row
             self.cursor = self.conn.cursor()
-            print(f"Подключение к базе данных {self.db_path} установлено")
+            self.apply_performance_profile(self.profile)
+            print(f"Подключение к базе данных {self.db_path} установлено (профиль: {self.profile})")
         except Exception as e:
             print(f"[ERROR] connect: {e}")
             raise
     
+    def apply_performance_profile(self, profile: str):
+        if profile not in DB_PERFORMANCE_PROFILES:
+            raise ValueError(f"Неизвестный профиль БД: {profile}. Доступны: {', '.join(DB_PERFORMANCE_PROFILES)}")
+        for pragma, value in DB_PERFORMANCE_PROFILES[profile].items():
+            self.conn.execute(f"PRAGMA {pragma} = {value}")
+
     def disconnect(self):
         if self.conn:
             try:
@@ -74,33 +97,199 @@ class DatabaseClient:
         
         if not success:
             raise Exception(f"[ERROR] create_category_table")
+
+        self.ensure_columns(self.category_name, MIGRATION_COLUMNS)
+
+        success = self.execute_query(get_price_history_ddl(self.category_name))
+        if not success:
+            raise Exception(f"[ERROR] create_category_table: {get_price_history_table_name(self.category_name)}")
+
+        for ddl in get_side_tables_ddl(self.category_name):
+            if not self.execute_query(ddl):
+                raise Exception(f"[ERROR] create_category_table: {ddl}")
+
+        self.create_category_indexes()
+        self.create_search_index()
+        self.migrate_category_table()
+
+    def migrate_category_table(self):
+        self.conn.execute(SCHEMA_VERSIONS_TABLE_DDL)
+        row = self.conn.execute("SELECT version FROM schema_versions WHERE table_name = ?", (self.category_name,)).fetchone()
+        version = row[0] if row else 1
+        if version >= CATEGORY_SCHEMA_VERSION:
+            return
+
+        # Версия 2: нормализованные колонки и побочные таблицы для строк, загруженных до их появления
+        rows = self.conn.execute(
+            f"SELECT item_id, parsed_at, published_date_text, seller_rating, params, badges FROM {self.category_name}"
+        ).fetchall()
+        try:
+            self.conn.execute("BEGIN")
+            self.cursor.executemany(
+                f"UPDATE {self.category_name} SET parsed_at_ts = ?, published_at_ts = ?, seller_rating_value = ? WHERE item_id = ?",
+                [
+                    (parse_timestamp(row["parsed_at"]), parse_published_date(row["published_date_text"], row["parsed_at"]),
+                     parse_rating(row["seller_rating"]), row["item_id"])
+                    for row in rows
+                ],
+            )
+            self._replace_side_rows([(row["item_id"], row["params"], row["badges"]) for row in rows])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO schema_versions (table_name, version) VALUES (?, ?)",
+                (self.category_name, CATEGORY_SCHEMA_VERSION),
+            )
+            self.conn.execute("COMMIT")
+        except Exception as e:
+            # Таблица остается на прежней версии: миграция повторится при следующем подключении
+            self.conn.execute("ROLLBACK")
+            print(f"[ERROR] migrate_category_table: {e}")
+            raise
+        if rows:
+            print(f"Таблица {self.category_name} переведена на схему версии {CATEGORY_SCHEMA_VERSION}: {len(rows)} строк")
+
+    def _replace_side_rows(self, items: List[tuple]):
+        """Перезаписывает параметры и бейджи объявлений; items - (item_id, params, badges), JSON или уже разобранные."""
+        params_table = get_params_table_name(self.category_name)
+        badges_table = get_badges_table_name(self.category_name)
+        item_ids = [(item_id,) for item_id, _, _ in items]
+        self.cursor.executemany(f"DELETE FROM {params_table} WHERE item_id = ?", item_ids)
+        self.cursor.executemany(f"DELETE FROM {badges_table} WHERE item_id = ?", item_ids)
+        self.cursor.executemany(
+            f"INSERT INTO {params_table} (item_id, key, value, value_num) VALUES (?, ?, ?, ?)",
+            [param for item_id, params, _ in items for param in get_param_rows(item_id, params)],
+        )
+        self.cursor.executemany(
+            f"INSERT INTO {badges_table} (item_id, badge) VALUES (?, ?)",
+            [badge for item_id, _, badges in items for badge in get_badge_rows(item_id, badges)],
+        )
+
+    def create_category_indexes(self):
+        for ddl in get_category_indexes_ddl(self.category_name):
+            if not self.execute_query(ddl):
+                raise Exception(f"[ERROR] create_category_indexes: {ddl}")
+
+    def create_search_index(self):
+        fts_table = get_fts_table_name(self.category_name)
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,)
+        ).fetchone()
+        try:
+            for ddl in get_fts_ddl(self.category_name):
+                self.conn.execute(ddl)
+        except sqlite3.OperationalError as e:
+            # SQLite без модуля fts5: загрузка работает, поиск недоступен
+            print(f"Полнотекстовый индекс {fts_table} не создан: {e}")
+            self.search_enabled = False
+            return
+
+        self.search_enabled = True
+        if not exists:
+            # Таблица категории могла быть заполнена до появления индекса
+            self.rebuild_search_index()
+
+    def rebuild_search_index(self):
+        fts_table = get_fts_table_name(self.category_name)
+        self.conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+    def create_sent_items_table(self):
+        success = self.execute_query(get_sent_items_ddl(self.sent_items_table))
+        if not success:
+            raise Exception(f"[ERROR] create_sent_items_table: {self.sent_items_table}")
+
+        # Категория, загруженная до появления индекса: ее объявления считаются уже отправленными,
+        # иначе первый запуск разослал бы уведомления по всей таблице
+        indexed = self.conn.execute(
+            f"SELECT 1 FROM {self.sent_items_table} WHERE category = ? LIMIT 1", (self.name_marker,)
+        ).fetchone()
+        if not indexed:
+            seeded = self.conn.execute(
+                f"INSERT OR IGNORE INTO {self.sent_items_table} (category, item_id, sent_at) "
+                f"SELECT ?, item_id, CURRENT_TIMESTAMP FROM {self.category_name}",
+                (self.name_marker,),
+            ).rowcount
+            if seeded:
+                print(f"Индекс {self.sent_items_table} заполнен {seeded} объявлениями из {self.category_name}")
+
+    def ensure_columns(self, table_name: str, columns: Dict[str, str]):
+        # Таблицы, созданные до появления колонки, дополняем через ALTER TABLE
+        existing = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table_name})")}
+        for column, column_type in columns.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column} {column_type}")
+                print(f"В таблицу {table_name} добавлена колонка {column}")
             
     #  ---------UPDATE/INSERT---------------
-    def upsert_item(self, item_data) -> bool:
-        values = self.prepare_item_data(item_data)
-        sql = get_upsert_sql(self.category_name)
-        
+    def _write_changes(self, changes: List[tuple], stats: Dict[str, int]):
         try:
-            self.cursor.execute(sql, tuple(values))
-            self.conn.commit()
-            return True
+            self.conn.execute("BEGIN")
+            self.cursor.executemany(self.upsert_sql, [row for row, _, _ in changes])
+            self.cursor.executemany(self.price_history_sql, [history for _, _, history in changes if history])
+            self._replace_side_rows([self._side_values(row) for row, _, _ in changes])
+            self.conn.execute("COMMIT")
+            for _, status, _ in changes:
+                stats[status] += 1
+            return
         except Exception as e:
-            print(f"[ERROR] upsert_item: {e}")
-            return False
-
-    def prepare_item_data(self, item_data: dict) -> List[Any]:
-        values = []
-        for col in ITEM_COLUMNS:
-            value = item_data.get(col)
-            if col in JSON_COLUMNS and value is not None:
-                try:
-                    values.append(json.dumps(value, ensure_ascii=False))
-                except TypeError as e:
-                    print(f"Ошибка сериализации JSON для колонки '{col}': {e}. Сохраняем как NULL.")
-                    values.append(None)
-            else:
-                values.append(value)
-        return values
+            self.conn.execute("ROLLBACK")
+            print(f"[ERROR] upsert_items: {e}. Повтор пачки построчно.")
+
+        # Пачка откатилась целиком: повторяем построчно в одной транзакции, чтобы отсечь только сбойные строки.
+        # Каждая строка - в своей точке сохранения: при сбое истории или побочных таблиц откатывается и сама строка
+        self.conn.execute("BEGIN")
+        for row, status, history in changes:
+            self.conn.execute("SAVEPOINT row")
+            try:
+                self.cursor.execute(self.upsert_sql, row)
+                if history:
+                    self.cursor.execute(self.price_history_sql, history)
+                self._replace_side_rows([self._side_values(row)])
+                self.conn.execute("RELEASE row")
+                stats[status] += 1
+            except Exception as e:
+                self.conn.execute("ROLLBACK TO row")
+                self.conn.execute("RELEASE row")
+                print(f"[ERROR] upsert_items: item_id={row[ITEM_ID_INDEX]}: {e}")
+                stats["failed"] += 1
+        self.conn.execute("COMMIT")
+
+    #  ---------SEEN/SENT INDEX---------------
+    def _load_seen_ids(self) -> set:
+        rows = self.conn.execute(f"SELECT item_id FROM {self.sent_items_table} WHERE category = ?", (self.name_marker,))
+        return {row[0] for row in rows}
+
+    def _select_seen_ids(self, item_ids: List[str]) -> set:
+        placeholders = ', '.join('?' * len(item_ids))
+        sql = f"SELECT item_id FROM {self.sent_items_table} WHERE category = ? AND item_id IN ({placeholders})"
+        return {row[0] for row in self.conn.execute(sql, [self.name_marker, *item_ids])}
+
+    def _insert_seen_ids(self, item_ids: List[str]):
+        self.conn.execute("BEGIN")
+        self.cursor.executemany(
+            f"INSERT OR IGNORE INTO {self.sent_items_table} (category, item_id) VALUES (?, ?)",
+            [(self.name_marker, item_id) for item_id in item_ids],
+        )
+        self.conn.execute("COMMIT")
+
+    def _mark_sent_ids(self, item_ids: List[str]):
+        self.conn.execute("BEGIN")
+        self.cursor.executemany(
+            f"INSERT INTO {self.sent_items_table} (category, item_id, sent_at) VALUES (?, ?, CURRENT_TIMESTAMP) "
+            f"ON CONFLICT(category, item_id) DO UPDATE SET sent_at = CURRENT_TIMESTAMP",
+            [(self.name_marker, item_id) for item_id in item_ids],
+        )
+        self.conn.execute("COMMIT")
+
+    #  ---------SELECT---------------
+    def _build_search_query(self, text: str) -> str:
+        return build_fts_query(text)
+
+    def _fetch_rows(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.conn.execute(get_query_sql(self.category_name, query), params)]
+
+    def _select_existing_state(self, item_ids: List[str]) -> Dict[str, tuple]:
+        placeholders = ', '.join('?' * len(item_ids))
+        sql = f"SELECT item_id, content_hash, price FROM {self.category_name} WHERE item_id IN ({placeholders})"
+        return {row[0]: (row[1], row[2]) for row in self.conn.execute(sql, item_ids)}
 
 
 if __name__ == "__main__":
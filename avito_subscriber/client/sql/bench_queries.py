@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк запросов DatabaseClient на синтетической таблице категории: без индексов и с индексами.
+
+Запуск:
+    python -m avito_subscriber.client.sql.bench_queries [rows] [repeats]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from .SQLight import DatabaseClient
+from .schema import UPSERT_COLUMNS, get_category_indexes_ddl, get_price_history_table_name
+
+CATEGORY = "bench"
+SELLERS = 20000
+# Доля объявлений со снижением цены в истории
+PRICE_DROP_EVERY = 10
+
+
+def synthetic_rows(count: int):
+    columns = {col: None for col in UPSERT_COLUMNS}
+    for i in range(count):
+        row = dict(columns)
+        row.update({
+            "item_id": str(4000000000 + i),
+            # Время парсинга растет с номером объявления, чтобы "свежие" не совпадали с порядком вставки по rowid
+            "parsed_at": f"2026-01-{1 + (i * 7919) % 28:02d}T{(i * 31) % 24:02d}:{i % 60:02d}:00",
+            "title": f"macbook pro 14 m{i % 4} 16/512",
+            "price": 20000 + (i * 7919) % 280000,
+            "url": f"https://avito.ru/moskva/noutbuki/macbook_{i}",
+            "seller_url": f"https://avito.ru/brands/seller_{(i * 104729) % SELLERS}",
+            "location": "Москва",
+        })
+        yield tuple(row[col] for col in UPSERT_COLUMNS)
+
+
+def synthetic_history(count: int):
+    for i in range(0, count, PRICE_DROP_EVERY):
+        price = 20000 + (i * 7919) % 280000
+        yield str(4000000000 + i), price + 5000 + i % 20000, "2026-01-01T00:00:00"
+        yield str(4000000000 + i), price, f"2026-01-{2 + i % 27:02d}T00:00:00"
+
+
+def fill_table(db: DatabaseClient, rows: int):
+    placeholders = ', '.join('?' * len(UPSERT_COLUMNS))
+    history_table = get_price_history_table_name(db.category_name)
+    db.conn.execute("BEGIN")
+    db.conn.executemany(
+        f"INSERT INTO {db.category_name} ({', '.join(UPSERT_COLUMNS)}) VALUES ({placeholders})", synthetic_rows(rows)
+    )
+    db.conn.executemany(f"INSERT INTO {history_table} (item_id, price, recorded_at) VALUES (?, ?, ?)", synthetic_history(rows))
+    db.conn.execute("COMMIT")
+    db.conn.execute("ANALYZE")
+
+
+def drop_indexes(db: DatabaseClient):
+    for ddl in get_category_indexes_ddl(db.category_name):
+        index_name = ddl.split("IF NOT EXISTS ")[1].split(" ON ")[0]
+        db.conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def time_queries(db: DatabaseClient, repeats: int) -> dict:
+    queries = {
+        "below_price": lambda: db.get_items_below_price(25000, limit=100),
+        "newest": lambda: db.get_newest_items(50),
+        "by_seller": lambda: db.get_items_by_seller("https://avito.ru/brands/seller_42"),
+        "price_drops": lambda: db.get_price_drop_candidates(since="2026-01-27", min_drop_ratio=0.05, limit=100),
+    }
+    results = {}
+    for name, query in queries.items():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            found = len(query())
+        results[name] = ((time.perf_counter() - started) / repeats * 1000, found)
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseClient(os.path.join(tmp_dir, "bench.db"), CATEGORY)
+        drop_indexes(db)
+
+        started = time.perf_counter()
+        fill_table(db, rows)
+        print(f"Таблица {db.category_name}: {rows} строк за {time.perf_counter() - started:.1f} сек")
+
+        without_indexes = time_queries(db, repeats)
+
+        started = time.perf_counter()
+        db.create_category_indexes()
+        db.conn.execute("ANALYZE")
+        print(f"Индексы построены за {time.perf_counter() - started:.1f} сек")
+
+        with_indexes = time_queries(db, repeats)
+        db.close()
+
+    print(f"\nСтрок: {rows}, повторов: {repeats}")
+    for name, (elapsed, found) in without_indexes.items():
+        indexed, _ = with_indexes[name]
+        print(f"{name:<12} без индексов {elapsed:9.2f} мс  с индексами {indexed:8.2f} мс  x{elapsed / indexed:7.1f}  (строк: {found})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк полнотекстового поиска: FTS5 (DatabaseClient.search_items) против LIKE по title/description.
+
+LIKE замеряется дважды: первые 50 совпадений без сортировки (для частых слов скан обрывается рано)
+и все совпадения (полный скан - столько же стоит любая сортировка выдачи). FTS5 всегда
+находит все совпадения и ранжирует их bm25.
+
+Запуск:
+    python -m avito_subscriber.client.sql.bench_search [rows] [repeats]
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+
+from .SQLight import DatabaseClient
+from .schema import UPSERT_COLUMNS, get_fts_table_name
+
+CATEGORY = "bench_search"
+
+MODELS = ["macbook pro 14", "macbook pro 16", "macbook air 13", "macbook air 15", "imac 24", "mac mini"]
+CHIPS = ["m1", "m1 pro", "m2", "m2 max", "m3", "m3 pro", "intel i7"]
+MEMORY = ["8gb", "16gb", "18gb", "24gb", "32gb"]
+STORAGE = ["256", "512", "1tb", "2tb"]
+DESCRIPTION_WORDS = (
+    "отличное состояние полный комплект коробка чек гарантия аккумулятор циклов без царапин "
+    "батарея держит долго обмен торг доставка самовывоз метро срочно продаю ноутбук экран матрица"
+).split()
+# Редкие слова описаний (артикулы, модели, районы): у реальных объявлений словарь намного шире шаблонного
+RARE_WORDS = [f"a{2000 + n}" for n in range(5000)]
+
+QUERIES = [
+    ("m2 16gb 512", None, None),
+    ("macbook air", 60000, 90000),
+    ("коробка чек гарантия", None, None),
+    ("m3 pro 1tb", 100000, None),
+    ("a2338", None, None),
+    ("a2338 m2", None, None),
+]
+
+
+def synthetic_rows(count: int):
+    columns = {col: None for col in UPSERT_COLUMNS}
+    for i in range(count):
+        row = dict(columns)
+        words = [DESCRIPTION_WORDS[(i * k + k) % len(DESCRIPTION_WORDS)] for k in (3, 7, 11, 13, 17, 19, 23, 29)]
+        words.append(RARE_WORDS[(i * 104729) % len(RARE_WORDS)])
+        row.update({
+            "item_id": str(5000000000 + i),
+            "parsed_at": "2026-01-01T12:00:00",
+            "title": f"{MODELS[i % len(MODELS)]} {CHIPS[(i // 7) % len(CHIPS)]} {MEMORY[(i // 3) % len(MEMORY)]} {STORAGE[(i // 11) % len(STORAGE)]}",
+            "description": " ".join(words),
+            "price": 30000 + (i * 7919) % 250000,
+            "url": f"https://avito.ru/moskva/noutbuki/item_{i}",
+        })
+        yield tuple(row[col] for col in UPSERT_COLUMNS)
+
+
+def like_search(db: DatabaseClient, text: str, min_price: int = None, max_price: int = None, limit: int = -1) -> list:
+    tokens = re.findall(r"\w+", text.lower())
+    conditions = " AND ".join("(title LIKE ? OR description LIKE ?)" for _ in tokens)
+    params = [pattern for token in tokens for pattern in (f"%{token}%", f"%{token}%")]
+    sql = (
+        f"SELECT * FROM {db.category_name} WHERE {conditions} "
+        f"AND (? IS NULL OR price >= ?) AND (? IS NULL OR price <= ?) LIMIT ?"
+    )
+    return db.conn.execute(sql, [*params, min_price, min_price, max_price, max_price, limit]).fetchall()
+
+
+def timed(query, repeats: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        found = len(query())
+    return (time.perf_counter() - started) / repeats * 1000, found
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseClient(os.path.join(tmp_dir, "bench.db"), CATEGORY)
+        placeholders = ', '.join('?' * len(UPSERT_COLUMNS))
+
+        # Массовая заливка без триггера вставки и одна перестройка индекса: построчные триггеры FTS5
+        # рассчитаны на пачки загрузчика, а не на миллион строк за раз
+        fts_insert_trigger = f"{get_fts_table_name(db.category_name)}_ai"
+        trigger_sql = db.conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (fts_insert_trigger,)).fetchone()[0]
+        db.conn.execute(f"DROP TRIGGER {fts_insert_trigger}")
+
+        started = time.perf_counter()
+        db.conn.execute("BEGIN")
+        db.conn.executemany(
+            f"INSERT INTO {db.category_name} ({', '.join(UPSERT_COLUMNS)}) VALUES ({placeholders})", synthetic_rows(rows)
+        )
+        db.conn.execute("COMMIT")
+        print(f"Таблица {db.category_name}: {rows} строк за {time.perf_counter() - started:.1f} сек")
+
+        started = time.perf_counter()
+        db.rebuild_search_index()
+        db.conn.execute(trigger_sql)
+        print(f"Индекс FTS5 построен за {time.perf_counter() - started:.1f} сек")
+
+        results = []
+        for text, min_price, max_price in QUERIES:
+            like_first = timed(lambda: like_search(db, text, min_price, max_price, limit=50), repeats)
+            like_all = timed(lambda: like_search(db, text, min_price, max_price), repeats)
+            fts = timed(lambda: db.search_items(text, min_price, max_price, limit=50), repeats)
+            results.append((text, min_price, max_price, like_first, like_all, fts))
+        db.close()
+
+    print(f"\nСтрок: {rows}, повторов: {repeats}, лимит выдачи: 50")
+    for text, min_price, max_price, (first_ms, _), (all_ms, matches), (fts_ms, _) in results:
+        price_range = f"{min_price or ''}..{max_price or ''}"
+        print(
+            f"{text!r:<24} {price_range:<14} совпадений {matches:>6}  LIKE первые 50 {first_ms:8.2f} мс  "
+            f"LIKE все {all_ms:8.2f} мс  FTS5 top-50 {fts_ms:8.2f} мс  x{all_ms / fts_ms:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
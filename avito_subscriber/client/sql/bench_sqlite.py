@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк профилей SQLite: один писатель (upsert_items) и несколько читателей одновременно.
+
+Запуск:
+    python -m avito_subscriber.client.sql.bench_sqlite [items] [readers]
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+from .SQLight import DatabaseClient
+from .config import DB_PERFORMANCE_PROFILES
+
+CATEGORY = "bench"
+BATCH_SIZE = 100
+
+
+def synthetic_items(count: int, offset: int = 0):
+    for i in range(offset, offset + count):
+        yield {
+            "item_id": str(4000000000 + i),
+            "parsed_at": "2026-01-01T12:00:00",
+            "title": f"macbook pro 14 m{i % 4} 16/512",
+            "price": 50000 + (i * 37) % 150000,
+            "price_text": "50 000 ₽",
+            "url": f"https://avito.ru/moskva/noutbuki/macbook_{i}",
+            "seller_url": f"https://avito.ru/brands/seller_{i % 500}",
+            "description": "описание объявления " * 10,
+            "location": "Москва",
+            "images": [f"https://00.img.avito.st/image/{i}_1.jpg"],
+            "params": {"Память": "16 ГБ"},
+        }
+
+
+def _reader(db_path: str, profile: str, stop_event, counter):
+    db = DatabaseClient(db_path, CATEGORY, profile=profile)
+    reads = 0
+    while not stop_event.is_set():
+        try:
+            db.conn.execute(
+                f"SELECT COUNT(*), MIN(price) FROM {db.category_name} WHERE price < ?", (100000,)
+            ).fetchone()
+            reads += 1
+        except Exception:
+            # В rollback-журнале читатель может получить "database is locked"
+            pass
+    db.close()
+    with counter.get_lock():
+        counter.value += reads
+
+
+def run_profile(profile: str, items: int, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        writer = DatabaseClient(db_path, CATEGORY, profile=profile)
+
+        stop_event = mp.Event()
+        counter = mp.Value('i', 0)
+        processes = [mp.Process(target=_reader, args=(db_path, profile, stop_event, counter)) for _ in range(readers)]
+        for process in processes:
+            process.start()
+
+        started = time.perf_counter()
+        # Пишем маленькими пачками, как loader во время потокового парсинга
+        for offset in range(0, items, BATCH_SIZE):
+            writer.upsert_items(synthetic_items(min(BATCH_SIZE, items - offset), offset), batch_size=BATCH_SIZE)
+        elapsed = time.perf_counter() - started
+
+        stop_event.set()
+        for process in processes:
+            process.join()
+        writer.close()
+
+    return {
+        "profile": profile,
+        "elapsed": elapsed,
+        "writes_per_sec": items / elapsed,
+        "reads_per_sec": counter.value / elapsed,
+    }
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    results = [run_profile(profile, items, readers) for profile in DB_PERFORMANCE_PROFILES]
+
+    print(f"\nОбъявлений: {items}, читателей: {readers}, пачка: {BATCH_SIZE}")
+    for result in results:
+        print(
+            f"{result['profile']:<8} {result['elapsed']:7.2f} сек  "
+            f"запись {result['writes_per_sec']:9.0f}/сек  чтение {result['reads_per_sec']:9.0f}/сек"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+# parse_rating - "4,8" -> 4.8
+# parse_timestamp - ISO-строка -> unix-время (сек)
+# parse_published_date - "2 часа назад", "вчера 14:20", "12 марта" -> unix-время относительно момента парсинга
+# parse_number - число в начале значения параметра: "16 ГБ" -> 16.0
+# get_param_rows - строки побочной таблицы параметров (item_id, key, value, value_num)
+# get_badge_rows - строки побочной таблицы бейджей (item_id, badge)
+
+RELATIVE_UNITS = (
+    ("сек", timedelta(seconds=1)),
+    ("мин", timedelta(minutes=1)),
+    ("час", timedelta(hours=1)),
+    ("дн", timedelta(days=1)),
+    ("ден", timedelta(days=1)),
+    ("недел", timedelta(weeks=1)),
+    ("месяц", timedelta(days=30)),
+)
+
+MONTHS = {
+    "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
+    "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
+}
+
+RELATIVE_PATTERN = re.compile(r"^(?:(\d+)|несколько)?\s*([а-я]+)\s+назад$")
+DAY_PATTERN = re.compile(r"^(сегодня|вчера)(?:\s+в)?(?:\s+(\d{1,2}):(\d{2}))?$")
+DATE_PATTERN = re.compile(r"^(\d{1,2})\s+([а-я]+)(?:\s+(\d{4}))?(?:\s+в)?(?:\s+(\d{1,2}):(\d{2}))?$")
+NUMBER_PATTERN = re.compile(r"^\s*(\d+(?:[.,]\d+)?)")
+
+
+def parse_rating(text: Optional[str]) -> Optional[float]:
+    if not text:
+        return None
+    match = NUMBER_PATTERN.match(text)
+    return float(match.group(1).replace(",", ".")) if match else None
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        return None
+
+
+def parse_published_date(text: Optional[str], reference: Optional[str]) -> Optional[int]:
+    """Переводит дату публикации Avito в абсолютное время. reference - момент парсинга (ISO), от него считается "назад"."""
+    if not text or not reference:
+        return None
+    try:
+        now = datetime.fromisoformat(reference)
+    except ValueError:
+        return None
+    text = " ".join(text.lower().replace("\xa0", " ").split())
+
+    match = RELATIVE_PATTERN.match(text)
+    if match:
+        count, unit = match.groups()
+        for prefix, delta in RELATIVE_UNITS:
+            if unit.startswith(prefix):
+                # "минуту назад", "час назад" - без числа, "несколько секунд назад" - тоже ~1
+                return int((now - delta * int(count or 1)).timestamp())
+        return None
+
+    match = DAY_PATTERN.match(text)
+    if match:
+        day, hour, minute = match.groups()
+        published = now - timedelta(days=1) if day == "вчера" else now
+        if hour is not None:
+            published = published.replace(hour=int(hour), minute=int(minute), second=0, microsecond=0)
+        return int(published.timestamp())
+
+    match = DATE_PATTERN.match(text)
+    if match and match.group(2) in MONTHS:
+        day, month, year, hour, minute = match.groups()
+        try:
+            published = now.replace(
+                year=int(year) if year else now.year, month=MONTHS[month], day=int(day),
+                hour=int(hour or 0), minute=int(minute or 0), second=0, microsecond=0,
+            )
+        except ValueError:
+            return None
+        # "12 декабря" в январе - это прошлый год
+        if not year and published > now:
+            published = published.replace(year=published.year - 1)
+        return int(published.timestamp())
+
+    return None
+
+
+def parse_number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = NUMBER_PATTERN.match(value)
+    return float(match.group(1).replace(",", ".")) if match else None
+
+
+def _load_json(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def get_param_rows(item_id: str, params: Any) -> List[Tuple[str, str, str, Optional[float]]]:
+    params = _load_json(params)
+    if not isinstance(params, dict):
+        return []
+    return [(item_id, key, str(value), parse_number(value)) for key, value in params.items()]
+
+
+def get_badge_rows(item_id: str, badges: Any) -> List[Tuple[str, str]]:
+    badges = _load_json(badges)
+    if not isinstance(badges, list):
+        return []
+    return [(item_id, badge) for badge in dict.fromkeys(badges) if isinstance(badge, str)]
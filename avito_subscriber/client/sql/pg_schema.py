@@ -0,0 +1,229 @@
+import re
+from functools import lru_cache
+from typing import List
+
+from .schema import (
+    UPSERT_COLUMNS, get_price_history_table_name, get_params_table_name, get_badges_table_name,
+)
+
+# SQL для PostgresClient: та же схема категории, что в schema.py, с типами PostgreSQL
+# get_pg_category_ddl - DDL таблицы категории, истории цен, побочных таблиц и индексов
+# get_pg_sent_items_ddl - DDL индекса просмотренных/отправленных объявлений
+# get_pg_staging_ddl - временная таблица для COPY пачки (очищается при COMMIT)
+# get_pg_merge_sql - перенос пачки из staging в таблицу категории через INSERT ... ON CONFLICT
+# get_pg_price_history_insert_sql - запись точек истории цен (execute_values)
+# build_pg_tsquery - поисковая строка пользователя -> запрос to_tsquery
+# get_pg_query_sql - запрос чтения из PG_QUERY_TEMPLATES для таблицы категории
+
+PG_COLUMN_TYPES = {
+    "price": "BIGINT",
+    "seller_reviews_count": "INTEGER",
+    "badges": "JSONB",
+    "images": "JSONB",
+    "params": "JSONB",
+    "parsed_at_ts": "BIGINT",
+    "published_at_ts": "BIGINT",
+    "seller_rating_value": "DOUBLE PRECISION",
+}
+
+# JSON-колонки приходят в COPY строкой (staging - TEXT) и приводятся к JSONB при переносе в таблицу категории
+PG_JSON_COLUMNS = ("badges", "images", "params")
+
+
+def get_staging_table_name(table_name: str) -> str:
+    return f"{table_name}_staging"
+
+
+def get_pg_category_ddl(table_name: str) -> List[str]:
+    history_table = get_price_history_table_name(table_name)
+    params_table = get_params_table_name(table_name)
+    badges_table = get_badges_table_name(table_name)
+    columns = ",\n        ".join(
+        f"{col} {PG_COLUMN_TYPES.get(col, 'TEXT')}{' PRIMARY KEY' if col == 'item_id' else ''}{' UNIQUE' if col == 'url' else ''}"
+        for col in UPSERT_COLUMNS
+    )
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+        {columns},
+        last_updated_at TIMESTAMPTZ DEFAULT now(),
+        -- полнотекстовый индекс: совпадения в заголовке (A) весят больше, чем в описании (D)
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'D')
+        ) STORED
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {history_table} (
+            item_id TEXT NOT NULL,
+            price BIGINT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            PRIMARY KEY (item_id, recorded_at)
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {params_table} (
+            item_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            value_num DOUBLE PRECISION,
+            PRIMARY KEY (item_id, key)
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {badges_table} (
+            item_id TEXT NOT NULL,
+            badge TEXT NOT NULL,
+            PRIMARY KEY (item_id, badge)
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_price ON {table_name}(price)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_parsed_at ON {table_name}(parsed_at)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_seller_url ON {table_name}(seller_url)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_published_at_ts ON {table_name}(published_at_ts)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_search ON {table_name} USING GIN (search_vector)",
+        f"CREATE INDEX IF NOT EXISTS idx_{history_table}_recorded_at ON {history_table}(recorded_at)",
+        f"CREATE INDEX IF NOT EXISTS idx_{params_table}_key_num ON {params_table}(key, value_num)",
+        f"CREATE INDEX IF NOT EXISTS idx_{params_table}_key_value ON {params_table}(key, value)",
+        f"CREATE INDEX IF NOT EXISTS idx_{badges_table}_badge ON {badges_table}(badge)",
+    ]
+
+
+def get_pg_sent_items_ddl(table_name: str = "sent_items") -> str:
+    return """
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        category TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        first_seen_at TIMESTAMPTZ DEFAULT now(),
+        sent_at TIMESTAMPTZ,
+        PRIMARY KEY (category, item_id)
+    )
+    """.format(table_name=table_name)
+
+
+def get_pg_staging_ddl(table_name: str) -> str:
+    # Временная таблица живет в сессии соединения и пуста после каждой транзакции: параллельные воркеры не мешают друг другу
+    columns = ", ".join(f"{col} {'TEXT' if col in PG_JSON_COLUMNS else PG_COLUMN_TYPES.get(col, 'TEXT')}" for col in UPSERT_COLUMNS)
+    return f"CREATE TEMP TABLE IF NOT EXISTS {get_staging_table_name(table_name)} ({columns}) ON COMMIT DELETE ROWS"
+
+
+@lru_cache(maxsize=None)
+def get_pg_merge_sql(table_name: str) -> str:
+    columns = ", ".join(UPSERT_COLUMNS)
+    select = ", ".join(f"{col}::jsonb" if col in PG_JSON_COLUMNS else col for col in UPSERT_COLUMNS)
+    updates = ",\n        ".join(f"{col} = EXCLUDED.{col}" for col in UPSERT_COLUMNS if col != "item_id")
+    return f"""
+    INSERT INTO {table_name} ({columns})
+    SELECT {select} FROM {get_staging_table_name(table_name)}
+    ON CONFLICT (item_id) DO UPDATE SET
+        {updates},
+        last_updated_at = now()
+    WHERE {table_name}.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    """
+
+
+@lru_cache(maxsize=None)
+def get_pg_price_history_insert_sql(table_name: str) -> str:
+    return f"""
+    INSERT INTO {get_price_history_table_name(table_name)} (item_id, price, recorded_at)
+    VALUES %s
+    ON CONFLICT (item_id, recorded_at) DO UPDATE SET price = EXCLUDED.price
+    """
+
+
+def build_pg_tsquery(text: str) -> str:
+    # "M2 16gb 512" -> 'm2':* & '16gb':* & '512':*
+    tokens = re.findall(r"\w+", text.lower())
+    return " & ".join(f"'{token}':*" for token in tokens)
+
+
+# Те же запросы, что schema.QUERY_TEMPLATES, с параметрами psycopg2 (%(name)s)
+PG_QUERY_TEMPLATES = {
+    "below_price": """
+    SELECT * FROM {table_name}
+    WHERE price IS NOT NULL AND price < %(max_price)s
+    ORDER BY price
+    LIMIT %(limit)s
+    """,
+    "newest": """
+    SELECT * FROM {table_name}
+    ORDER BY parsed_at DESC NULLS LAST
+    LIMIT %(limit)s
+    """,
+    "by_seller": """
+    SELECT * FROM {table_name}
+    WHERE seller_url = %(seller_url)s
+    ORDER BY price
+    """,
+    "price_drops": """
+    WITH drops AS MATERIALIZED (
+        SELECT h.item_id, h.price, h.recorded_at,
+               (SELECT p.price FROM {history_table} p
+                WHERE p.item_id = h.item_id AND p.recorded_at < h.recorded_at
+                ORDER BY p.recorded_at DESC LIMIT 1) AS previous_price
+        FROM {history_table} h
+        WHERE h.recorded_at >= %(since)s
+          AND h.recorded_at = (SELECT MAX(l.recorded_at) FROM {history_table} l WHERE l.item_id = h.item_id)
+    )
+    SELECT t.*, d.previous_price, d.recorded_at AS dropped_at,
+           (d.previous_price - d.price)::float / d.previous_price AS drop_ratio
+    FROM drops d
+    JOIN {table_name} t ON t.item_id = d.item_id
+    WHERE d.previous_price > d.price AND (d.previous_price - d.price)::float / d.previous_price >= %(min_drop_ratio)s
+    ORDER BY drop_ratio DESC
+    LIMIT %(limit)s
+    """,
+    "published_since": """
+    SELECT * FROM {table_name}
+    WHERE published_at_ts >= %(published_at_ts)s
+    ORDER BY published_at_ts DESC
+    LIMIT %(limit)s
+    """,
+    "by_param_range": """
+    SELECT t.*, p.value AS param_value
+    FROM {params_table} p
+    JOIN {table_name} t ON t.item_id = p.item_id
+    WHERE p.key = %(key)s
+      AND (%(min_value)s::float IS NULL OR p.value_num >= %(min_value)s)
+      AND (%(max_value)s::float IS NULL OR p.value_num <= %(max_value)s)
+    ORDER BY t.price
+    LIMIT %(limit)s
+    """,
+    "price_stats_by_param": """
+    SELECT p.value AS value, COUNT(*) AS items, MIN(t.price) AS min_price,
+           AVG(t.price)::float AS avg_price, MAX(t.price) AS max_price, AVG(t.seller_rating_value) AS avg_seller_rating
+    FROM {params_table} p
+    JOIN {table_name} t ON t.item_id = p.item_id
+    WHERE p.key = %(key)s AND t.price IS NOT NULL
+    GROUP BY p.value
+    ORDER BY MIN(p.value_num), p.value
+    """,
+    "by_badge": """
+    SELECT t.* FROM {badges_table} b
+    JOIN {table_name} t ON t.item_id = b.item_id
+    WHERE b.badge = %(badge)s
+    ORDER BY t.price
+    LIMIT %(limit)s
+    """,
+    # rank со знаком минус: как у bm25 в SQLite, меньше - лучше
+    "search": """
+    SELECT t.*, -ts_rank(t.search_vector, q) AS rank
+    FROM {table_name} t, to_tsquery('simple', %(query)s) q
+    WHERE t.search_vector @@ q
+      AND (%(min_price)s::bigint IS NULL OR t.price >= %(min_price)s)
+      AND (%(max_price)s::bigint IS NULL OR t.price <= %(max_price)s)
+    ORDER BY rank
+    LIMIT %(limit)s
+    """,
+}
+
+
+@lru_cache(maxsize=None)
+def get_pg_query_sql(table_name: str, query: str) -> str:
+    return PG_QUERY_TEMPLATES[query].format(
+        table_name=table_name,
+        history_table=get_price_history_table_name(table_name),
+        params_table=get_params_table_name(table_name),
+        badges_table=get_badges_table_name(table_name),
+    )
@@ -0,0 +1,184 @@
+import io
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+try:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor, execute_values
+except ImportError:
+    psycopg2 = None
+
+from .config import POSTGRES_DSN, DEFAULT_SENT_ITEMS_TABLE
+from .schema import UPSERT_COLUMNS, get_params_table_name, get_badges_table_name
+from .normalize import get_param_rows, get_badge_rows
+from .pg_schema import *
+from .storage import StorageClient, ITEM_ID_INDEX
+
+# PostgresClient - хранилище StorageClient на PostgreSQL: общий сервер для нескольких воркеров загрузки
+# -- __init__ - подключается по DSN и создает таблицы категории и индекс просмотренных
+# -- create_category_table - таблица категории, история цен, параметры, бейджи и индексы (GIN для поиска)
+# -- create_sent_items_table - индекс просмотренных, заполняется уже известными объявлениями категории
+# -- _write_changes - пачка через COPY во временную таблицу и один INSERT ... ON CONFLICT, при сбое - построчно
+# -- _copy_rows - COPY строк пачки в staging в текстовом формате
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+class PostgresClient(StorageClient):
+
+    def __init__(self, dsn: str = POSTGRES_DSN, name_marker: str = None, sent_items_table: str = DEFAULT_SENT_ITEMS_TABLE):
+        if psycopg2 is None:
+            raise ImportError("Для бэкенда postgres нужен psycopg2: pip install 'avito-subscriber[postgres]'")
+        super().__init__(name_marker)
+        self.dsn = dsn
+        self.sent_items_table = sent_items_table
+        self.staging_table = get_staging_table_name(self.category_name)
+        self.merge_sql = get_pg_merge_sql(self.category_name)
+        self.price_history_sql = get_pg_price_history_insert_sql(self.category_name)
+
+        self.conn = psycopg2.connect(dsn)
+        print(f"Подключение к PostgreSQL установлено (категория: {self.category_name})")
+
+        self.create_category_table()
+        self.create_sent_items_table()
+        self.search_enabled = True
+
+    def close(self):
+        if self.conn and not self.conn.closed:
+            self.conn.close()
+            print("Соединение с PostgreSQL закрыто.")
+
+    #  --------SYSTEM TABLES----------------
+    def create_category_table(self):
+        with self.conn, self.conn.cursor() as cursor:
+            for ddl in get_pg_category_ddl(self.category_name):
+                cursor.execute(ddl)
+            cursor.execute(get_pg_staging_ddl(self.category_name))
+
+    def create_sent_items_table(self):
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(get_pg_sent_items_ddl(self.sent_items_table))
+            # Как в DatabaseClient: категория без индекса считается уже разосланной
+            cursor.execute(f"SELECT 1 FROM {self.sent_items_table} WHERE category = %s LIMIT 1", (self.name_marker,))
+            if cursor.fetchone() is None:
+                cursor.execute(
+                    f"INSERT INTO {self.sent_items_table} (category, item_id, sent_at) "
+                    f"SELECT %s, item_id, now() FROM {self.category_name} ON CONFLICT DO NOTHING",
+                    (self.name_marker,),
+                )
+                if cursor.rowcount:
+                    print(f"Индекс {self.sent_items_table} заполнен {cursor.rowcount} объявлениями из {self.category_name}")
+
+    #  ---------UPDATE/INSERT---------------
+    def _write_changes(self, changes: List[tuple], stats: Dict[str, int]):
+        try:
+            self._write_batch(changes)
+            for _, status, _ in changes:
+                stats[status] += 1
+            return
+        except Exception as e:
+            self.conn.rollback()
+            print(f"[ERROR] upsert_items: {e}. Повтор пачки построчно.")
+
+        # Ошибка в COPY/INSERT откатывает всю транзакцию PostgreSQL, поэтому каждая строка - отдельной транзакцией
+        for change in changes:
+            row, status, _ = change
+            try:
+                self._write_batch([change])
+                stats[status] += 1
+            except Exception as e:
+                self.conn.rollback()
+                print(f"[ERROR] upsert_items: item_id={row[ITEM_ID_INDEX]}: {e}")
+                stats["failed"] += 1
+
+    def _write_batch(self, changes: List[tuple]):
+        # ON CONFLICT не обновляет одну строку дважды за команду: из повторов item_id остается последний
+        rows = list({row[ITEM_ID_INDEX]: row for row, _, _ in changes}.values())
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        history = {
+            (item_id, recorded_at or now): (item_id, price, recorded_at or now)
+            for item_id, price, recorded_at in (history for _, _, history in changes if history)
+        }
+        item_ids = [row[ITEM_ID_INDEX] for row in rows]
+
+        with self.conn, self.conn.cursor() as cursor:
+            self._copy_rows(cursor, rows)
+            cursor.execute(self.merge_sql)
+            if history:
+                execute_values(cursor, self.price_history_sql, list(history.values()))
+
+            params_table = get_params_table_name(self.category_name)
+            badges_table = get_badges_table_name(self.category_name)
+            cursor.execute(f"DELETE FROM {params_table} WHERE item_id = ANY(%s)", (item_ids,))
+            cursor.execute(f"DELETE FROM {badges_table} WHERE item_id = ANY(%s)", (item_ids,))
+            params = [param for item_id, params, _ in map(self._side_values, rows) for param in get_param_rows(item_id, params)]
+            badges = [badge for item_id, _, badges in map(self._side_values, rows) for badge in get_badge_rows(item_id, badges)]
+            if params:
+                execute_values(cursor, f"INSERT INTO {params_table} (item_id, key, value, value_num) VALUES %s", params)
+            if badges:
+                execute_values(cursor, f"INSERT INTO {badges_table} (item_id, badge) VALUES %s", badges)
+
+    def _copy_rows(self, cursor, rows: List[tuple]):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        # Временная таблица создается заново, если соединение было переоткрыто
+        cursor.execute(get_pg_staging_ddl(self.category_name))
+        cursor.copy_expert(f"COPY {self.staging_table} ({', '.join(UPSERT_COLUMNS)}) FROM STDIN", buffer)
+
+    #  ---------SEEN/SENT INDEX---------------
+    def _load_seen_ids(self) -> set:
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(f"SELECT item_id FROM {self.sent_items_table} WHERE category = %s", (self.name_marker,))
+            return {row[0] for row in cursor}
+
+    def _select_seen_ids(self, item_ids: List[str]) -> set:
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT item_id FROM {self.sent_items_table} WHERE category = %s AND item_id = ANY(%s)",
+                (self.name_marker, item_ids),
+            )
+            return {row[0] for row in cursor}
+
+    def _insert_seen_ids(self, item_ids: List[str]):
+        with self.conn, self.conn.cursor() as cursor:
+            execute_values(
+                cursor,
+                f"INSERT INTO {self.sent_items_table} (category, item_id) VALUES %s ON CONFLICT DO NOTHING",
+                [(self.name_marker, item_id) for item_id in item_ids],
+            )
+
+    def _mark_sent_ids(self, item_ids: List[str]):
+        with self.conn, self.conn.cursor() as cursor:
+            execute_values(
+                cursor,
+                f"INSERT INTO {self.sent_items_table} (category, item_id, sent_at) VALUES %s "
+                f"ON CONFLICT (category, item_id) DO UPDATE SET sent_at = now()",
+                [(self.name_marker, item_id) for item_id in item_ids],
+                template="(%s, %s, now())",
+            )
+
+    #  ---------SELECT---------------
+    def _build_search_query(self, text: str) -> str:
+        return build_pg_tsquery(text)
+
+    def _fetch_rows(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self.conn, self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(get_pg_query_sql(self.category_name, query), params)
+            rows = [dict(row) for row in cursor]
+        for row in rows:
+            row.pop("search_vector", None)
+        return rows
+
+    def _select_existing_state(self, item_ids: List[str]) -> Dict[str, tuple]:
+        with self.conn, self.conn.cursor() as cursor:
+            cursor.execute(f"SELECT item_id, content_hash, price FROM {self.category_name} WHERE item_id = ANY(%s)", (item_ids,))
+            return {row[0]: (row[1], row[2]) for row in cursor}
@@ -1,5 +1,18 @@
+import re
+from functools import lru_cache
+from typing import List
+
 # get_items_table_ddl - возвращает DDL для создания таблицы объявлений
 # get_upsert_sql - возвращает SQL для операции UPSERT
+# get_sent_items_ddl - возвращает DDL индекса просмотренных/отправленных объявлений
+# get_price_history_ddl - возвращает DDL таблицы истории цен категории
+# get_price_history_insert_sql - возвращает SQL для записи точки истории цен
+# get_category_indexes_ddl - возвращает DDL индексов таблицы категории для запросов по цене, продавцу и свежести
+# get_side_tables_ddl - возвращает DDL побочных таблиц параметров и бейджей
+# get_fts_table_name - возвращает имя полнотекстового индекса таблицы категории
+# get_fts_ddl - возвращает DDL полнотекстового индекса FTS5 и триггеров синхронизации
+# build_fts_query - превращает поисковую строку пользователя в запрос FTS5
+# get_query_sql - возвращает SQL запроса чтения из QUERY_TEMPLATES для таблицы категории
 # generate_category_table_name - возвращает имя таблицы для конкретной категории
 
 def get_items_table_ddl(table_name: str = "items") -> str:
@@ -24,18 +37,30 @@ def get_items_table_ddl(table_name: str = "items") -> str:
         badges TEXT,  -- JSON string
         images TEXT,  -- JSON string
         params TEXT,  -- JSON string
+        content_hash TEXT,  -- хеш содержимого для пропуска неизменившихся строк
+        parsed_at_ts INTEGER,  -- unix-время парсинга
+        published_at_ts INTEGER,  -- unix-время публикации, вычисленное из published_date_text
+        seller_rating_value REAL,
         last_updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """.format(table_name=table_name)
 
 
-# Таблица для отслеживания отправленных уведомлений
-SENT_ITEMS_TABLE_DDL = """
-CREATE TABLE IF NOT EXISTS sent_items (
-    item_id TEXT PRIMARY KEY,
-    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-"""
+# Индекс просмотренных/отправленных объявлений: строка появляется, когда объявление впервые
+# отдано на уведомление (first_seen_at), sent_at проставляется после отправки
+def get_sent_items_ddl(table_name: str = "sent_items") -> str:
+    return """
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        category TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at TIMESTAMP,
+        PRIMARY KEY (category, item_id)
+    ) WITHOUT ROWID
+    """.format(table_name=table_name)
+
+
+SENT_ITEMS_TABLE_DDL = get_sent_items_ddl()
 
 # Схема колонок для операций вставки/обновления
 ITEM_COLUMNS = [
@@ -48,10 +73,43 @@ ITEM_COLUMNS = [
 # JSON поля для сериализации
 JSON_COLUMNS = ["badges", "images", "params"]
 
-# SQL шаблон для UPSERT операций
+# Колонки, не участвующие в content_hash: время парсинга и относительные тексты даты ("2 часа назад"),
+# которые меняются при каждом запуске. Вместо них в хеш входит published_at_ts с точностью до суток
+HASH_EXCLUDED_COLUMNS = ["parsed_at", "published_date_text", "phone_state"]
+HASH_PUBLISHED_AT_PRECISION = 86400
+
+# Типизированные колонки, вычисляемые из текстовых (normalize.py): фильтры и агрегаты по ним работают в SQLite
+NORMALIZED_COLUMNS = ["parsed_at_ts", "published_at_ts", "seller_rating_value"]
+
+# Колонки, передаваемые в UPSERT (нормализованные значения и content_hash вычисляются в DatabaseClient.prepare_item_data)
+UPSERT_COLUMNS = ITEM_COLUMNS + NORMALIZED_COLUMNS + ["content_hash"]
+
+# Колонки, добавленные после первой версии схемы: досоздаются в существующих таблицах
+MIGRATION_COLUMNS = {
+    "content_hash": "TEXT",
+    "parsed_at_ts": "INTEGER",
+    "published_at_ts": "INTEGER",
+    "seller_rating_value": "REAL",
+}
+
+# Версия схемы таблиц категорий:
+#   1 - исходная таблица объявлений,
+#   2 - нормализованные колонки и побочные таблицы параметров и бейджей (миграция заполняет их для старых строк)
+CATEGORY_SCHEMA_VERSION = 2
+
+SCHEMA_VERSIONS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS schema_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    migrated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# SQL шаблон для UPSERT операций (кешируется: строка зависит только от имени таблицы)
+@lru_cache(maxsize=None)
 def get_upsert_sql(table_name: str = "items") -> str:
-    columns = ', '.join(ITEM_COLUMNS)
-    placeholders = ', '.join('?' * len(ITEM_COLUMNS))
+    columns = ', '.join(UPSERT_COLUMNS)
+    placeholders = ', '.join('?' * len(UPSERT_COLUMNS))
     
     return """
     INSERT INTO {table_name} ({columns})
@@ -75,13 +133,231 @@ def get_upsert_sql(table_name: str = "items") -> str:
         badges               = excluded.badges,
         images               = excluded.images,
         params               = excluded.params,
+        parsed_at_ts         = excluded.parsed_at_ts,
+        published_at_ts      = excluded.published_at_ts,
+        seller_rating_value  = excluded.seller_rating_value,
+        content_hash         = excluded.content_hash,
         last_updated_at      = CURRENT_TIMESTAMP
+    WHERE {table_name}.content_hash IS NOT excluded.content_hash
     """.format(
             table_name=table_name,
             columns=columns,
             placeholders=placeholders
         )
 
+def get_price_history_table_name(table_name: str) -> str:
+    return f"{table_name}_price_history"
+
+
+# Компактная история цен: одна строка на изменение цены, без rowid
+def get_price_history_ddl(table_name: str = "items") -> str:
+    return """
+    CREATE TABLE IF NOT EXISTS {history_table} (
+        item_id TEXT NOT NULL,
+        price INTEGER NOT NULL,
+        recorded_at TEXT NOT NULL,
+        PRIMARY KEY (item_id, recorded_at)
+    ) WITHOUT ROWID
+    """.format(history_table=get_price_history_table_name(table_name))
+
+
+@lru_cache(maxsize=None)
+def get_price_history_insert_sql(table_name: str = "items") -> str:
+    return """
+    INSERT OR REPLACE INTO {history_table} (item_id, price, recorded_at)
+    VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    """.format(history_table=get_price_history_table_name(table_name))
+
+
+# Индексы под запросы DatabaseClient (CREATE INDEX IF NOT EXISTS - можно выполнять при каждом подключении)
+def get_category_indexes_ddl(table_name: str = "items") -> List[str]:
+    history_table = get_price_history_table_name(table_name)
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_price ON {table_name}(price)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_parsed_at ON {table_name}(parsed_at)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_seller_url ON {table_name}(seller_url)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_published_at_ts ON {table_name}(published_at_ts)",
+        f"CREATE INDEX IF NOT EXISTS idx_{history_table}_recorded_at ON {history_table}(recorded_at)",
+    ]
+
+
+def get_fts_table_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+# Полнотекстовый индекс по title/description с внешним содержимым: текст хранится только в таблице категории,
+# индекс обновляют триггеры, поэтому UPSERT из DatabaseClient синхронизирует его в той же транзакции.
+# Индекс ссылается на rowid таблицы категории: после VACUUM его нужно перестроить (DatabaseClient.rebuild_search_index)
+def get_fts_ddl(table_name: str = "items") -> List[str]:
+    fts_table = get_fts_table_name(table_name)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            title, description,
+            content='{table_name}', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table_name} BEGIN
+            INSERT INTO {fts_table}(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table_name} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF title, description ON {table_name}
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO {fts_table}(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+        END
+        """,
+    ]
+
+
+def build_fts_query(text: str) -> str:
+    # "M2 16gb 512" -> "m2"* AND "16gb"* AND "512"*: все слова обязательны, каждое как префикс
+    tokens = re.findall(r"\w+", text.lower())
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+
+# Запросы чтения (именованные параметры - общие с PostgreSQL, см. pg_schema.py): {table_name} - таблица категории, {history_table} - ее история цен, {fts_table} - ее FTS5 индекс,
+# {params_table} и {badges_table} - ее побочные таблицы
+QUERY_TEMPLATES = {
+    "below_price": """
+    SELECT * FROM {table_name}
+    WHERE price IS NOT NULL AND price < :max_price
+    ORDER BY price
+    LIMIT :limit
+    """,
+    "newest": """
+    SELECT * FROM {table_name}
+    ORDER BY parsed_at DESC
+    LIMIT :limit
+    """,
+    "by_seller": """
+    SELECT * FROM {table_name}
+    WHERE seller_url = :seller_url
+    ORDER BY price
+    """,
+    # Снижения цены с момента since: берется последняя точка истории объявления (текущая цена)
+    # и предыдущая; обе находятся по первичному ключу (item_id, recorded_at).
+    # MATERIALIZED (SQLite 3.35+): без него CTE подставляется в запрос и подзапрос previous_price
+    # вычисляется заново в каждом месте, где используется
+    "price_drops": """
+    WITH drops AS MATERIALIZED (
+        SELECT h.item_id, h.price, h.recorded_at,
+               (SELECT p.price FROM {history_table} p
+                WHERE p.item_id = h.item_id AND p.recorded_at < h.recorded_at
+                ORDER BY p.recorded_at DESC LIMIT 1) AS previous_price
+        FROM {history_table} h
+        WHERE h.recorded_at >= :since
+          AND h.recorded_at = (SELECT MAX(l.recorded_at) FROM {history_table} l WHERE l.item_id = h.item_id)
+    )
+    SELECT t.*, d.previous_price, d.recorded_at AS dropped_at,
+           1.0 * (d.previous_price - d.price) / d.previous_price AS drop_ratio
+    FROM drops d
+    JOIN {table_name} t ON t.item_id = d.item_id
+    WHERE d.previous_price > d.price AND 1.0 * (d.previous_price - d.price) / d.previous_price >= :min_drop_ratio
+    ORDER BY drop_ratio DESC
+    LIMIT :limit
+    """,
+    "published_since": """
+    SELECT * FROM {table_name}
+    WHERE published_at_ts >= :published_at_ts
+    ORDER BY published_at_ts DESC
+    LIMIT :limit
+    """,
+    # Диапазон по числовому значению параметра, например "Оперативная память" от 16 до 32
+    "by_param_range": """
+    SELECT t.*, p.value AS param_value
+    FROM {params_table} p
+    JOIN {table_name} t ON t.item_id = p.item_id
+    WHERE p.key = :key
+      AND (:min_value IS NULL OR p.value_num >= :min_value)
+      AND (:max_value IS NULL OR p.value_num <= :max_value)
+    ORDER BY t.price
+    LIMIT :limit
+    """,
+    "price_stats_by_param": """
+    SELECT p.value AS value, COUNT(*) AS items, MIN(t.price) AS min_price,
+           AVG(t.price) AS avg_price, MAX(t.price) AS max_price, AVG(t.seller_rating_value) AS avg_seller_rating
+    FROM {params_table} p
+    JOIN {table_name} t ON t.item_id = p.item_id
+    WHERE p.key = :key AND t.price IS NOT NULL
+    GROUP BY p.value
+    ORDER BY MIN(p.value_num), p.value
+    """,
+    "by_badge": """
+    SELECT t.* FROM {badges_table} b
+    JOIN {table_name} t ON t.item_id = b.item_id
+    WHERE b.badge = :badge
+    ORDER BY t.price
+    LIMIT :limit
+    """,
+    # Ранжирование bm25: совпадение в заголовке весит в 10 раз больше, чем в описании
+    "search": """
+    SELECT t.*, bm25({fts_table}, 10.0, 1.0) AS rank
+    FROM {fts_table}
+    JOIN {table_name} t ON t.rowid = {fts_table}.rowid
+    WHERE {fts_table} MATCH :query
+      AND (:min_price IS NULL OR t.price >= :min_price)
+      AND (:max_price IS NULL OR t.price <= :max_price)
+    ORDER BY rank
+    LIMIT :limit
+    """,
+}
+
+
+@lru_cache(maxsize=None)
+def get_query_sql(table_name: str, query: str) -> str:
+    return QUERY_TEMPLATES[query].format(
+        table_name=table_name,
+        history_table=get_price_history_table_name(table_name),
+        fts_table=get_fts_table_name(table_name),
+        params_table=get_params_table_name(table_name),
+        badges_table=get_badges_table_name(table_name),
+    )
+
+
+def get_params_table_name(table_name: str) -> str:
+    return f"{table_name}_params"
+
+
+def get_badges_table_name(table_name: str) -> str:
+    return f"{table_name}_badges"
+
+
+# Побочные таблицы JSON-колонок: параметр - строка (item_id, key, value, value_num), бейдж - строка (item_id, badge)
+def get_side_tables_ddl(table_name: str = "items") -> List[str]:
+    params_table = get_params_table_name(table_name)
+    badges_table = get_badges_table_name(table_name)
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {params_table} (
+            item_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            value_num REAL,  -- число в начале значения: "16 ГБ" -> 16
+            PRIMARY KEY (item_id, key)
+        ) WITHOUT ROWID
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{params_table}_key_num ON {params_table}(key, value_num)",
+        f"CREATE INDEX IF NOT EXISTS idx_{params_table}_key_value ON {params_table}(key, value)",
+        f"""
+        CREATE TABLE IF NOT EXISTS {badges_table} (
+            item_id TEXT NOT NULL,
+            badge TEXT NOT NULL,
+            PRIMARY KEY (item_id, badge)
+        ) WITHOUT ROWID
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{badges_table}_badge ON {badges_table}(badge)",
+    ]
+
+
 def generate_category_table_name(category_name: str) -> str:
     safe_name = category_name.lower().replace('-', '_').replace(' ', '_')
     return f"category_{safe_name}" 
\ No newline at end of file
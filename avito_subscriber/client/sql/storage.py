@@ -0,0 +1,293 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import DEFAULT_UPSERT_BATCH_SIZE, DEFAULT_STORAGE_BACKEND, STORAGE_BACKENDS
+from .schema import (
+    ITEM_COLUMNS, JSON_COLUMNS, HASH_EXCLUDED_COLUMNS, HASH_PUBLISHED_AT_PRECISION, UPSERT_COLUMNS, generate_category_table_name,
+)
+from .normalize import parse_rating, parse_timestamp, parse_published_date
+
+# StorageClient - интерфейс хранилища объявлений категории; общая логика не зависит от СУБД
+# -- upsert_item / upsert_items - пакетная вставка/обновление: классификация строк здесь, запись - в _write_changes бэкенда
+# -- prepare_item_data - строка UPSERT_COLUMNS: JSON-колонки, нормализованные значения, content_hash
+# -- get_known_item_ids - ID из переданных, которые уже есть в таблице категории
+# -- filter_new_item_ids / claim_new_items / mark_items_sent - индекс просмотренных с множеством ID в памяти
+# -- get_items_below_price, get_newest_items, ..., search_items - запросы чтения по шаблонам бэкенда
+# create_storage_client - создает клиент выбранного бэкенда (sqlite | postgres)
+
+ITEM_ID_INDEX = UPSERT_COLUMNS.index("item_id")
+PARSED_AT_INDEX = UPSERT_COLUMNS.index("parsed_at")
+PRICE_INDEX = UPSERT_COLUMNS.index("price")
+CONTENT_HASH_INDEX = UPSERT_COLUMNS.index("content_hash")
+PARAMS_INDEX = UPSERT_COLUMNS.index("params")
+BADGES_INDEX = UPSERT_COLUMNS.index("badges")
+
+
+def compute_content_hash(values: List[Any], published_at_ts: Optional[int] = None) -> str:
+    # parsed_at и "N часов назад" меняются при каждом запуске и не должны считаться изменением объявления;
+    # дата публикации сравнивается по суткам: пересчет относительного текста дает погрешность в пределах его единицы
+    payload = [value for col, value in zip(ITEM_COLUMNS, values) if col not in HASH_EXCLUDED_COLUMNS]
+    payload.append(published_at_ts // HASH_PUBLISHED_AT_PRECISION if published_at_ts is not None else None)
+    return hashlib.blake2b(json.dumps(payload, ensure_ascii=False).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class StorageClient(ABC):
+
+    def __init__(self, name_marker: str):
+        self.name_marker = name_marker
+        self.category_name = generate_category_table_name(name_marker)
+        self._seen_ids: Optional[set] = None # ID категории из индекса просмотренных, загружаются при первом обращении
+        self.search_enabled = False
+
+    #  ---------BACKEND---------------
+    @abstractmethod
+    def _write_changes(self, changes: List[tuple], stats: Dict[str, int]):
+        """Записывает изменившиеся строки пачки (row, status, history) и учитывает их в stats (inserted/updated/failed)."""
+
+    @abstractmethod
+    def _select_existing_state(self, item_ids: List[str]) -> Dict[str, tuple]:
+        """item_id -> (content_hash, price) для уже сохраненных объявлений."""
+
+    @abstractmethod
+    def _fetch_rows(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Выполняет запрос query из шаблонов бэкенда с именованными параметрами."""
+
+    @abstractmethod
+    def _build_search_query(self, text: str) -> str:
+        """Поисковая строка пользователя -> запрос полнотекстового индекса бэкенда."""
+
+    @abstractmethod
+    def _load_seen_ids(self) -> set:
+        pass
+
+    @abstractmethod
+    def _select_seen_ids(self, item_ids: List[str]) -> set:
+        pass
+
+    @abstractmethod
+    def _insert_seen_ids(self, item_ids: List[str]):
+        pass
+
+    @abstractmethod
+    def _mark_sent_ids(self, item_ids: List[str]):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    #  ---------UPDATE/INSERT---------------
+    def upsert_item(self, item_data) -> bool:
+        stats = self.upsert_items([item_data], batch_size=1)
+        return bool(stats) and stats[0]["failed"] == 0
+
+    def upsert_items(self, items: Iterable[dict], batch_size: int = DEFAULT_UPSERT_BATCH_SIZE) -> List[Dict[str, int]]:
+        """
+        Пакетный UPSERT: каждая пачка из batch_size объявлений пишется одной транзакцией.
+        Неизменившиеся объявления (тот же content_hash) не перезаписываются,
+        изменения цены попадают в таблицу истории цен.
+        Возвращает счетчики inserted/updated/unchanged/failed по каждой пачке.
+        """
+        batch_stats = []
+        items = iter(items)
+
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+
+            stats = {"batch": len(batch_stats) + 1, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+            rows = []
+            for item_data in batch:
+                if not item_data.get("item_id"):
+                    stats["failed"] += 1
+                    continue
+                rows.append(tuple(self.prepare_item_data(item_data)))
+
+            if rows:
+                changes = self._classify_rows(rows)
+                stats["unchanged"] += sum(1 for _, status, _ in changes if status == "unchanged")
+                changes = [change for change in changes if change[1] != "unchanged"]
+                if changes:
+                    self._write_changes(changes, stats)
+            batch_stats.append(stats)
+
+        return batch_stats
+
+    def _classify_rows(self, rows: List[tuple]) -> List[tuple]:
+        """Сравнивает строки пачки с сохраненными: (row, inserted|updated|unchanged, строка истории цены или None)."""
+        known = self._select_existing_state([row[ITEM_ID_INDEX] for row in rows])
+        changes = []
+        for row in rows:
+            item_id, price = row[ITEM_ID_INDEX], row[PRICE_INDEX]
+            previous = known.get(item_id)
+
+            if previous is None:
+                status = "inserted"
+            elif previous[0] == row[CONTENT_HASH_INDEX]:
+                status = "unchanged"
+            else:
+                status = "updated"
+
+            price_changed = price is not None and (previous is None or previous[1] != price)
+            history = (item_id, price, row[PARSED_AT_INDEX]) if price_changed else None
+
+            changes.append((row, status, history))
+            known[item_id] = (row[CONTENT_HASH_INDEX], price)
+        return changes
+
+    @staticmethod
+    def _side_values(row: tuple) -> tuple:
+        return row[ITEM_ID_INDEX], row[PARAMS_INDEX], row[BADGES_INDEX]
+
+    def prepare_item_data(self, item_data: dict) -> List[Any]:
+        values = []
+        for col in ITEM_COLUMNS:
+            value = item_data.get(col)
+            if col in JSON_COLUMNS and value is not None:
+                try:
+                    values.append(json.dumps(value, ensure_ascii=False))
+                except TypeError as e:
+                    print(f"Ошибка сериализации JSON для колонки '{col}': {e}. Сохраняем как NULL.")
+                    values.append(None)
+            else:
+                values.append(value)
+        parsed_at = item_data.get("parsed_at")
+        published_at_ts = parse_published_date(item_data.get("published_date_text"), parsed_at)
+        content_hash = compute_content_hash(values, published_at_ts)
+        values.extend([
+            parse_timestamp(parsed_at),
+            published_at_ts,
+            parse_rating(item_data.get("seller_rating")),
+        ])
+        values.append(content_hash)
+        return values
+
+    #  ---------SEEN/SENT INDEX---------------
+    def _get_seen_ids(self) -> set:
+        if self._seen_ids is None:
+            self._seen_ids = self._load_seen_ids()
+        return self._seen_ids
+
+    def filter_new_item_ids(self, item_ids: Iterable[str]) -> List[str]:
+        """
+        Возвращает ID (в исходном порядке, без повторов), которых нет в индексе просмотренных.
+        Известные ID отсекаются множеством в памяти; оставшиеся кандидаты проверяются одним
+        запросом к БД, так как индекс мог пополнить другой процесс.
+        """
+        seen = self._get_seen_ids()
+        candidates = [item_id for item_id in dict.fromkeys(item_ids) if item_id and item_id not in seen]
+        if not candidates:
+            return []
+
+        indexed = self._select_seen_ids(candidates)
+        seen.update(indexed)
+        return [item_id for item_id in candidates if item_id not in indexed]
+
+    def claim_new_items(self, items: Iterable[dict]) -> List[dict]:
+        """Возвращает объявления, которых еще нет в индексе, и отмечает их просмотренными (sent_at пуст до отправки)."""
+        items = list(items)
+        new_ids = self.filter_new_item_ids(item.get("item_id") for item in items)
+        if not new_ids:
+            return []
+
+        self._insert_seen_ids(new_ids)
+        self._seen_ids.update(new_ids)
+
+        pending = set(new_ids)
+        new_items = []
+        for item in items:
+            if item.get("item_id") in pending:
+                pending.discard(item["item_id"])
+                new_items.append(item)
+        return new_items
+
+    def mark_items_sent(self, item_ids: Iterable[str]) -> int:
+        item_ids = list(item_ids)
+        self._mark_sent_ids(item_ids)
+        self._get_seen_ids().update(item_ids)
+        return len(item_ids)
+
+    #  ---------QUERIES---------------
+    def get_known_item_ids(self, item_ids: Iterable[str]) -> set:
+        item_ids = list(item_ids)
+        if not item_ids:
+            return set()
+        return set(self._select_existing_state(item_ids))
+
+    def get_items_below_price(self, max_price: int, limit: int = 100) -> List[Dict[str, Any]]:
+        return self._fetch_items("below_price", {"max_price": max_price, "limit": limit})
+
+    def get_newest_items(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return self._fetch_items("newest", {"limit": limit})
+
+    def get_items_by_seller(self, seller_url: str) -> List[Dict[str, Any]]:
+        return self._fetch_items("by_seller", {"seller_url": seller_url})
+
+    def get_price_drop_candidates(self, since: str = "", min_drop_ratio: float = 0.0, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Объявления, чья текущая цена ниже предыдущей точки истории, с наибольшим снижением первыми.
+        since - нижняя граница recorded_at снижения (строка в формате parsed_at), min_drop_ratio - доля от 0 до 1.
+        В результате дополнительно previous_price, dropped_at и drop_ratio.
+        """
+        return self._fetch_items("price_drops", {"since": since, "min_drop_ratio": min_drop_ratio, "limit": limit})
+
+    def get_items_published_since(self, published_at_ts: int, limit: int = 100) -> List[Dict[str, Any]]:
+        return self._fetch_items("published_since", {"published_at_ts": published_at_ts, "limit": limit})
+
+    def get_items_by_param(self, key: str, min_value: float = None, max_value: float = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Объявления, у которых числовое значение параметра key в диапазоне, например ("Память", 16, 32)."""
+        return self._fetch_items("by_param_range", {"key": key, "min_value": min_value, "max_value": max_value, "limit": limit})
+
+    def get_price_stats_by_param(self, key: str) -> List[Dict[str, Any]]:
+        """Количество и цены (min/avg/max) объявлений по каждому значению параметра key."""
+        return self._fetch_rows("price_stats_by_param", {"key": key})
+
+    def get_items_by_badge(self, badge: str, limit: int = 100) -> List[Dict[str, Any]]:
+        return self._fetch_items("by_badge", {"badge": badge, "limit": limit})
+
+    def search_items(self, text: str, min_price: int = None, max_price: int = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Ищет объявления, в заголовке или описании которых есть все слова text (как префиксы),
+        например "m2 16gb 512". Результат отсортирован по релевантности (поле rank, меньше - лучше).
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Полнотекстовый поиск недоступен для этой базы данных")
+        query = self._build_search_query(text)
+        if not query:
+            return []
+        return self._fetch_items("search", {"query": query, "min_price": min_price, "max_price": max_price, "limit": limit})
+
+    def _fetch_items(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [self._decode_item(row) for row in self._fetch_rows(query, params)]
+
+    @staticmethod
+    def _decode_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        # SQLite возвращает JSON-колонки строками, PostgreSQL (JSONB) - уже разобранными
+        for col in JSON_COLUMNS:
+            if isinstance(item.get(col), str):
+                try:
+                    item[col] = json.loads(item[col])
+                except ValueError:
+                    pass
+        return item
+
+
+def create_storage_client(name_marker: str, backend: str = DEFAULT_STORAGE_BACKEND, **kwargs) -> StorageClient:
+    """Клиент хранилища категории: "sqlite" - DatabaseClient (файл БД), "postgres" - PostgresClient (DSN из конфигурации)."""
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд хранилища: {backend}. Доступны: {', '.join(STORAGE_BACKENDS)}")
+    if backend == "postgres":
+        from .postgres import PostgresClient
+        return PostgresClient(name_marker=name_marker, **kwargs)
+    from .SQLight import DatabaseClient
+    return DatabaseClient(name_marker=name_marker, **kwargs)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('.')
+
+import pytest
+
+from avito_subscriber.client.sql.config import POSTGRES_DSN
+from avito_subscriber.client.sql.postgres import PostgresClient, psycopg2
+
+CATEGORY = "integration_test"
+
+
+def make_item(item_id: str, price: int, parsed_at: str, title: str = "macbook pro 14 m2 16gb 512") -> dict:
+    return {
+        "item_id": item_id,
+        "parsed_at": parsed_at,
+        "title": title,
+        "price": price,
+        "url": f"https://avito.ru/moskva/noutbuki/item_{item_id}",
+        "seller_url": "https://avito.ru/brands/seller",
+        "description": "отличное состояние, полный комплект",
+        "published_date_text": "2 часа назад",
+        "seller_rating": "4,8",
+        "badges": ["Надёжный продавец"],
+        "images": [],
+        "params": {"Оперативная память": "16 ГБ", "Процессор": "Apple M2"},
+    }
+
+
+def test_postgres():
+    """PostgresClient на сервере из AVITO_POSTGRES_DSN (docker-compose.postgres.yaml)"""
+    if psycopg2 is None:
+        pytest.skip("psycopg2 не установлен")
+    try:
+        psycopg2.connect(POSTGRES_DSN, connect_timeout=3).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL недоступен: {e}")
+
+    with PostgresClient(name_marker=CATEGORY) as db:
+        with db.conn, db.conn.cursor() as cursor:
+            for table in ("", "_price_history", "_params", "_badges"):
+                cursor.execute(f"TRUNCATE {db.category_name}{table}")
+            cursor.execute(f"DELETE FROM {db.sent_items_table} WHERE category = %s", (CATEGORY,))
+        db._seen_ids = None
+
+        items = [make_item(str(n), 100000 + n, "2026-01-01T12:00:00") for n in range(100)]
+        [stats] = db.upsert_items(items, batch_size=100)
+        assert (stats["inserted"], stats["updated"], stats["unchanged"], stats["failed"]) == (100, 0, 0, 0)
+
+        # Повтор той же пачки ничего не пишет, снижение цены попадает в историю
+        [stats] = db.upsert_items(items, batch_size=100)
+        assert stats["unchanged"] == 100
+        [stats] = db.upsert_items([make_item("7", 80000, "2026-01-02T12:00:00")])
+        assert stats["updated"] == 1
+
+        drops = db.get_price_drop_candidates(since="2026-01-02")
+        assert [item["item_id"] for item in drops] == ["7"]
+        assert drops[0]["previous_price"] == 100007
+
+        assert db.get_items_below_price(90000)[0]["params"]["Процессор"] == "Apple M2"
+        assert len(db.search_items("m2 16gb", max_price=100050, limit=100)) == 51
+        assert len(db.get_items_by_param("Оперативная память", 16, 16)) == 100
+        assert len(db.get_items_by_badge("Надёжный продавец")) == 100
+
+        assert len(db.claim_new_items(items[:10])) == 10
+        assert db.claim_new_items(items[:20]) == items[10:20]
+        print("PostgreSQL работает")
+
+
+if __name__ == "__main__":
+    test_postgres()
+    print("Тесты завершены")
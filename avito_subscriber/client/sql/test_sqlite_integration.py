@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('.')
+
+import json
+import sqlite3
+
+import pytest
+
+from avito_subscriber.client.sql.SQLight import DatabaseClient
+from avito_subscriber.client.sql.schema import CATEGORY_SCHEMA_VERSION, generate_category_table_name
+from avito_subscriber.client.sql.normalize import parse_timestamp
+
+CATEGORY = "migration_test"
+
+# Таблица категории версии 1 - как ее создавала исходная схема, до нормализованных колонок и побочных таблиц
+V1_TABLE_DDL = """
+CREATE TABLE {table_name} (
+    item_id TEXT PRIMARY KEY,
+    parsed_at TEXT,
+    title TEXT,
+    price INTEGER,
+    price_text TEXT,
+    url TEXT UNIQUE,
+    seller_url TEXT,
+    description TEXT,
+    published_date_text TEXT,
+    phone_state TEXT,
+    condition TEXT,
+    location TEXT,
+    seller_name TEXT,
+    seller_rating TEXT,
+    seller_reviews_count INTEGER,
+    seller_reviews_text TEXT,
+    badges TEXT,
+    images TEXT,
+    params TEXT,
+    last_updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def create_v1_database(db_path: str, rows: int = 20):
+    table_name = generate_category_table_name(CATEGORY)
+    conn = sqlite3.connect(db_path)
+    conn.execute(V1_TABLE_DDL.format(table_name=table_name))
+    conn.executemany(
+        f"INSERT INTO {table_name} (item_id, parsed_at, title, price, url, published_date_text, seller_rating, badges, params) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (str(n), "2026-01-01T12:00:00", f"macbook pro {n}", 100000 + n, f"https://avito.ru/item_{n}", "2 часа назад", "4,8",
+             json.dumps(["Надёжный продавец"], ensure_ascii=False),
+             json.dumps({"Оперативная память": f"{8 * (1 + n % 2)} ГБ"}, ensure_ascii=False))
+            for n in range(rows)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_schema_version(db: DatabaseClient) -> int:
+    row = db.conn.execute("SELECT version FROM schema_versions WHERE table_name = ?", (db.category_name,)).fetchone()
+    return row[0] if row else 1
+
+
+def test_migrate_v1_table(tmp_path):
+    """Таблица версии 1 при подключении заполняет нормализованные колонки и таблицы параметров и бейджей"""
+    db_path = str(tmp_path / "avito.db")
+    create_v1_database(db_path)
+
+    with DatabaseClient(db_path=db_path, name_marker=CATEGORY) as db:
+        assert get_schema_version(db) == CATEGORY_SCHEMA_VERSION
+        row = db.conn.execute(
+            f"SELECT parsed_at_ts, published_at_ts, seller_rating_value FROM {db.category_name} WHERE item_id = '3'"
+        ).fetchone()
+        assert row["parsed_at_ts"] == parse_timestamp("2026-01-01T12:00:00")
+        assert row["published_at_ts"] == row["parsed_at_ts"] - 2 * 3600
+        assert row["seller_rating_value"] == 4.8
+        assert len(db.get_items_by_param("Оперативная память", 16, 16)) == 10
+        assert len(db.get_items_by_badge("Надёжный продавец")) == 20
+
+    # Повторное подключение не мигрирует таблицу заново
+    with DatabaseClient(db_path=db_path, name_marker=CATEGORY) as db:
+        assert get_schema_version(db) == CATEGORY_SCHEMA_VERSION
+    print("Миграция v1 -> v2 работает")
+
+
+def test_migration_rollback(tmp_path, monkeypatch):
+    """Сбой заполнения откатывает миграцию целиком: версия прежняя, соединение не остается в транзакции"""
+    db_path = str(tmp_path / "avito.db")
+    create_v1_database(db_path)
+
+    with DatabaseClient(db_path=db_path, name_marker=CATEGORY) as db:
+        db.conn.execute("DELETE FROM schema_versions")
+        db.conn.execute(f"UPDATE {db.category_name} SET parsed_at_ts = NULL")
+
+        def fail(items):
+            raise sqlite3.OperationalError("сбой заполнения")
+
+        monkeypatch.setattr(db, "_replace_side_rows", fail)
+        with pytest.raises(sqlite3.OperationalError):
+            db.migrate_category_table()
+        monkeypatch.undo()
+
+        assert not db.conn.in_transaction
+        assert get_schema_version(db) == 1
+        assert db.conn.execute(f"SELECT COUNT(*) FROM {db.category_name} WHERE parsed_at_ts IS NOT NULL").fetchone()[0] == 0
+
+        # Соединение пригодно для записи и повторной миграции
+        [stats] = db.upsert_items([{"item_id": "100", "parsed_at": "2026-01-02T12:00:00", "title": "macbook air",
+                                    "price": 50000, "url": "https://avito.ru/item_100"}])
+        assert stats["inserted"] == 1
+        db.migrate_category_table()
+        assert get_schema_version(db) == CATEGORY_SCHEMA_VERSION
+    print("Откат миграции работает")
+
+
+def test_relative_date_text_is_unchanged(tmp_path):
+    """Повторный скрейпинг с другим относительным текстом даты не переписывает объявление"""
+    item = {"item_id": "1", "parsed_at": "2026-01-01T12:00:00", "title": "macbook pro", "price": 100000,
+            "url": "https://avito.ru/item_1", "published_date_text": "2 часа назад", "phone_state": "2 часа назад"}
+    rescraped = {**item, "parsed_at": "2026-01-01T13:20:00", "published_date_text": "3 часа назад", "phone_state": "3 часа назад"}
+
+    with DatabaseClient(db_path=str(tmp_path / "avito.db"), name_marker=CATEGORY) as db:
+        [stats] = db.upsert_items([item])
+        assert stats["inserted"] == 1
+        [stats] = db.upsert_items([rescraped])
+        assert (stats["unchanged"], stats["updated"]) == (1, 0)
+
+        # Поднятое объявление (другая дата публикации) и изменение полей считаются изменением
+        [stats] = db.upsert_items([{**rescraped, "published_date_text": "5 дней назад"}])
+        assert stats["updated"] == 1
+        [stats] = db.upsert_items([{**rescraped, "published_date_text": "5 дней назад", "price": 90000}])
+        assert stats["updated"] == 1
+    print("Относительная дата не меняет content_hash")
+
+
+
+def test_row_fallback_rolls_back_partial_writes(tmp_path, monkeypatch):
+    """Построчный повтор пачки: сбой побочных таблиц откатывает и строку объявления"""
+    items = [{"item_id": str(n), "parsed_at": "2026-01-01T12:00:00", "title": f"macbook {n}", "price": 100000 + n,
+              "url": f"https://avito.ru/item_{n}", "params": {"Память": "16 ГБ"}} for n in range(5)]
+
+    with DatabaseClient(db_path=str(tmp_path / "avito.db"), name_marker=CATEGORY) as db:
+        replace_side_rows = db._replace_side_rows
+
+        def fail_on_item_2(side_items):
+            if any(item_id == "2" for item_id, _, _ in side_items):
+                raise sqlite3.IntegrityError("сбой побочной таблицы")
+            replace_side_rows(side_items)
+
+        monkeypatch.setattr(db, "_replace_side_rows", fail_on_item_2)
+        [stats] = db.upsert_items(items)
+        assert (stats["inserted"], stats["failed"]) == (4, 1)
+        assert not db.conn.in_transaction
+
+        stored = {row[0] for row in db.conn.execute(f"SELECT item_id FROM {db.category_name}")}
+        assert stored == {"0", "1", "3", "4"}
+        assert len(db.get_items_by_param("Память", 16, 16)) == 4
+    print("Построчный повтор не оставляет частичных записей")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк аналитики по истории запусков: средняя цена по дням из всех avito_items_*.jsonl
+против того же запроса по Parquet-датасету (export_all_runs + read_dataset).
+
+Запуск:
+    python -m avito_subscriber.parser.bench_export [runs] [items_per_run]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from .export import export_all_runs, read_dataset
+from .utils import get_parsed_file_path, iter_parsed_items
+
+CATEGORY = "macbook_pro"
+SELLERS = 3000
+LOCATIONS = ["Москва, м. Тверская", "Москва, м. Арбатская", "Москва, м. Сокол", "Химки", "Мытищи", "Люберцы"]
+
+
+def write_runs(runs: int, items_per_run: int):
+    first_day = date(2025, 1, 1)
+    for run in range(runs):
+        day = first_day + timedelta(days=run)
+        time_marker = f"{day:%Y%m%d}_120000"
+        path = get_parsed_file_path(time_marker, CATEGORY)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(items_per_run):
+                item_id = 4000000000 + (run * 37 + i) % (items_per_run * 4)
+                price = 50000 + (item_id * 7919) % 200000 - run * 50
+                f.write(json.dumps({
+                    "timestamp": f"{day.isoformat()}T12:{i % 60:02d}:00",
+                    "data": {
+                        "item_id": str(item_id),
+                        "title": f"MacBook Pro 14 M{item_id % 4} 16/512",
+                        "price": price,
+                        "price_text": f"{price} ₽",
+                        "url": f"https://avito.ru/moskva/noutbuki/macbook_pro_{item_id}",
+                        "seller_url": f"https://avito.ru/brands/seller_{item_id % SELLERS}",
+                        "seller_name": f"Продавец {item_id % SELLERS}",
+                        "seller_rating": "4,8",
+                        "description": f"Описание объявления {item_id}, отличное состояние, полный комплект",
+                        "date": f"{i % 23 + 1} часа назад",
+                        "state": "Б/у",
+                        "location": LOCATIONS[item_id % len(LOCATIONS)],
+                        "badges": ["Надёжный продавец"],
+                        "images": [f"https://00.img.avito.st/image/{item_id}_1.jpg"],
+                        "params": {"Диагональ": '14"', "Память": "16 ГБ"},
+                    },
+                }, ensure_ascii=False) + "\n")
+
+
+def avg_price_from_json() -> dict:
+    totals = defaultdict(lambda: [0, 0])
+    for run_dir in os.listdir("data/parsed"):
+        time_marker = "_".join(run_dir.split("_")[:2])
+        for entry in iter_parsed_items(get_parsed_file_path(time_marker, CATEGORY)):
+            total = totals[time_marker[:8]]
+            total[0] += entry["data"]["price"]
+            total[1] += 1
+    return {day: price / count for day, (price, count) in totals.items()}
+
+
+def avg_price_from_dataset() -> dict:
+    table = read_dataset(category=CATEGORY, columns=["date", "price"])
+    grouped = table.group_by("date").aggregate([("price", "mean")])
+    return dict(zip(grouped["date"].to_pylist(), grouped["price_mean"].to_pylist()))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    items_per_run = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        write_runs(runs, items_per_run)
+        json_size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk("data/parsed") for name in names)
+
+        started = time.perf_counter()
+        export_all_runs()
+        export_elapsed = time.perf_counter() - started
+        dataset_size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk("data/dataset") for name in names)
+
+        started = time.perf_counter()
+        from_json = avg_price_from_json()
+        json_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        from_dataset = avg_price_from_dataset()
+        dataset_elapsed = time.perf_counter() - started
+
+        os.chdir("/")
+
+    assert len(from_json) == len(from_dataset) == runs
+    print(f"\nЗапусков: {runs}, объявлений в запуске: {items_per_run}")
+    print(f"JSONL: {json_size / 2**20:.1f} МБ, Parquet: {dataset_size / 2**20:.1f} МБ (x{json_size / dataset_size:.1f}), выгрузка {export_elapsed:.1f} сек")
+    print(f"Средняя цена по дням: JSONL {json_elapsed:.2f} сек, Parquet {dataset_elapsed:.3f} сек, x{json_elapsed / dataset_elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк извлечения объявлений: повторный парсинг str(item) против работы с готовым узлом.
+
+Запуск:
+    python -m avito_subscriber.parser.bench_parser                 # синтетические страницы
+    python -m avito_subscriber.parser.bench_parser data/raw/<run>  # реальные items_page_N.html
+"""
+
+import json
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from .parser import SELECTORS, extract_item_data, extract_item_node, resolve_parser_backend
+
+CARD_TEMPLATE = """
+<div class="iva-item-root-XBsVL" data-marker="item" data-item-id="{item_id}" id="i{item_id}">
+  <meta itemprop="description" content="Описание   объявления {item_id}&#10;в  несколько строк &amp; символы"/>
+  <div class="iva-item-body">
+    <a data-marker="item-title" href="/moskva/noutbuki/macbook_pro_{item_id}?context=abc">MacBook Pro 14 M{n} 16/512</a>
+    <p data-marker="item-price"><meta itemprop="price" content="{price}"/>{price_text}&nbsp;₽</p>
+    <div class="iva-item-autoParamsStep-QxatK"><p data-marker="item-specific-params">Б/у</p></div>
+    <div data-marker="item-params"><div>Диагональ: 14"</div><div>Память: 16 ГБ</div></div>
+    <div data-marker="item-address"><span>Москва, м. Тверская</span></div>
+    <p data-marker="item-date">{n} часа назад</p>
+    <div data-marker="item-date">{n} часа назад</div>
+    <div class="SnippetLayout-root-zT1oI"><span class="SnippetBadge-title-NCaUc">Надёжный продавец</span></div>
+    <div class="style-root-Dh2i5">
+      <a href="/brands/seller_{n}?src=search_seller_info">
+        <div data-marker="seller-info/name">Продавец {n}</div>
+      </a>
+      <span data-marker="seller-info/score">4,{n}</span>
+      <p data-marker="seller-info/summary">{reviews} отзывов</p>
+    </div>
+    <img src="https://00.img.avito.st/image/1/items/{item_id}_1.jpg"/>
+    <img src="https://00.img.avito.st/image/1/items/{item_id}_2.jpg"/>
+  </div>
+</div>
+"""
+
+
+def build_synthetic_page(page_num: int, cards_per_page: int = 50) -> str:
+    cards = []
+    for i in range(cards_per_page):
+        item_id = 4000000000 + page_num * 1000 + i
+        price = 50000 + i * 1000
+        cards.append(CARD_TEMPLATE.format(
+            item_id=item_id,
+            n=i % 10,
+            price=price,
+            price_text=f"{price:,}".replace(",", "\xa0"),
+            reviews=i * 7,
+        ))
+    return f'<div class="items-items-zOkHg">{"".join(cards)}</div>'
+
+
+def load_pages(data_dir: str = None, pages: int = 20) -> list:
+    if not data_dir:
+        return [build_synthetic_page(n) for n in range(1, pages + 1)]
+    html_files = sorted(f for f in os.listdir(data_dir) if f.endswith('.html'))
+    result = []
+    for html_file in html_files:
+        with open(os.path.join(data_dir, html_file), 'r', encoding='utf-8') as f:
+            result.append(f.read())
+    return result
+
+
+def run_reparse(pages: list) -> list:
+    result = []
+    for html_content in pages:
+        soup = BeautifulSoup(html_content, 'html.parser')
+        for item in soup.select(SELECTORS["item_container"]):
+            result.append(extract_item_data(str(item)))
+    return result
+
+
+def run_node(pages: list, backend: str = "html.parser") -> list:
+    result = []
+    for html_content in pages:
+        soup = BeautifulSoup(html_content, backend)
+        for item in soup.select(SELECTORS["item_container"]):
+            result.append(extract_item_node(item.extract()))
+    return result
+
+
+def dump_without_timestamps(items: list) -> str:
+    return json.dumps([item["data"] for item in items], ensure_ascii=False, indent=2)
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    pages = load_pages(data_dir)
+    print(f"Страниц: {len(pages)}")
+
+    modes = [
+        ("reparse (str(item))", lambda: run_reparse(pages)),
+        ("node / html.parser", lambda: run_node(pages, "html.parser")),
+    ]
+    if resolve_parser_backend("lxml") == "lxml":
+        modes.append(("node / lxml", lambda: run_node(pages, "lxml")))
+
+    baseline = None
+    for name, func in modes:
+        start = time.perf_counter()
+        items = func()
+        elapsed = time.perf_counter() - start
+        output = dump_without_timestamps(items)
+        if baseline is None:
+            baseline = (output, elapsed)
+            verdict = "эталон"
+        else:
+            verdict = "JSON идентичен" if output == baseline[0] else "JSON ОТЛИЧАЕТСЯ"
+        print(f"{name:<22} {len(items):>6} объявлений  {elapsed:8.3f} сек  x{baseline[1] / elapsed:5.2f}  {verdict}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from .utils import get_latest_directory, find_parsed_file, iter_parsed_items
+from avito_subscriber.client.sql.normalize import parse_rating, parse_published_date
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# export_parsed_run - выгружает результат парсинга запуска в колоночный датасет category=<категория>/date=<дата запуска>
+# export_all_runs - дописывает в датасет все запуски из data/parsed, которых в нем еще нет
+# read_dataset - читает датасет с отбором по категории и диапазону дат (только нужные партиции)
+# get_export_schema - схема Arrow: типизированные колонки, словарное кодирование продавца и локации
+
+DEFAULT_DATASET_DIR = "data/dataset"
+# parquet - для аналитики (сжатие zstd, статистики колонок), arrow - Arrow IPC (Feather v2) без декодирования при чтении
+EXPORT_FORMATS = ("parquet", "arrow")
+DEFAULT_EXPORT_FORMAT = "parquet"
+EXPORT_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+# Колонки с малым числом различных значений на много строк: хранятся словарем + индексами
+DICTIONARY_COLUMNS = ("seller_url", "seller_name", "location", "condition")
+
+
+def get_export_schema() -> "pa.Schema":
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("item_id", pa.string()),
+        ("run", dictionary),
+        ("parsed_at", pa.timestamp("us")),
+        ("title", pa.string()),
+        ("price", pa.int64()),
+        ("price_text", pa.string()),
+        ("url", pa.string()),
+        ("seller_url", dictionary),
+        ("seller_name", dictionary),
+        ("seller_rating", pa.float32()),
+        ("seller_reviews_count", pa.int32()),
+        ("description", pa.string()),
+        ("published_date_text", pa.string()),
+        ("published_at", pa.timestamp("ms")),
+        ("condition", dictionary),
+        ("location", dictionary),
+        ("badges", pa.list_(pa.string())),
+        ("images", pa.list_(pa.string())),
+        ("params", pa.map_(pa.string(), pa.string())),
+    ])
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _to_columns(entries: Iterable[Dict[str, Any]], run: str) -> Dict[str, List[Any]]:
+    columns = {name: [] for name in get_export_schema().names}
+    for entry in entries:
+        data = entry.get("data") or {}
+        if not data.get("item_id"):
+            continue
+        parsed_at = entry.get("timestamp")
+        published_at = parse_published_date(data.get("date"), parsed_at)
+        params = data.get("params")
+
+        columns["item_id"].append(data["item_id"])
+        columns["run"].append(run)
+        columns["parsed_at"].append(_parse_datetime(parsed_at))
+        columns["title"].append(data.get("title"))
+        columns["price"].append(data.get("price"))
+        columns["price_text"].append(data.get("price_text"))
+        columns["url"].append(data.get("url"))
+        columns["seller_url"].append(data.get("seller_url"))
+        columns["seller_name"].append(data.get("seller_name"))
+        columns["seller_rating"].append(parse_rating(data.get("seller_rating")))
+        columns["seller_reviews_count"].append(data.get("seller_reviews_count"))
+        columns["description"].append(data.get("description"))
+        columns["published_date_text"].append(data.get("date"))
+        columns["published_at"].append(datetime.fromtimestamp(published_at) if published_at is not None else None)
+        columns["condition"].append(data.get("state"))
+        columns["location"].append(data.get("location"))
+        columns["badges"].append(data.get("badges"))
+        columns["images"].append(data.get("images"))
+        columns["params"].append([(key, str(value)) for key, value in params.items()] if isinstance(params, dict) else None)
+    return columns
+
+
+def _get_partition_dir(dataset_dir: str, name_marker: str, time_marker: str) -> str:
+    run_date = datetime.strptime(time_marker.split("_")[0], "%Y%m%d").strftime("%Y-%m-%d")
+    return os.path.join(dataset_dir, f"category={name_marker}", f"date={run_date}")
+
+
+def _get_run_file_path(dataset_dir: str, time_marker: str, name_marker: str, export_format: str) -> str:
+    # Один файл на запуск: повторная выгрузка запуска перезаписывает его, а не дублирует строки
+    partition_dir = _get_partition_dir(dataset_dir, name_marker, time_marker)
+    return os.path.join(partition_dir, f"part-{time_marker}.{EXPORT_EXTENSIONS[export_format]}")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Для выгрузки в Parquet/Arrow нужен pyarrow: pip install 'avito-subscriber[analytics]'")
+
+
+def export_parsed_run(time_marker=None, name_marker=None, dataset_dir: str = DEFAULT_DATASET_DIR,
+                      export_format: str = DEFAULT_EXPORT_FORMAT) -> Optional[str]:
+    """
+    Выгружает avito_items_*.jsonl/json запуска в датасет dataset_dir/category=<name_marker>/date=<YYYY-MM-DD>/.
+    Возвращает путь к файлу запуска или None, если результата парсинга нет.
+    """
+    _require_pyarrow()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}. Доступны: {', '.join(EXPORT_FORMATS)}")
+    if time_marker is None:
+        time_marker, name_marker = get_latest_directory(dir_type='parsed')
+
+    json_file_path = find_parsed_file(time_marker, name_marker)
+    if json_file_path is None:
+        logging.error(f"Файл с результатами парсинга не найден для {time_marker}_{name_marker}. Выгрузка отменена.")
+        return None
+
+    started = time.perf_counter()
+    schema = get_export_schema()
+    columns = _to_columns(iter_parsed_items(json_file_path), time_marker)
+    table = pa.Table.from_pydict(columns, schema=schema)
+
+    output_path = _get_run_file_path(dataset_dir, time_marker, name_marker, export_format)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Пишем во временный файл и переименовываем: читатель датасета не увидит недописанный файл
+    tmp_path = os.path.join(os.path.dirname(output_path), f".{os.path.basename(output_path)}.tmp")
+    if export_format == "parquet":
+        pq.write_table(table, tmp_path, compression="zstd", use_dictionary=[*DICTIONARY_COLUMNS, "run"])
+    else:
+        feather.write_feather(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, output_path)
+
+    logging.info(
+        f"Выгружено {table.num_rows} объявлений запуска {time_marker}_{name_marker} в {output_path} "
+        f"({os.path.getsize(output_path) / 1024:.1f} КБ, {time.perf_counter() - started:.2f} сек)"
+    )
+    return output_path
+
+
+def export_all_runs(dataset_dir: str = DEFAULT_DATASET_DIR, export_format: str = DEFAULT_EXPORT_FORMAT) -> List[str]:
+    """Дописывает в датасет запуски из data/parsed, для которых еще нет файла; уже выгруженные не перечитываются."""
+    parsed_dir = "data/parsed"
+    _require_pyarrow()
+    exported = []
+    for run_dir in sorted(os.listdir(parsed_dir)):
+        parts = run_dir.split("_")
+        if len(parts) < 3 or not os.path.isdir(os.path.join(parsed_dir, run_dir)):
+            continue
+        time_marker, name_marker = "_".join(parts[:2]), "_".join(parts[2:])
+        if os.path.exists(_get_run_file_path(dataset_dir, time_marker, name_marker, export_format)):
+            continue
+        output_path = export_parsed_run(time_marker, name_marker, dataset_dir, export_format)
+        if output_path:
+            exported.append(output_path)
+    logging.info(f"Новых запусков в датасете {dataset_dir}: {len(exported)}")
+    return exported
+
+
+def read_dataset(dataset_dir: str = DEFAULT_DATASET_DIR, category: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None, columns: Optional[List[str]] = None,
+                 export_format: str = DEFAULT_EXPORT_FORMAT) -> "pa.Table":
+    """
+    Читает датасет в pyarrow.Table. category, since/until (YYYY-MM-DD) отбирают партиции по именам
+    директорий, так что файлы других категорий и дат не открываются; columns - только нужные колонки.
+    В одном dataset_dir должны лежать файлы одного формата.
+    """
+    _require_pyarrow()
+    partitioning = ds.partitioning(pa.schema([("category", pa.string()), ("date", pa.string())]), flavor="hive")
+    dataset = ds.dataset(
+        dataset_dir, format="ipc" if export_format == "arrow" else "parquet", partitioning=partitioning,
+        ignore_prefixes=[".", "_"],
+    )
+    condition = None
+    for expression in (
+        ds.field("category") == category if category else None,
+        ds.field("date") >= since if since else None,
+        ds.field("date") <= until if until else None,
+    ):
+        if expression is not None:
+            condition = expression if condition is None else condition & expression
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Выгрузка результатов парсинга в колоночный датасет")
+    arg_parser.add_argument("--time-marker", default=None, help="Метка времени запуска (по умолчанию - последний)")
+    arg_parser.add_argument("--name-marker", default=None, help="Категория запуска")
+    arg_parser.add_argument("--all", action="store_true", help="Дописать все еще не выгруженные запуски из data/parsed")
+    arg_parser.add_argument("--dataset-dir", default=DEFAULT_DATASET_DIR, help="Корень датасета")
+    arg_parser.add_argument("--format", choices=EXPORT_FORMATS, default=DEFAULT_EXPORT_FORMAT, help="Формат файлов датасета")
+    args = arg_parser.parse_args()
+
+    if args.all:
+        export_all_runs(args.dataset_dir, args.format)
+    else:
+        export_parsed_run(args.time_marker, args.name_marker, args.dataset_dir, args.format)
+
+
+if __name__ == "__main__":
+    main()
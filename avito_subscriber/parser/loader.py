@@ -1,72 +1,109 @@
-import os
 import json
-from .utils import get_latest_directory
-from ..client.sql.SQLight import DatabaseClient
+from itertools import islice
+from typing import Dict, List, Optional, TextIO
+from .utils import get_latest_directory, find_parsed_file, iter_parsed_items, get_new_items_file_path
+from ..client.sql.storage import create_storage_client
+from ..client.sql.config import DEFAULT_UPSERT_BATCH_SIZE
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def load_parsed_in_db(time_marker=None, name_marker=None):        
-    data_dir = f"data/parsed/{time_marker}_{name_marker}"
-    json_file_path = os.path.join(data_dir, f"avito_items_{time_marker}_{name_marker}.json")
-    inserted_category_count = 0
+def to_flat_item(item_entry: dict) -> Optional[dict]:
+    item_data = item_entry.get("data", {})
+    parsed_at = item_entry.get("timestamp")
+
+    if not item_data:
+        logging.warning(f"Пропущена запись без 'data'")
+        return None
+    
+    if "item_id" not in item_data:
+        logging.warning(f"Пропущена запись без 'item_id'")
+        return None
+
+    # Формируем плоский словарь для передачи в БД
+    return {
+        "item_id": item_data.get("item_id"),
+        "parsed_at": parsed_at,
+        "title": item_data.get("title").lower() if item_data.get("title") else None,
+        "price": item_data.get("price"),
+        "price_text": item_data.get("price_text"),
+        "url": item_data.get("url"),
+        "seller_url": item_data.get("seller_url"),
+        "description": item_data.get("description").lower() if item_data.get("description") else None,
+        "published_date_text": item_data.get("date"), 
+        "phone_state": item_data.get("phone_state"),
+        "condition": item_data.get("state"),
+        "location": item_data.get("location"),
+        "seller_name": item_data.get("seller_name"),
+        "seller_rating": item_data.get("seller_rating"),
+        "seller_reviews_count": item_data.get("seller_reviews_count"),
+        "seller_reviews_text": item_data.get("seller_reviews_text"),
+        "badges": item_data.get("badges"),  
+        "images": item_data.get("images"), 
+        "params": item_data.get("params") 
+    }
+
+
+def load_items_batch(db_client, items: List[dict], new_items_file: TextIO) -> Dict[str, int]:
+    """
+    Пишет пачку плоских объявлений в таблицу категории и дописывает в new_items_file те,
+    которых еще нет в индексе просмотренных. Возвращает счетчики inserted/updated/unchanged/failed/new.
+    """
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    for stats in db_client.upsert_items(items, batch_size=max(len(items), 1)):
+        for key in totals:
+            totals[key] += stats[key]
+
+    new_items = db_client.claim_new_items(items)
+    for item in new_items:
+        new_items_file.write(json.dumps(item, ensure_ascii=False) + "\n")
+    totals["new"] = len(new_items)
+    return totals
+
+
+def load_parsed_in_db(time_marker=None, name_marker=None, batch_size=DEFAULT_UPSERT_BATCH_SIZE):        
+    """
+    Загружает результат парсинга в таблицу категории пачками и в том же проходе
+    дописывает в new_items_*.jsonl объявления, которых еще нет в индексе просмотренных.
+    """
+    json_file_path = find_parsed_file(time_marker, name_marker)
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "new": 0}
+    db_client = None
 
     logging.info("Начало загрузки данных из JSON в базу данных.")
 
-    if not os.path.exists(json_file_path):
-        logging.error(f"JSON файл не найден: {json_file_path}. Загрузка в БД отменена.")
-        return
+    if json_file_path is None:
+        logging.error(f"Файл с результатами парсинга не найден для {time_marker}_{name_marker}. Загрузка в БД отменена.")
+        return None
 
     try:
-        db_client = DatabaseClient(name_marker=name_marker) 
-
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            all_items_data = json.load(f)
-
-        logging.info(f"Загружено {len(all_items_data)} записей из {json_file_path}.")
-
-        for item_entry in all_items_data:
-            item_data = item_entry.get("data", {})
-            parsed_at = item_entry.get("timestamp")
-
-            if not item_data:
-                logging.warning(f"Пропущена запись без 'data'")
-                continue
-            
-            if "item_id" not in item_data:
-                logging.warning(f"Пропущена запись без 'item_id'")
-                continue
-
-            # Формируем плоский словарь для передачи в БД
-            flat_item = {
-                "item_id": item_data.get("item_id"),
-                "parsed_at": parsed_at,
-                "title": item_data.get("title").lower() if item_data.get("title") else None,
-                "price": item_data.get("price"),
-                "price_text": item_data.get("price_text"),
-                "url": item_data.get("url"),
-                "seller_url": item_data.get("seller_url"),
-                "description": item_data.get("description").lower() if item_data.get("description") else None,
-                "published_date_text": item_data.get("date"), 
-                "phone_state": item_data.get("phone_state"),
-                "condition": item_data.get("state"),
-                "location": item_data.get("location"),
-                "seller_name": item_data.get("seller_name"),
-                "seller_rating": item_data.get("seller_rating"),
-                "seller_reviews_count": item_data.get("seller_reviews_count"),
-                "seller_reviews_text": item_data.get("seller_reviews_text"),
-                "badges": item_data.get("badges"),  
-                "images": item_data.get("images"), 
-                "params": item_data.get("params") 
-            }
-            
-            # Добавляем в категорийную таблицу, если есть name_marker
-            if db_client.upsert_item(flat_item):
-                inserted_category_count += 1
-            else:
-                logging.warning(f"Не удалось добавить/обновить объявление с ID: {flat_item['item_id']} в таблицу категории {name_marker}")
-
-        logging.info(f"Загрузка в БД завершена. Успешно обработано {inserted_category_count} объявлений в общей таблице.")
+        db_client = create_storage_client(name_marker)
+
+        logging.info(f"Чтение записей из {json_file_path}.")
+
+        flat_items = (flat_item for flat_item in map(to_flat_item, iter_parsed_items(json_file_path)) if flat_item)
+        new_items_path = get_new_items_file_path(time_marker, name_marker)
+
+        with open(new_items_path, 'w', encoding='utf-8') as new_items_file:
+            batch_num = 0
+            while batch := list(islice(flat_items, batch_size)):
+                batch_num += 1
+                stats = load_items_batch(db_client, batch, new_items_file)
+                for key in totals:
+                    totals[key] += stats[key]
+
+                logging.info(
+                    f"Пачка {batch_num}: новых {stats['inserted']}, изменено {stats['updated']}, "
+                    f"без изменений {stats['unchanged']}, ошибок {stats['failed']}, к уведомлению {stats['new']}"
+                )
+
+        if totals["failed"]:
+            logging.warning(f"Не удалось добавить/обновить {totals['failed']} объявлений в таблицу категории {name_marker}")
+        logging.info(
+            f"Загрузка в БД завершена. Новых {totals['inserted']}, изменено {totals['updated']}, "
+            f"без изменений {totals['unchanged']} объявлений в таблице {db_client.category_name}."
+        )
+        logging.info(f"Объявлений к уведомлению: {totals['new']}, записаны в {new_items_path}")
 
 
     except json.JSONDecodeError:
@@ -77,6 +114,8 @@ def load_parsed_in_db(time_marker=None, name_marker=None):
         if db_client:
             db_client.close()
 
+    return totals
+
 
 def main():
     time_marker, name_marker = get_latest_directory(dir_type='parsed')
@@ -1,11 +1,21 @@
+import argparse
 import json
 import os
+import sys
+import time
 import logging
 from bs4 import BeautifulSoup
+import soupsieve as sv
 import re
 from datetime import datetime
-from typing import Dict, Any, List
-from .utils import get_latest_directory
+from typing import Dict, Any, Iterator, List, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from .utils import get_parsed_file_path, OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMAT
+from .export import export_parsed_run, EXPORT_FORMATS
+from avito_subscriber.client.archive.config import DEFAULT_ARCHIVE_DIR
+from avito_subscriber.client.archive.store import RawPageStore
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -38,15 +48,47 @@ SELECTORS = {
     "badge_title": "span.SnippetBadge-title-NCaUc",  # мусор?
 }
 
+# Предкомпилированные селекторы: soupsieve не разбирает CSS заново на каждом вызове
+COMPILED_SELECTORS = {
+    key: [sv.compile(sel) for sel in value] if isinstance(value, list) else sv.compile(value)
+    for key, value in SELECTORS.items()
+}
+IMAGE_SELECTOR = sv.compile("img[src*='/items/']")
+
+# Доступные бэкенды BeautifulSoup для разбора страниц
+PARSER_BACKENDS = ("html.parser", "lxml")
+DEFAULT_PARSER_BACKEND = "html.parser"
+
+PAGE_FILE_PATTERN = re.compile(r'items_page_(\d+)\.html$')
+
+
+def resolve_parser_backend(backend: str = DEFAULT_PARSER_BACKEND) -> str:
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд парсинга: {backend}. Доступны: {', '.join(PARSER_BACKENDS)}")
+    if backend == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logging.warning("lxml не установлен, используется html.parser")
+            return "html.parser"
+    return backend
+
+
 def extract_item_data(item_html):
     soup = BeautifulSoup(item_html, 'html.parser')
-    
+    return extract_item_node(soup)
+
+
+def extract_item_node(node):
+    """Извлекает данные объявления из уже разобранного узла (Tag или BeautifulSoup) без повторного парсинга."""
+    sel = COMPILED_SELECTORS
+
     data = {
         "timestamp": datetime.now().isoformat(),
         "data": {}
     }
     
-    title_elem = soup.select_one(SELECTORS["title"])
+    title_elem = sel["title"].select_one(node)
     if title_elem:
         data["data"]["title"] = title_elem.get_text(strip=True)
         item_url = title_elem.get('href')
@@ -54,15 +96,15 @@ def extract_item_data(item_html):
             data["data"]["url"] = f"https://avito.ru{item_url}"
     
     if "url" not in data["data"]:
-        link_elem = soup.select_one(SELECTORS["item_link"]) 
+        link_elem = sel["item_link"].select_one(node)
         if link_elem:
             item_url = link_elem.get('href')
             if item_url:
                 data["data"]["url"] = f"https://avito.ru{item_url}"
     
     seller_link = None
-    for selector in SELECTORS["seller_link"]:
-        seller_link = soup.select_one(selector)
+    for selector in sel["seller_link"]:
+        seller_link = selector.select_one(node)
         if seller_link:
             break
             
@@ -72,36 +114,37 @@ def extract_item_data(item_html):
         data["data"]["seller_url"] = f"https://avito.ru{seller_url}" 
             
 
-    if soup.select_one(SELECTORS["price_marker"]):
-        price_elem = soup.select_one(SELECTORS["price_marker"])
+    price_elem = sel["price_marker"].select_one(node)
+    if price_elem:
         price_text = price_elem.get_text(strip=True)
         price_value = re.sub(r'[^\d]', '', price_text)
         data["data"]["price"] = int(price_value) if price_value else None
         data["data"]["price_text"] = price_text.replace('\xa0', ' ')
 
     
-    text = soup.select_one(SELECTORS["description"]).attrs.get('content') if soup.select_one(SELECTORS["description"]) else ''
+    description_elem = sel["description"].select_one(node)
+    text = description_elem.attrs.get('content') if description_elem else ''
     data["data"]["description"] = re.sub(r'\s+', ' ', text)
 
 
-    published = soup.select_one(SELECTORS["published_date"]) 
+    published = sel["published_date"].select_one(node)
     if published:
         data["data"]["phone_state"] = published.get_text(strip=True)
     
-    state = soup.select_one(SELECTORS["state"]) 
+    state = sel["state"].select_one(node)
     if state:
         data["data"]["state"] = state.get_text(strip=True)
     
     badges = []
-    for badge_elem in soup.select(SELECTORS["badge_container"]):
-        badge_title = badge_elem.select_one(SELECTORS["badge_title"])
+    for badge_elem in sel["badge_container"].select(node):
+        badge_title = sel["badge_title"].select_one(badge_elem)
         if badge_title:
             badges.append(badge_title.get_text(strip=True))
     
     if badges:
         data["data"]["badges"] = badges
     
-    reviews_elem = soup.select_one(SELECTORS["seller_reviews"])
+    reviews_elem = sel["seller_reviews"].select_one(node)
     if reviews_elem:
         reviews_text = reviews_elem.get_text(strip=True)
         reviews_count_match = re.search(r'(\d+)', reviews_text)
@@ -109,20 +152,22 @@ def extract_item_data(item_html):
             data["data"]["seller_reviews_count"] = int(reviews_count_match.group(1))
         data["data"]["seller_reviews_text"] = reviews_text
     
-    location_elem = soup.select_one(SELECTORS["location"])
+    location_elem = sel["location"].select_one(node)
     if location_elem:
         data["data"]["location"] = location_elem.get_text(strip=True)
     
-    date_elem = soup.select_one(SELECTORS["date"])
+    date_elem = sel["date"].select_one(node)
     if date_elem:
         data["data"]["date"] = date_elem.get_text(strip=True)
     
-    item_id = soup.select_one(SELECTORS["item_id"]).get("data-item-id")
+    # Узел карточки сам является div[data-marker='item'], а select_one ищет только среди потомков
+    item_elem = node if sel["item_id"].match(node) else sel["item_id"].select_one(node)
+    item_id = item_elem.get("data-item-id")
     if item_id:
         data["data"]["item_id"] = item_id
     
     image_urls = []
-    for img in soup.select("img[src*='/items/']"):
+    for img in IMAGE_SELECTOR.select(node):
         src = img.get('src')
         if src:
             if '/' in src:
@@ -132,7 +177,7 @@ def extract_item_data(item_html):
     data["data"]["images"] = image_urls
     
     params = {}
-    for param_elem in soup.select(SELECTORS["params_container"]):
+    for param_elem in sel["params_container"].select(node):
         param_text = param_elem.get_text(strip=True)
         if ":" in param_text:
             key, value = param_text.split(":", 1)
@@ -141,76 +186,228 @@ def extract_item_data(item_html):
     if params:
         data["data"]["params"] = params
     
-    seller_name = soup.select_one(SELECTORS["seller_name"])
+    seller_name = sel["seller_name"].select_one(node)
     if seller_name:
         data["data"]["seller_name"] = seller_name.get_text(strip=True)
     
-    seller_rating = soup.select_one(SELECTORS["seller_rating"])
+    seller_rating = sel["seller_rating"].select_one(node)
     if seller_rating:
         rating_text = seller_rating.get_text(strip=True)
         data["data"]["seller_rating"] = rating_text
     
     return data
 
-def parse_html(time_marker=None):
-    if time_marker is None:
-        time_marker, name_marker = get_latest_directory(dir_type='raw')
+def get_page_number(html_file: str) -> int:
+    match = PAGE_FILE_PATTERN.search(html_file)
+    return int(match.group(1)) if match else sys.maxsize
+
+
+# Источник страницы: путь к items_page_N.html или ("archive", archive_dir, run, category, page)
+PageSource = Union[str, Tuple[str, str, str, str, int]]
+
+
+@lru_cache(maxsize=None)
+def _get_archive_store(archive_dir: str) -> RawPageStore:
+    # Одно подключение к индексу архива на процесс-воркер
+    return RawPageStore(archive_dir)
+
+
+def _read_page_source(source: PageSource) -> str:
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as f:
+            return f.read()
+    _, archive_dir, run, category, page = source
+    return _get_archive_store(archive_dir).get_page(run, category, page)
+
+
+def _page_source_name(source: PageSource) -> str:
+    if isinstance(source, str):
+        return os.path.basename(source)
+    return f"items_page_{source[4]}.html"
+
+
+def parse_page_file(file_path: PageSource, parser_backend: str = DEFAULT_PARSER_BACKEND) -> Dict[str, Any]:
+    """Парсит одну страницу (файл или запись архива). Ошибки не выходят за пределы страницы."""
+    html_file = _page_source_name(file_path)
+    try:
+        html_content = _read_page_source(file_path)
+    except Exception as e:
+        logging.error(f"Критическая ошибка при чтении файла {html_file}: {e}", exc_info=True)
+        return {"file": html_file, "items": [], "elapsed": 0.0, "worker": os.getpid()}
+    return parse_page_html(html_content, html_file, parser_backend)
+
+
+def parse_page_html(html_content: str, html_file: str, parser_backend: str = DEFAULT_PARSER_BACKEND) -> Dict[str, Any]:
+    """Парсит HTML контейнера объявлений, уже загруженный в память (файл, архив или конвейер скрейпера)."""
+    started = time.perf_counter()
+    items_data = []
+
+    logging.info(f"Начало обработки файла: {html_file}")
+
+    try:
+        soup = BeautifulSoup(html_content, parser_backend)
+        
+        items = soup.select(SELECTORS["item_container"])
+        
+        logging.info(f"В файле {html_file} найдено {len(items)} объявлений")
+        
+        for i, item in enumerate(items):
+            item_id_attr = item.get('data-item-id') or item.get('id', f"unknown_item_{i}")
+            try:
+                # Отсоединяем карточку от страницы: селекторы видят только её поддерево,
+                # как при повторном парсинге str(item), но без сериализации
+                item_data = extract_item_node(item.extract())
+                if not item_data.get("data"):
+                     logging.warning(f"Не удалось извлечь item_id из блока (атрибут блока: {item_id_attr}). Пропускаем.")
+                     continue
+
+                items_data.append(item_data)
+
+            except Exception as e:
+                logging.error(f"Ошибка при обработке объявления (атрибут блока: {item_id_attr}) в файле {html_file}: {e}", exc_info=True) # Добавляем traceback
+        
+    except Exception as e:
+        logging.error(f"Критическая ошибка при обработке файла {html_file}: {e}", exc_info=True)
+
+    return {
+        "file": html_file,
+        "items": items_data,
+        "elapsed": time.perf_counter() - started,
+        "worker": os.getpid(),
+    }
+
+
+def _log_worker_throughput(page_stats: List[Dict[str, Any]]):
+    workers = {}
+    for result in page_stats:
+        stats = workers.setdefault(result["worker"], {"files": 0, "items": 0, "elapsed": 0.0})
+        stats["files"] += 1
+        stats["items"] += result["items_count"]
+        stats["elapsed"] += result["elapsed"]
+
+    for worker, stats in sorted(workers.items()):
+        rate = stats["items"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        logging.info(
+            f"Воркер {worker}: файлов {stats['files']}, объявлений {stats['items']}, "
+            f"{stats['elapsed']:.2f} сек, {rate:.1f} объявлений/сек"
+        )
+
+
+def _iter_page_results(file_paths: List[PageSource], parser_backend: str, workers: int) -> Iterator[Dict[str, Any]]:
+    if workers > 1 and len(file_paths) > 1:
+        logging.info(f"Параллельный парсинг: {workers} процессов")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map возвращает результаты в порядке file_paths независимо от порядка завершения
+            yield from executor.map(parse_page_file, file_paths, repeat(parser_backend))
+    else:
+        for file_path in file_paths:
+            yield parse_page_file(file_path, parser_backend)
 
+
+def _resolve_run(time_marker: str, name_marker: str, archive_dir: str) -> Tuple[str, str]:
+    # Запуск (time_marker, name_marker) среди data/raw и архива страниц: недостающая метка берется из найденных запусков,
+    # без обеих - последний запуск
+    if time_marker and name_marker:
+        return time_marker, name_marker
+    runs = set()
+    if os.path.isdir("data/raw"):
+        for run_dir in os.listdir("data/raw"):
+            parts = run_dir.split("_")
+            if os.path.isdir(os.path.join("data/raw", run_dir)) and len(parts) > 2:
+                runs.add(("_".join(parts[:2]), "_".join(parts[2:])))
+    if os.path.exists(os.path.join(archive_dir, "index.db")):
+        runs.update(_get_archive_store(archive_dir).list_runs())
+
+    matches = sorted(
+        run for run in runs
+        if (time_marker is None or run[0] == time_marker) and (name_marker is None or run[1] == name_marker)
+    )
+    if not matches:
+        raise FileNotFoundError(
+            f"Запуск time_marker={time_marker}, name_marker={name_marker} не найден ни в data/raw, ни в архиве {archive_dir}"
+        )
+    if time_marker and len(matches) > 1:
+        raise ValueError(f"В запуске {time_marker} несколько категорий ({', '.join(name for _, name in matches)}): укажите name_marker")
+    logging.info(f"Используется запуск {matches[-1][0]}_{matches[-1][1]}")
+    return matches[-1]
+
+
+def _list_page_sources(time_marker: str, name_marker: str, archive_dir: str) -> List[PageSource]:
     data_dir = f"data/raw/{time_marker}_{name_marker}"
-    output_dir = f"data/parsed/{time_marker}_{name_marker}"
-    output_file = f"avito_items_{time_marker}_{name_marker}.json"
+    if os.path.isdir(data_dir):
+        # Порядок слияния фиксирован номером страницы, а не порядком os.listdir
+        html_files = sorted((f for f in os.listdir(data_dir) if f.endswith('.html')), key=get_page_number)
+        return [os.path.join(data_dir, html_file) for html_file in html_files]
+
+    pages = _get_archive_store(archive_dir).list_pages(time_marker, name_marker)
+    if not pages:
+        raise FileNotFoundError(f"Запуск {time_marker}_{name_marker} не найден ни в data/raw, ни в архиве {archive_dir}")
+    logging.info(f"Страницы запуска {time_marker}_{name_marker} читаются из архива {archive_dir}")
+    return [("archive", archive_dir, time_marker, name_marker, page) for page in pages]
+
+
+def parse_html(time_marker=None, name_marker=None, parser_backend=DEFAULT_PARSER_BACKEND, workers=1, output_format=DEFAULT_OUTPUT_FORMAT,
+               archive_dir=DEFAULT_ARCHIVE_DIR, export_format=None):
+    parser_backend = resolve_parser_backend(parser_backend)
+
+    time_marker, name_marker = _resolve_run(time_marker, name_marker, archive_dir)
+
+    output_path = get_parsed_file_path(time_marker, name_marker, output_format)
     
-    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    html_files = [f for f in os.listdir(data_dir) if f.endswith('.html')]
-    logging.info(f"Найдено {len(html_files)} HTML-файлов для парсинга")
+    file_paths = _list_page_sources(time_marker, name_marker, archive_dir)
+    logging.info(f"Найдено {len(file_paths)} HTML-файлов для парсинга")
     
+    started = time.perf_counter()
     total_items = 0
+    page_stats = []
     all_items_data = []
-    
-    for html_file in html_files:
-        file_path = os.path.join(data_dir, html_file)
-        logging.info(f"Начало обработки файла: {html_file}")
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            items = soup.select(SELECTORS["item_container"])
-            
-            logging.info(f"В файле {html_file} найдено {len(items)} объявлений")
-            
-            for i, item in enumerate(items):
-                item_id_attr = item.get('data-item-id') or item.get('id', f"unknown_item_{i}")
-                try:
-                    item_data = extract_item_data(str(item))
-                    if not item_data.get("data"):
-                         logging.warning(f"Не удалось извлечь item_id из блока (атрибут блока: {item_id_attr}). Пропускаем.")
-                         continue
-
-                    all_items_data.append(item_data)
-                    total_items += 1
-
-                except Exception as e:
-                    logging.error(f"Ошибка при обработке объявления (атрибут блока: {item_id_attr}) в файле {html_file}: {e}", exc_info=True) # Добавляем traceback
-            
-        except Exception as e:
-            logging.error(f"Критическая ошибка при обработке файла {html_file}: {e}", exc_info=True)
-    
-    output_path = os.path.join(output_dir, output_file)
+
     try:
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_items_data, f, ensure_ascii=False, indent=2)
+            for result in _iter_page_results(file_paths, parser_backend, workers):
+                items = result.pop("items")
+                result["items_count"] = len(items)
+                page_stats.append(result)
+                total_items += len(items)
+
+                if output_format == "jsonl":
+                    # Дописываем страницу сразу: загрузчик может читать файл, не дожидаясь конца парсинга
+                    for item_data in items:
+                        f.write(json.dumps(item_data, ensure_ascii=False) + "\n")
+                    f.flush()
+                else:
+                    all_items_data.extend(items)
+
+            if output_format == "json":
+                json.dump(all_items_data, f, ensure_ascii=False, indent=2)
+
         logging.info(f"Парсинг завершен. Всего извлечено {total_items} объявлений.")
-        logging.info(f"Данные сохранены в JSON файл: {output_path}")
+        logging.info(f"Данные сохранены в {output_format.upper()} файл: {output_path}")
     except Exception as e:
-        logging.error(f"Ошибка при сохранении JSON файла {output_path}: {e}", exc_info=True)
+        logging.error(f"Ошибка при сохранении {output_format.upper()} файла {output_path}: {e}", exc_info=True)
+
+    _log_worker_throughput(page_stats)
+    logging.info(f"Парсинг {len(file_paths)} файлов занял {time.perf_counter() - started:.2f} сек")
+
+    if export_format:
+        export_parsed_run(time_marker, name_marker, export_format=export_format)
     
 
 def main():
-    parse_html()
+    arg_parser = argparse.ArgumentParser(description="Парсинг сохраненных HTML-страниц Avito")
+    arg_parser.add_argument("--time-marker", default=None, help="Метка времени запуска (по умолчанию - последний)")
+    arg_parser.add_argument("--name-marker", default=None, help="Категория запуска (по умолчанию - из найденных запусков)")
+    arg_parser.add_argument("--workers", type=int, default=1, help="Количество процессов для парсинга файлов")
+    arg_parser.add_argument("--backend", choices=PARSER_BACKENDS, default=DEFAULT_PARSER_BACKEND, help="Бэкенд BeautifulSoup")
+    arg_parser.add_argument("--format", choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT, help="Формат выходного файла")
+    arg_parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR, help="Архив сырых страниц (если запуска нет в data/raw)")
+    arg_parser.add_argument("--export", choices=EXPORT_FORMATS, default=None, help="После парсинга выгрузить запуск в датасет data/dataset")
+    args = arg_parser.parse_args()
+
+    parse_html(args.time_marker, args.name_marker, parser_backend=args.backend, workers=args.workers, output_format=args.format,
+               archive_dir=args.archive_dir, export_format=args.export)
     
 
 if __name__ == "__main__":
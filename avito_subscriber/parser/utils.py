@@ -1,6 +1,12 @@
+import json
 import logging
 import os
-from typing import Optional, Literal
+from typing import Any, Dict, Iterator, Optional, Literal
+
+# Форматы файла с результатами парсинга: jsonl - по объекту на строку (пишется потоково),
+# json - единый массив (формат старых запусков)
+OUTPUT_FORMATS = ("jsonl", "json")
+DEFAULT_OUTPUT_FORMAT = "jsonl"
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -16,4 +22,35 @@ def get_latest_directory(dir_type: Optional[Literal['raw', 'parsed']] = None) ->
         return '_'.join(time_marker), '_'.join(name_marker)
     except FileNotFoundError as e:
         logging.error(f"Ошибка при поиске директории: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def get_parsed_file_path(time_marker: str, name_marker: str, output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    data_dir = f"data/parsed/{time_marker}_{name_marker}"
+    return os.path.join(data_dir, f"avito_items_{time_marker}_{name_marker}.{output_format}")
+
+
+def get_new_items_file_path(time_marker: str, name_marker: str) -> str:
+    # Новые (еще не уведомленные) объявления запуска, которые loader отдает шагу уведомлений
+    data_dir = f"data/parsed/{time_marker}_{name_marker}"
+    return os.path.join(data_dir, f"new_items_{time_marker}_{name_marker}.jsonl")
+
+
+def find_parsed_file(time_marker: str, name_marker: str) -> Optional[str]:
+    # Если запуск парсили в обоих форматах, актуален последний записанный файл, а не первый по OUTPUT_FORMATS
+    file_paths = [get_parsed_file_path(time_marker, name_marker, output_format) for output_format in OUTPUT_FORMATS]
+    existing = [file_path for file_path in file_paths if os.path.exists(file_path)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+
+def iter_parsed_items(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Построчно читает JSONL; JSON-массив старых запусков читается целиком."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.json'):
+            yield from json.load(f)
+            return
+
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
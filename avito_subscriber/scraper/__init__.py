@@ -1,4 +1,5 @@
 from .scraper import scrape
+from .runner import scrape_categories
 from .config import SCRAPING_URLS
 
-__all__ = ['scrape', 'main', 'SCRAPING_URLS']
+__all__ = ['scrape', 'scrape_categories', 'main', 'SCRAPING_URLS']
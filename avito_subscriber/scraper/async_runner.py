@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from avito_subscriber.client.cdp.browser import CDPBrowser, CDPTab, CDPError
+from avito_subscriber.client.cdp.config import CDP_ENDPOINT
+from avito_subscriber.client.selenium.pacing import Pacer, READINESS_SCRIPT, is_block_title
+from avito_subscriber.scraper.config import (
+    SCRAPING_URLS, MAX_PAGES, PAGE_RETRIES, EXTRACTION_MODE, ASYNC_TABS, ASYNC_TABS_PER_CATEGORY, PIPELINE_PARSE_WORKERS,
+    ITEMS_CONTAINER_SELECTOR, ITEM_SELECTOR, ITEM_ID_SELECTOR, NEXT_BUTTON_LOCATOR,
+)
+from avito_subscriber.scraper.saver import CONTAINER_SNAPSHOT_SCRIPT, EXTRACT_ITEMS_SCRIPT
+from avito_subscriber.scraper.utils import build_page_url
+from avito_subscriber.parser.parser import SELECTORS, parse_page_html, resolve_parser_backend, DEFAULT_PARSER_BACKEND
+from avito_subscriber.parser.loader import to_flat_item, load_items_batch
+from avito_subscriber.parser.utils import get_new_items_file_path
+from avito_subscriber.client.sql.storage import create_storage_client
+
+# AsyncCategoryScraper - скрейпинг одной категории на вкладках общего браузера: загрузка, разбор и запись в БД без потоков на страницу
+# -- run - первая страница, затем окна по tabs_per_category страниц параллельно до последней или max_pages
+# -- _process_page - одна страница: вкладка из пула, загрузка, разбор в пуле процессов, запись в БД через executor
+# -- _load_page - переход по URL с паузой Pacer и ожиданием готовности списка (повторы PAGE_RETRIES)
+# -- _write_items - запись объявлений страницы в БД категории (выполняется в потоке писателя)
+# -- get_stats - время стадий, страницы в секунду, счетчики записи
+# scrape_categories_async - скрейпит категории одним event loop и одним браузером с ограниченным пулом вкладок
+# _build_report - сводная статистика по категориям
+
+NEXT_BUTTON_SCRIPT = "return document.querySelector(arguments[0]) !== null;"
+
+
+class AsyncCategoryScraper:
+
+    def __init__(self, url_key: str, url: str, tab_pool: asyncio.Queue, tabs_per_category: int = ASYNC_TABS_PER_CATEGORY,
+                 max_pages: int = MAX_PAGES, extraction: str = EXTRACTION_MODE, parse_executor: Executor = None,
+                 db_executor: Executor = None, parser_backend: str = DEFAULT_PARSER_BACKEND):
+        if extraction not in ("html", "browser"):
+            raise ValueError(f"Неизвестный режим извлечения: {extraction}")
+        self.url_key = url_key
+        self.url = url
+        self.tab_pool = tab_pool
+        self.tabs_per_category = tabs_per_category
+        self.slots = asyncio.Semaphore(tabs_per_category)
+        self.max_pages = max_pages
+        self.extraction = extraction
+        self.parse_executor = parse_executor
+        self.db_executor = db_executor # один поток: клиенты БД создаются и используются только в нем
+        self.parser_backend = resolve_parser_backend(parser_backend)
+        self.pacer = Pacer(url_key)
+        self.time_marker = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.new_items_path = get_new_items_file_path(self.time_marker, url_key)
+        self.db_client = None
+        self.errors = []
+        self.stats = {
+            "pages": 0, "items": 0, "elapsed": 0.0,
+            "load": 0.0, "extract": 0.0, "parse": 0.0, "write": 0.0,
+            "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "new": 0,
+        }
+
+    #  ---------PAGE---------------
+    async def _load_page(self, tab: CDPTab, page_num: int) -> bool:
+        page_url = build_page_url(self.url, page_num)
+        for attempt in range(1, PAGE_RETRIES + 2):
+            # Слот бюджета резервируется до ожидания: параллельные вкладки категории не уходят одним залпом
+            await asyncio.sleep(self.pacer.next_delay())
+            timeout = self.pacer.readiness_timeout()
+            started = time.monotonic()
+            try:
+                await tab.goto(page_url)
+                result = await tab.execute_async_script(
+                    READINESS_SCRIPT, ITEMS_CONTAINER_SELECTOR, ITEM_ID_SELECTOR, self.pacer.settings["quiet_ms"],
+                    timeout=timeout,
+                )
+            except (asyncio.TimeoutError, CDPError) as e:
+                print(f"[{self.url_key}] Страница {page_num}: {e or 'таймаут'}")
+                result = None
+            blocked = is_block_title(await tab.title())
+            if self.pacer.record_readiness(result, time.monotonic() - started, blocked, timeout):
+                return True
+            print(f"[{self.url_key}] Страница {page_num}: объявления не загрузились (попытка {attempt} из {PAGE_RETRIES + 1})")
+        return False
+
+    async def _process_page(self, page_num: int) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        async with self.slots:
+            tab = await self.tab_pool.get()
+            try:
+                started = time.perf_counter()
+                if not await self._load_page(tab, page_num):
+                    return None
+                loaded = time.perf_counter()
+                if self.extraction == "browser":
+                    records = await tab.execute_script(EXTRACT_ITEMS_SCRIPT, SELECTORS, ITEMS_CONTAINER_SELECTOR) or []
+                    snapshot = None
+                else:
+                    records = None
+                    snapshot = await tab.execute_script(CONTAINER_SNAPSHOT_SCRIPT, ITEMS_CONTAINER_SELECTOR, ITEM_SELECTOR)
+                has_next = await tab.execute_script(NEXT_BUTTON_SCRIPT, NEXT_BUTTON_LOCATOR[1])
+                extracted = time.perf_counter()
+            finally:
+                # Вкладка свободна, как только DOM снят: разбор и запись идут без нее
+                self.tab_pool.put_nowait(tab)
+        self.stats["load"] += loaded - started
+        self.stats["extract"] += extracted - loaded
+
+        if records is not None:
+            timestamp = datetime.now().isoformat()
+            entries = [{"timestamp": timestamp, "data": record} for record in records if record]
+        elif snapshot:
+            result = await loop.run_in_executor(
+                self.parse_executor, parse_page_html, snapshot["html"], f"items_page_{page_num}.html", self.parser_backend,
+            )
+            entries = result["items"]
+        else:
+            entries = []
+        parsed = time.perf_counter()
+        self.stats["parse"] += parsed - extracted
+
+        items = [item for item in map(to_flat_item, entries) if item]
+        if items:
+            await loop.run_in_executor(self.db_executor, self._write_items, items)
+        self.stats["write"] += time.perf_counter() - parsed
+        self.stats["pages"] += 1
+        self.stats["items"] += len(items)
+        print(f"[{self.url_key}] Страница {page_num}: {len(items)} объявлений")
+        return {"page_num": page_num, "items": len(items), "has_next": has_next}
+
+    def _write_items(self, items: List[dict]):
+        if self.db_client is None:
+            self.db_client = create_storage_client(self.url_key)
+            os.makedirs(os.path.dirname(self.new_items_path), exist_ok=True)
+        with open(self.new_items_path, "a", encoding="utf-8") as new_items_file:
+            batch_stats = load_items_batch(self.db_client, items, new_items_file)
+        for key, value in batch_stats.items():
+            self.stats[key] += value
+
+    def _close_db(self):
+        if self.db_client:
+            self.db_client.close()
+            self.db_client = None
+
+    #  ---------RUN---------------
+    async def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            first = await self._process_page(1)
+            if first is None:
+                raise TimeoutError("Контейнер объявлений не найден на первой странице")
+            has_next = first["has_next"]
+            page_num = 2
+            # Окно страниц грузится параллельно; пагинация останавливается на первой пустой странице окна
+            while has_next and page_num <= self.max_pages:
+                window = range(page_num, min(page_num + self.tabs_per_category, self.max_pages + 1))
+                results = await asyncio.gather(*(self._process_page(n) for n in window), return_exceptions=True)
+                for n, result in zip(window, results):
+                    if isinstance(result, Exception):
+                        self._record_error(f"страница {n}: {result}")
+                    elif result is None and has_next:
+                        # Предыдущая страница ссылается на эту, а она не загрузилась: категория пройдена не до конца.
+                        # Страницы окна после последней (has_next уже False) ошибкой не считаются
+                        self._record_error(f"страница {n}: объявления не загрузились после {PAGE_RETRIES + 1} попыток")
+                    if not isinstance(result, dict) or not result["has_next"]:
+                        has_next = False
+                page_num += len(window)
+        except Exception as e:
+            self._record_error(str(e))
+        finally:
+            self.stats["elapsed"] = time.perf_counter() - started
+            await asyncio.get_running_loop().run_in_executor(self.db_executor, self._close_db)
+            self.pacer.save()
+        return self.get_stats()
+
+    def _record_error(self, message: str):
+        print(f"[{self.url_key}] Ошибка: {message}")
+        self.errors.append(message)
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = self.stats["elapsed"]
+        return {
+            "url_key": self.url_key,
+            **self.stats,
+            "success": self.stats["pages"] > 0 and not self.errors,
+            "pages_per_second": self.stats["pages"] / elapsed if elapsed else 0.0,
+            "new_items_file": self.new_items_path if self.stats["new"] else None,
+            "pacing": self.pacer.get_metrics(),
+            "errors": list(self.errors),
+        }
+
+
+def _build_report(results: Dict[str, dict], elapsed: float, tabs: int) -> dict:
+    pages = sum(stats["pages"] for stats in results.values())
+    return {
+        "categories": results,
+        "succeeded": [key for key, stats in results.items() if stats["success"]],
+        "total_items": sum(stats["items"] for stats in results.values()),
+        "pages": pages,
+        "elapsed": elapsed,
+        "tabs": tabs,
+        "pages_per_second": pages / elapsed if elapsed else 0.0,
+        # Суммарное время стадий по всем страницам: при параллельной работе больше elapsed
+        "stages": {stage: sum(stats[stage] for stats in results.values()) for stage in ("load", "extract", "parse", "write")},
+    }
+
+
+async def scrape_categories_async(
+    urls: Dict[str, str] = None,
+    tabs: int = ASYNC_TABS,
+    tabs_per_category: int = ASYNC_TABS_PER_CATEGORY,
+    endpoint: str = CDP_ENDPOINT,
+    max_pages: int = MAX_PAGES,
+    extraction: str = EXTRACTION_MODE,
+    parse_workers: int = PIPELINE_PARSE_WORKERS,
+) -> dict:
+    """
+    Скрейпит категории из urls (по умолчанию SCRAPING_URLS) в одном процессе: один event loop,
+    один браузер (локальный или endpoint DevTools) и не более tabs вкладок, из них не более
+    tabs_per_category на категорию. HTML разбирается в пуле из parse_workers процессов,
+    запись в БД идет в отдельном потоке, так что ожидание браузера не блокирует остальные вкладки.
+    """
+    urls = urls or SCRAPING_URLS
+    if tabs < 1 or tabs_per_category < 1:
+        raise ValueError(f"tabs и tabs_per_category должны быть не меньше 1: {tabs}, {tabs_per_category}")
+    parse_executor = ProcessPoolExecutor(max_workers=parse_workers) if extraction == "html" else None
+    db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-writer")
+
+    print(f"Асинхронный скрейпинг {len(urls)} категорий, вкладок браузера: {tabs}")
+    started = time.perf_counter()
+    try:
+        async with CDPBrowser(endpoint) as browser:
+            tab_pool = asyncio.Queue()
+            for _ in range(tabs):
+                tab_pool.put_nowait(await browser.new_tab())
+            scrapers = [
+                AsyncCategoryScraper(url_key, url, tab_pool, tabs_per_category=min(tabs_per_category, tabs), max_pages=max_pages,
+                                     extraction=extraction, parse_executor=parse_executor, db_executor=db_executor)
+                for url_key, url in urls.items()
+            ]
+            results = await asyncio.gather(*(scraper.run() for scraper in scrapers))
+    finally:
+        db_executor.shutdown()
+        if parse_executor:
+            parse_executor.shutdown()
+
+    report = _build_report({stats["url_key"]: stats for stats in results}, time.perf_counter() - started, tabs)
+    stages = report["stages"]
+    print(
+        f"\n=== Итог: {report['total_items']} объявлений на {report['pages']} страницах, успешно "
+        f"{len(report['succeeded'])}/{len(urls)} категорий за {report['elapsed']:.1f} сек "
+        f"({report['pages_per_second']:.2f} стр/сек) ==="
+    )
+    print(f"Стадии, сек: загрузка {stages['load']:.1f}, снятие DOM {stages['extract']:.1f}, "
+          f"разбор {stages['parse']:.1f}, запись в БД {stages['write']:.1f}")
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Асинхронный скрейпинг категорий через Chrome DevTools Protocol")
+    arg_parser.add_argument("--categories", nargs="*", default=None, help="Ключи SCRAPING_URLS (по умолчанию - все)")
+    arg_parser.add_argument("--tabs", type=int, default=ASYNC_TABS, help="Вкладок браузера всего")
+    arg_parser.add_argument("--tabs-per-category", type=int, default=ASYNC_TABS_PER_CATEGORY, help="Вкладок на одну категорию")
+    arg_parser.add_argument("--endpoint", default=CDP_ENDPOINT, help="ws://... DevTools уже запущенного браузера (по умолчанию - локальный запуск)")
+    arg_parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    arg_parser.add_argument("--extraction", choices=("html", "browser"), default=EXTRACTION_MODE, help="Где извлекать объявления")
+    arg_parser.add_argument("--parse-workers", type=int, default=PIPELINE_PARSE_WORKERS, help="Процессы разбора HTML")
+    args = arg_parser.parse_args()
+
+    urls = {key: SCRAPING_URLS[key] for key in args.categories} if args.categories else SCRAPING_URLS
+    report = asyncio.run(scrape_categories_async(
+        urls,
+        tabs=args.tabs,
+        tabs_per_category=args.tabs_per_category,
+        endpoint=args.endpoint,
+        max_pages=args.max_pages,
+        extraction=args.extraction,
+        parse_workers=args.parse_workers,
+    ))
+    print(f"\nСтатистика: {report}")
+
+
+if __name__ == "__main__":
+    main()
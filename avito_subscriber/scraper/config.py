@@ -13,9 +13,47 @@ SCRAPING_URLS = {
 MAX_PAGES = 80
 WAIT_TIME = 15.0
 
+# Параллельный скрейпинг категорий: всего браузерных сессий (категория занимает одну сессию).
+# Для Selenium Grid MAX_SESSIONS не должен превышать SE_NODE_MAX_SESSIONS
+MAX_SESSIONS = 2
+
+# Пагинация: "url" - переход по &p=N, "click" - клик по кнопке "Далее" (запасной вариант)
+PAGINATION_MODE = "url"
+PAGE_RETRIES = 2
+
+# Вкладок в одной браузерной сессии: при > 1 страницы по URL грузятся параллельно (SeleniumParser.load_pages)
+TABS_PER_SESSION = 1
+# Лимит по категориям: страниц в работе (вкладок) для отдельных ключей SCRAPING_URLS, остальным - TABS_PER_SESSION
+CATEGORY_TABS = {}
+
+# Загрузка страниц: "selenium" - браузер, "http" - пул соединений requests без браузера
+# (страница проверки или ответ без списка объявлений - переход на браузер до конца категории)
+FETCHER = "selenium"
+
+# Извлечение объявлений: "html" - сохранять HTML для parse_html, "browser" - извлекать в браузере одним JS-вызовом
+EXTRACTION_MODE = "html"
+
+# Хранение сырых страниц: "files" - items_page_N.html в data/raw/<run>, "archive" - сжатый архив с дедупликацией
+RAW_STORAGE = "files"
+
+# Конвейер scrape -> parse -> load (pipeline.py): страницы в очереди парсинга (больше - скрейпер ждет),
+# процессы парсинга, пачка записи в БД и максимальная задержка неполной пачки, сек
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_PARSE_WORKERS = 2
+PIPELINE_BATCH_SIZE = 200
+PIPELINE_FLUSH_INTERVAL = 2.0
+
+# Асинхронный скрейпинг через CDP (async_runner.py): вкладок одного браузера всего и на одну категорию
+ASYNC_TABS = 6
+ASYNC_TABS_PER_CATEGORY = 3
+
+# Инкрементальный режим: остановка пагинации после N подряд страниц, где все объявления уже есть в БД
+INCREMENTAL_KNOWN_PAGES = 2
+
 # CSS селекторы для элементов страницы
 ITEMS_CONTAINER_SELECTOR = "div.items-items-zOkHg"  # периодически меняется, нужно проверить по префиксу - 'items-items-'
 ITEM_SELECTOR = "div.iva-item-root-XBsVL"  # тут проверить по префиксу - 'iva-item-root-'
+ITEM_ID_SELECTOR = "div[data-marker='item'][data-item-id]"  # не зависит от хешированных классов
 
 # Локатор кнопки "Следующая страница"
 NEXT_BUTTON_LOCATOR = (By.CSS_SELECTOR, '[data-marker="pagination-button/nextPage"]')
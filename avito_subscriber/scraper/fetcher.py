@@ -0,0 +1,121 @@
+import time
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
+from typing import Optional
+
+import requests
+
+from avito_subscriber.client.http.session import HttpClient
+from avito_subscriber.client.http.config import READ_TIMEOUT
+from avito_subscriber.client.selenium.pacing import Pacer, is_block_title
+from avito_subscriber.scraper.config import ITEMS_CONTAINER_SELECTOR, ITEM_ID_SELECTOR, NEXT_BUTTON_LOCATOR
+from avito_subscriber.scraper.saver import snapshot_items_container, snapshot_page_html, collect_item_ids
+
+# PageFetcher - загрузка одной страницы выдачи по URL; снимок страницы одинаков для всех реализаций:
+#   {"html": HTML контейнера, "count": число карточек, "item_ids": ID объявлений, "has_next": есть ли кнопка "Далее"}
+# -- fetch - загружает страницу; None - объявления не загрузились, ChallengePageError - нужна проверка в браузере
+# HttpFetcher - без браузера: пул соединений HttpClient (keep-alive, cookies, повторы, gzip)
+# SeleniumFetcher - через SeleniumParser (своя сессия или сессия из пула)
+
+# Ответы, после которых без браузера дальше не пройти
+CHALLENGE_STATUSES = (401, 403, 429)
+
+
+class ChallengePageError(Exception):
+    pass
+
+
+class PageFetcher(ABC):
+    name = None
+
+    def __init__(self, pacer: Pacer):
+        self.pacer = pacer
+        self.pages = 0
+
+    @abstractmethod
+    def fetch(self, url: str) -> Optional[dict]:
+        """Загружает страницу выдачи url и возвращает ее снимок."""
+
+    def get_metrics(self) -> dict:
+        return {"fetcher": self.name, "pages": self.pages}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class HttpFetcher(PageFetcher):
+    name = "http"
+
+    def __init__(self, pacer: Pacer, client: HttpClient = None):
+        super().__init__(pacer)
+        self.client = client or HttpClient(cookies_name=pacer.category)
+
+    def fetch(self, url: str) -> Optional[dict]:
+        self.pacer.throttle()
+        print(f"Загрузка без браузера: {url}")
+        started = time.monotonic()
+        try:
+            response = self.client.get(url)
+        except requests.RequestException as e:
+            print(f"Ошибка HTTP-запроса {url}: {e}")
+            self.pacer.record_readiness(None, time.monotonic() - started, False, READ_TIMEOUT)
+            return None
+        waited = time.monotonic() - started
+
+        if response.status_code in CHALLENGE_STATUSES:
+            self.pacer.record_readiness(None, waited, True, READ_TIMEOUT)
+            raise ChallengePageError(f"HTTP {response.status_code}")
+        if response.status_code != 200:
+            print(f"HTTP {response.status_code} для {url}")
+            self.pacer.record_readiness(None, waited, False, READ_TIMEOUT)
+            return None
+
+        snapshot = snapshot_page_html(response.text)
+        blocked = is_block_title(snapshot["title"])
+        ready = self.pacer.record_readiness({"items": snapshot["count"]}, waited, blocked, READ_TIMEOUT)
+        if blocked or snapshot["html"] is None:
+            raise ChallengePageError(f"страница проверки: {snapshot['title']!r}" if blocked else "в ответе нет списка объявлений")
+        self.pages += 1
+        return snapshot if ready else None
+
+    def get_metrics(self) -> dict:
+        return {**super().get_metrics(), **self.client.get_metrics()}
+
+    def close(self):
+        self.client.close()
+
+
+class SeleniumFetcher(PageFetcher):
+    name = "selenium"
+
+    def __init__(self, pacer: Pacer, session):
+        # session - контекстный менеджер, отдающий SeleniumParser: сам SeleniumParser или SessionPool.session()
+        super().__init__(pacer)
+        self._stack = ExitStack()
+        self.parser = self._stack.enter_context(session)
+
+    def fetch(self, url: str) -> Optional[dict]:
+        self.pacer.throttle()
+        self.parser.go_to_page(url)
+        if not self.pacer.wait_until_ready(self.parser.driver, ITEMS_CONTAINER_SELECTOR, ITEM_ID_SELECTOR):
+            return None
+        try:
+            snapshot = snapshot_items_container(self.parser.driver)
+        except Exception as e:
+            print(f"Ошибка при снимке HTML страницы: {e}")
+            return None
+        self.pages += 1
+        return {
+            **snapshot,
+            "item_ids": collect_item_ids(self.parser.driver),
+            "has_next": self.parser.has_element(*NEXT_BUTTON_LOCATOR),
+        }
+
+    def close(self):
+        self._stack.close()
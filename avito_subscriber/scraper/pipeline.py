@@ -0,0 +1,210 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from avito_subscriber.scraper.scraper import AvitoScraper
+from avito_subscriber.scraper.config import PIPELINE_QUEUE_SIZE, PIPELINE_PARSE_WORKERS, PIPELINE_BATCH_SIZE, PIPELINE_FLUSH_INTERVAL
+from avito_subscriber.parser.parser import parse_page_html, resolve_parser_backend, DEFAULT_PARSER_BACKEND
+from avito_subscriber.parser.loader import to_flat_item, load_items_batch
+from avito_subscriber.parser.utils import get_new_items_file_path
+from avito_subscriber.client.sql.storage import create_storage_client
+
+# ScrapePipeline - скрейпинг, парсинг и загрузка в БД одним потоком данных, без HTML и JSON на диске между стадиями
+# -- run - запускает скрейпер, воркеры парсинга и писатель БД; возвращает статистику стадий
+# -- _on_page - page_sink скрейпера: кладет страницу в ограниченную очередь (скрейпер ждет, если парсеры не успевают)
+# -- _parse_worker - разбирает HTML страниц в пуле процессов и передает объявления писателю
+# -- _write_worker - копит объявления в пачки и пишет их в БД по размеру пачки или по таймауту
+# -- _flush - upsert пачки, отбор новых объявлений в new_items_*.jsonl
+# -- get_stats - время работы, ожидание и объем каждой стадии, задержка от загрузки страницы до записи в БД
+# run_pipeline - запускает конвейер для одной категории
+
+
+class ScrapePipeline:
+
+    def __init__(self, scraper: AvitoScraper, parse_workers: int = PIPELINE_PARSE_WORKERS, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 batch_size: int = PIPELINE_BATCH_SIZE, flush_interval: float = PIPELINE_FLUSH_INTERVAL,
+                 parser_backend: str = DEFAULT_PARSER_BACKEND, parse_executor: Executor = None):
+        self.scraper = scraper
+        self.scraper.page_sink = self._on_page
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.parser_backend = resolve_parser_backend(parser_backend)
+        self.parse_executor = parse_executor # общий пул процессов нескольких конвейеров; если не задан, создается на запуск
+        self.page_queue = queue.Queue(maxsize=queue_size)
+        self.item_queue = queue.Queue(maxsize=queue_size)
+        self.new_items_path = None
+        self.errors = []
+        self.stats = {
+            "scrape": {"pages": 0, "elapsed": 0.0, "blocked": 0.0},
+            "parse": {"pages": 0, "items": 0, "busy": 0.0, "blocked": 0.0},
+            "write": {"batches": 0, "items": 0, "busy": 0.0, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "new": 0},
+            "latency": {"pages": 0, "total": 0.0, "max": 0.0},
+        }
+        self._lock = threading.Lock()
+
+    #  ---------STAGES---------------
+    def _on_page(self, page_num: int, html: Optional[str], items: Optional[List[dict]]):
+        loaded_at = time.perf_counter()
+        # Объявления, извлеченные в браузере, парсить не нужно: сразу к писателю
+        target = self.item_queue if items is not None else self.page_queue
+        target.put((page_num, loaded_at, html if items is None else items))
+        self.stats["scrape"]["pages"] += 1
+        self.stats["scrape"]["blocked"] += time.perf_counter() - loaded_at
+
+    def _parse_worker(self):
+        while True:
+            task = self.page_queue.get()
+            if task is None:
+                break
+            page_num, loaded_at, html = task
+            started = time.perf_counter()
+            try:
+                result = self.parse_executor.submit(parse_page_html, html, f"items_page_{page_num}.html", self.parser_backend).result()
+                items = result["items"]
+            except Exception as e:
+                self._record_error(f"парсинг страницы {page_num}: {e}")
+                items = []
+            parsed_at = time.perf_counter()
+            self.item_queue.put((page_num, loaded_at, items))
+            with self._lock:
+                stats = self.stats["parse"]
+                stats["pages"] += 1
+                stats["items"] += len(items)
+                stats["busy"] += parsed_at - started
+                stats["blocked"] += time.perf_counter() - parsed_at
+
+    def _write_worker(self):
+        db_client = None
+        task = ()
+        try:
+            db_client = create_storage_client(self.scraper.url_key)
+            batch, pages = [], []
+            deadline = None
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                try:
+                    task = self.item_queue.get(timeout=timeout)
+                except queue.Empty:
+                    task = ()
+                if task:
+                    page_num, loaded_at, entries = task
+                    batch.extend(item for item in map(to_flat_item, entries) if item)
+                    pages.append(loaded_at)
+                    if deadline is None:
+                        deadline = time.perf_counter() + self.flush_interval
+                # Пачка пишется, когда набралась, когда истекло flush_interval с первой страницы в ней или в конце
+                if pages and (task is None or len(batch) >= self.batch_size or time.perf_counter() >= deadline):
+                    self._flush(db_client, batch, pages)
+                    batch, pages = [], []
+                    deadline = None
+                if task is None:
+                    break
+        except Exception as e:
+            self._record_error(f"запись в БД: {e}")
+            # Писатель не должен остановить конвейер: дочитываем очередь, чтобы парсеры не заблокировались
+            while task is not None:
+                task = self.item_queue.get()
+        finally:
+            if db_client:
+                db_client.close()
+
+    def _flush(self, db_client, batch: List[dict], pages: List[float]):
+        started = time.perf_counter()
+        if self.new_items_path is None:
+            self.new_items_path = get_new_items_file_path(self.scraper.time_marker, self.scraper.url_key)
+            os.makedirs(os.path.dirname(self.new_items_path), exist_ok=True)
+        with open(self.new_items_path, "a", encoding="utf-8") as new_items_file:
+            batch_stats = load_items_batch(db_client, batch, new_items_file)
+
+        committed = time.perf_counter()
+        stats = self.stats["write"]
+        for key, value in batch_stats.items():
+            stats[key] += value
+        stats["batches"] += 1
+        stats["items"] += len(batch)
+        stats["busy"] += committed - started
+        latency = self.stats["latency"]
+        for loaded_at in pages:
+            latency["pages"] += 1
+            latency["total"] += committed - loaded_at
+            latency["max"] = max(latency["max"], committed - loaded_at)
+        print(f"[{self.scraper.url_key}] Конвейер: записано {len(batch)} объявлений с {len(pages)} страниц, новых {batch_stats['new']}")
+
+    def _record_error(self, message: str):
+        print(f"[{self.scraper.url_key}] Ошибка конвейера: {message}")
+        with self._lock:
+            self.errors.append(message)
+
+    #  ---------RUN---------------
+    def run(self) -> Dict[str, Any]:
+        owns_executor = self.parse_executor is None
+        if owns_executor:
+            self.parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+
+        writer = threading.Thread(target=self._write_worker, name=f"pipeline-writer-{self.scraper.url_key}", daemon=True)
+        parsers = [
+            threading.Thread(target=self._parse_worker, name=f"pipeline-parser-{self.scraper.url_key}-{n}", daemon=True)
+            for n in range(self.parse_workers)
+        ]
+        writer.start()
+        for parser in parsers:
+            parser.start()
+
+        started = time.perf_counter()
+        try:
+            self.scraper.run()
+        finally:
+            self.stats["scrape"]["elapsed"] = time.perf_counter() - started
+            # Очередь закрывается по цепочке: парсеры дорабатывают свои страницы, затем писатель сбрасывает остаток
+            for _ in parsers:
+                self.page_queue.put(None)
+            for parser in parsers:
+                parser.join()
+            self.item_queue.put(None)
+            writer.join()
+            if owns_executor:
+                self.parse_executor.shutdown()
+                self.parse_executor = None
+
+        stats = self.get_stats()
+        stats["elapsed"] = time.perf_counter() - started
+        self._print_stats(stats)
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        latency = self.stats["latency"]
+        return {
+            **{stage: dict(values) for stage, values in self.stats.items() if stage != "latency"},
+            "latency": {
+                "avg": latency["total"] / latency["pages"] if latency["pages"] else 0.0,
+                "max": latency["max"],
+            },
+            "new_items_file": self.new_items_path,
+            "errors": list(self.errors),
+        }
+
+    def _print_stats(self, stats: Dict[str, Any]):
+        scrape, parse, write, latency = stats["scrape"], stats["parse"], stats["write"], stats["latency"]
+        print(f"\n=== Конвейер {self.scraper.url_key}: {stats['elapsed']:.1f} сек ===")
+        print(f"Скрейпинг: страниц {scrape['pages']}, {scrape['elapsed']:.1f} сек, ожидание очереди парсинга {scrape['blocked']:.2f} сек")
+        print(f"Парсинг:   страниц {parse['pages']}, объявлений {parse['items']}, в работе {parse['busy']:.2f} сек, "
+              f"ожидание писателя {parse['blocked']:.2f} сек")
+        print(f"Запись:    пачек {write['batches']}, объявлений {write['items']} (новых в таблице {write['inserted']}, "
+              f"изменено {write['updated']}, ошибок {write['failed']}), к уведомлению {write['new']}, в работе {write['busy']:.2f} сек")
+        print(f"Задержка от загрузки страницы до записи в БД: средняя {latency['avg']:.2f} сек, максимальная {latency['max']:.2f} сек")
+
+
+def run_pipeline(url_key: str, url: str, parse_workers: int = PIPELINE_PARSE_WORKERS, batch_size: int = PIPELINE_BATCH_SIZE,
+                 flush_interval: float = PIPELINE_FLUSH_INTERVAL, archive_html: bool = False, **scraper_kwargs) -> Dict[str, Any]:
+    """
+    Скрейпит категорию и сразу загружает объявления в БД: каждая страница проходит очередь парсинга
+    и попадает в таблицу категории через несколько секунд после загрузки. archive_html - сохранять ли
+    еще и сырой HTML страниц (в data/raw или архив, по raw_storage).
+    """
+    scraper = AvitoScraper(url_key, url, archive_html=archive_html, **scraper_kwargs)
+    pipeline = ScrapePipeline(scraper, parse_workers=parse_workers, batch_size=batch_size, flush_interval=flush_interval)
+    return pipeline.run()
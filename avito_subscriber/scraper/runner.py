@@ -0,0 +1,179 @@
+import argparse
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Tuple
+
+from avito_subscriber.scraper.scraper import AvitoScraper
+from avito_subscriber.scraper.pipeline import ScrapePipeline
+from avito_subscriber.client.selenium.pool import SessionPool
+from avito_subscriber.scraper.config import (
+    SCRAPING_URLS, DEFAULT_DATA_DIR, MAX_PAGES, MAX_SESSIONS, EXTRACTION_MODE, RAW_STORAGE,
+    PIPELINE_PARSE_WORKERS, TABS_PER_SESSION, CATEGORY_TABS, FETCHER,
+)
+
+# scrape_categories - запускает скрейпинг нескольких категорий на ограниченном пуле браузерных сессий
+# _run_category - скрейпит одну категорию (в режиме конвейера - сразу с загрузкой в БД)
+# _build_report - собирает сводную статистику по всем категориям
+# _parse_category_tab - разбирает аргумент --category-tabs вида ключ=N
+
+
+def _run_category(url_key: str, url: str, scraper_kwargs: dict, parse_executor: Executor = None) -> dict:
+    # Каждая задача держит одну сессию из пула: число задач в работе = число занятых браузеров
+    started = time.perf_counter()
+    scraper = AvitoScraper(url_key, url, **scraper_kwargs)
+    pipeline = ScrapePipeline(scraper, parse_executor=parse_executor) if parse_executor else None
+    try:
+        (pipeline or scraper).run()
+    except Exception as e:
+        print(f"[{url_key}] Ошибка скрейпинга: {e}")
+    stats = scraper.get_stats()
+    if pipeline:
+        stats['pipeline'] = pipeline.get_stats()
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+
+def _build_report(results: Dict[str, dict], elapsed: float, max_sessions: int) -> dict:
+    succeeded = [key for key, stats in results.items() if stats['success']]
+    total_items = sum(stats['total_items'] for stats in results.values())
+    return {
+        'categories': results,
+        'total_items': total_items,
+        'succeeded': succeeded,
+        'failed': [key for key in results if key not in succeeded],
+        'max_sessions': max_sessions,
+        'elapsed': elapsed,
+        'items_per_sec': total_items / elapsed if elapsed else 0.0,
+        'blocked_pages': sum(stats.get('pacing', {}).get('blocked', 0) for stats in results.values()),
+    }
+
+
+def scrape_categories(
+    urls: Dict[str, str] = None,
+    max_sessions: int = MAX_SESSIONS,
+    data_dir: str = DEFAULT_DATA_DIR,
+    external_selenium_url: str = None,
+    max_pages: int = MAX_PAGES,
+    incremental: bool = False,
+    session_pool: SessionPool = None,
+    extraction: str = EXTRACTION_MODE,
+    archive_html: bool = True,
+    raw_storage: str = RAW_STORAGE,
+    pipeline: bool = False,
+    parse_workers: int = PIPELINE_PARSE_WORKERS,
+    tabs: int = TABS_PER_SESSION,
+    category_tabs: Dict[str, int] = None,
+    fetcher: str = FETCHER,
+) -> dict:
+    """
+    Скрейпит категории из urls (по умолчанию SCRAPING_URLS) параллельно, держа не более
+    max_sessions браузеров одновременно. Категория занимает одну сессию; параллельность
+    внутри категории задается вкладками (tabs).
+    Браузеры берутся из session_pool; если пул не передан, он создается на время пачки.
+    pipeline - страницы сразу парсятся общим пулом из parse_workers процессов и пишутся в БД (ScrapePipeline).
+    tabs - вкладок в каждой сессии: несколько страниц категории в работе на память одного браузера.
+    category_tabs - лимит страниц в работе для отдельных категорий {ключ: вкладок} (по умолчанию CATEGORY_TABS),
+    например 1 для категории, где Avito быстрее показывает страницу проверки; остальные получают tabs.
+    fetcher="http" - страницы грузятся без браузера; сессия из пула берется только после страницы проверки.
+    """
+    urls = urls or SCRAPING_URLS
+    if max_sessions < 1:
+        raise ValueError(f"max_sessions должно быть не меньше 1: {max_sessions}")
+    if tabs < 1:
+        raise ValueError(f"tabs должно быть не меньше 1: {tabs}")
+    category_tabs = CATEGORY_TABS if category_tabs is None else category_tabs
+    for url_key, limit in category_tabs.items():
+        if url_key not in urls and url_key not in SCRAPING_URLS:
+            raise ValueError(f"Лимит вкладок для неизвестной категории: {url_key}")
+        if limit < 1:
+            raise ValueError(f"Лимит вкладок категории {url_key} должен быть не меньше 1: {limit}")
+    tabs_by_category = {url_key: category_tabs.get(url_key, tabs) for url_key in urls}
+    owns_pool = session_pool is None
+    if owns_pool:
+        session_pool = SessionPool(size=max_sessions, remote_selenium_url=external_selenium_url,
+                                   tabs=max(tabs_by_category.values(), default=tabs))
+    scraper_kwargs = {
+        'data_dir': data_dir,
+        'external_selenium_url': external_selenium_url,
+        'max_pages': max_pages,
+        'incremental': incremental,
+        'session_pool': session_pool,
+        'extraction': extraction,
+        'archive_html': archive_html,
+        'raw_storage': raw_storage,
+        'fetcher': fetcher,
+    }
+
+    parse_executor = ProcessPoolExecutor(max_workers=parse_workers) if pipeline else None
+
+    print(f"Скрейпинг {len(urls)} категорий, сессий браузера: {max_sessions}")
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="scraper") as executor:
+            futures = {
+                url_key: executor.submit(_run_category, url_key, url,
+                                         {**scraper_kwargs, 'tabs': tabs_by_category[url_key]}, parse_executor)
+                for url_key, url in urls.items()
+            }
+            results = {url_key: future.result() for url_key, future in futures.items()}
+    finally:
+        if owns_pool:
+            session_pool.close()
+        if parse_executor:
+            parse_executor.shutdown()
+
+    report = _build_report(results, time.perf_counter() - started, max_sessions)
+    report['sessions'] = session_pool.get_stats()
+    print(
+        f"\n=== Итог: {report['total_items']} объявлений, успешно {len(report['succeeded'])}/{len(urls)} категорий "
+        f"за {report['elapsed']:.1f} сек ==="
+    )
+    return report
+
+
+def _parse_category_tab(value: str) -> Tuple[str, int]:
+    url_key, sep, limit = value.partition("=")
+    if not sep or not limit.isdigit():
+        raise argparse.ArgumentTypeError(f"ожидается ключ=N: {value}")
+    return url_key, int(limit)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Параллельный скрейпинг категорий из SCRAPING_URLS")
+    arg_parser.add_argument("--categories", nargs="*", default=None, help="Ключи SCRAPING_URLS (по умолчанию - все)")
+    arg_parser.add_argument("--sessions", type=int, default=MAX_SESSIONS, help="Максимум одновременных браузерных сессий")
+    arg_parser.add_argument("--remote", default=None, help="URL Selenium Grid, например http://localhost:4444")
+    arg_parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    arg_parser.add_argument("--incremental", action="store_true", help="Останавливать пагинацию на уже известных страницах")
+    arg_parser.add_argument("--extraction", choices=("html", "browser"), default=EXTRACTION_MODE, help="Где извлекать объявления")
+    arg_parser.add_argument("--no-archive", action="store_true", help="В режимах browser и --pipeline не сохранять HTML страниц")
+    arg_parser.add_argument("--raw-storage", choices=("files", "archive"), default=RAW_STORAGE, help="Где хранить сырые страницы")
+    arg_parser.add_argument("--pipeline", action="store_true", help="Парсить и загружать в БД каждую страницу сразу после загрузки")
+    arg_parser.add_argument("--parse-workers", type=int, default=PIPELINE_PARSE_WORKERS, help="Процессы парсинга в режиме --pipeline")
+    arg_parser.add_argument("--tabs", type=int, default=TABS_PER_SESSION, help="Вкладок в одной браузерной сессии")
+    arg_parser.add_argument("--category-tabs", nargs="*", type=_parse_category_tab, default=None, metavar="KEY=N",
+                            help="Вкладок (страниц в работе) для отдельных категорий, например macbook_pro=1")
+    arg_parser.add_argument("--fetcher", choices=("selenium", "http"), default=FETCHER, help="Загрузка страниц: браузер или HTTP без браузера")
+    args = arg_parser.parse_args()
+
+    urls = {key: SCRAPING_URLS[key] for key in args.categories} if args.categories else SCRAPING_URLS
+    report = scrape_categories(
+        urls,
+        max_sessions=args.sessions,
+        external_selenium_url=args.remote,
+        max_pages=args.max_pages,
+        incremental=args.incremental,
+        extraction=args.extraction,
+        archive_html=not args.no_archive,
+        raw_storage=args.raw_storage,
+        pipeline=args.pipeline,
+        parse_workers=args.parse_workers,
+        tabs=args.tabs,
+        category_tabs=dict(args.category_tabs) if args.category_tabs is not None else None,
+        fetcher=args.fetcher,
+    )
+    print(f"\nСтатистика: {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,208 @@
-from selenium.webdriver.common.by import By
-from .config import ITEMS_CONTAINER_SELECTOR, ITEM_SELECTOR
+import json
+from datetime import datetime
+from bs4 import BeautifulSoup
+from .config import ITEMS_CONTAINER_SELECTOR, ITEM_SELECTOR, ITEM_ID_SELECTOR, NEXT_BUTTON_LOCATOR
+from ..parser.parser import SELECTORS, resolve_parser_backend, DEFAULT_PARSER_BACKEND
 
+# snapshot_items_container - возвращает HTML контейнера с объявлениями и число карточек
+# snapshot_page_html - то же из полной страницы без браузера (ответ HTTP), плюс ID объявлений и наличие следующей страницы
 # save_items_html - сохраняет HTML контейнера с объявлениями в файл
+# archive_items_html - сохраняет HTML контейнера в сжатый архив страниц (RawPageStore)
+# collect_item_ids - возвращает ID объявлений на текущей странице одним вызовом JS
+# extract_items_in_browser - извлекает объявления в браузере одним вызовом JS (поля как у parser.extract_item_data)
+# append_items_jsonl - дописывает извлеченные объявления в JSONL результатов парсинга
 # _save_full_page_html - сохраняет полную HTML страницу
 
-def save_items_html(driver, page_num, data_dir="data"):
+CONTAINER_SNAPSHOT_SCRIPT = """
+const container = document.querySelector(arguments[0]);
+if (!container) return null;
+return {html: container.outerHTML, count: document.querySelectorAll(arguments[1]).length};
+"""
+
+# Повторяет extract_item_node на стороне браузера: те же селекторы (SELECTORS), те же поля и их порядок.
+# get_text(strip=True) из BeautifulSoup = склейка обрезанных текстовых узлов без разделителя.
+# arguments[1] - контейнер выдачи: карточки вне него (рекомендации и т.п.) в HTML-путь тоже не попадают.
+EXTRACT_ITEMS_SCRIPT = r"""
+const sel = arguments[0];
+const container = document.querySelector(arguments[1]);
+if (!container) return [];
+const text = (el) => {
+    const parts = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    let node;
+    while ((node = walker.nextNode())) {
+        const part = node.nodeValue.trim();
+        if (part) parts.push(part);
+    }
+    return parts.join('');
+};
+const one = (root, selector) => root.querySelector(selector);
+const absolute = (href) => 'https://avito.ru' + href;
+
+return Array.from(container.querySelectorAll(sel.item_container), (card) => {
+    const d = {};
+
+    const title = one(card, sel.title);
+    if (title) {
+        d.title = text(title);
+        if (title.getAttribute('href')) d.url = absolute(title.getAttribute('href'));
+    }
+    if (!('url' in d)) {
+        const link = one(card, sel.item_link);
+        if (link && link.getAttribute('href')) d.url = absolute(link.getAttribute('href'));
+    }
+
+    let seller = null;
+    for (const selector of sel.seller_link) {
+        seller = one(card, selector);
+        if (seller) break;
+    }
+    d.seller_url = seller ? absolute(seller.getAttribute('href').split('?src=search_seller_info').join('')) : null;
+
+    const price = one(card, sel.price_marker);
+    if (price) {
+        const priceText = text(price);
+        const digits = priceText.replace(/[^0-9]/g, '');
+        d.price = digits ? parseInt(digits, 10) : null;
+        d.price_text = priceText.split('\u00a0').join(' ');
+    }
+
+    const description = one(card, sel.description);
+    d.description = (description ? description.getAttribute('content') || '' : '').replace(/\s+/g, ' ');
+
+    const published = one(card, sel.published_date);
+    if (published) d.phone_state = text(published);
+
+    const state = one(card, sel.state);
+    if (state) d.state = text(state);
+
+    const badges = [];
+    for (const badge of card.querySelectorAll(sel.badge_container)) {
+        const badgeTitle = one(badge, sel.badge_title);
+        if (badgeTitle) badges.push(text(badgeTitle));
+    }
+    if (badges.length) d.badges = badges;
+
+    const reviews = one(card, sel.seller_reviews);
+    if (reviews) {
+        const reviewsText = text(reviews);
+        const match = reviewsText.match(/(\d+)/);
+        if (match) d.seller_reviews_count = parseInt(match[1], 10);
+        d.seller_reviews_text = reviewsText;
+    }
+
+    const location = one(card, sel.location);
+    if (location) d.location = text(location);
+
+    const date = one(card, sel.date);
+    if (date) d.date = text(date);
+
+    const itemId = card.getAttribute('data-item-id');
+    if (itemId) d.item_id = itemId;
+
+    d.images = Array.from(card.querySelectorAll("img[src*='/items/']"), (img) => img.getAttribute('src'))
+        .filter(Boolean)
+        .map((src) => 'https://00.img.avito.st/image/' + src.split('/').pop());
+
+    const params = {};
+    for (const param of card.querySelectorAll(sel.params_container)) {
+        const paramText = text(param);
+        const colon = paramText.indexOf(':');
+        if (colon !== -1) params[paramText.slice(0, colon).trim()] = paramText.slice(colon + 1).trim();
+    }
+    if (Object.keys(params).length) d.params = params;
+
+    const sellerName = one(card, sel.seller_name);
+    if (sellerName) d.seller_name = text(sellerName);
+
+    const sellerRating = one(card, sel.seller_rating);
+    if (sellerRating) d.seller_rating = text(sellerRating);
+
+    return d;
+});
+"""
+
+
+def snapshot_items_container(driver):
+    # HTML контейнера и число карточек за один вызов WebDriver
+    snapshot = driver.execute_script(CONTAINER_SNAPSHOT_SCRIPT, ITEMS_CONTAINER_SELECTOR, ITEM_SELECTOR)
+    if not snapshot:
+        raise ValueError(f"контейнер {ITEMS_CONTAINER_SELECTOR} не найден")
+    return snapshot
+
+
+def snapshot_page_html(html, parser_backend=DEFAULT_PARSER_BACKEND):
+    # html None - в разметке нет контейнера: список рисуется скриптами или это страница проверки
+    soup = BeautifulSoup(html, resolve_parser_backend(parser_backend))
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    container = soup.select_one(ITEMS_CONTAINER_SELECTOR)
+    if container is None:
+        return {"html": None, "count": 0, "item_ids": [], "has_next": False, "title": title}
+    return {
+        "html": str(container),
+        "count": len(container.select(ITEM_SELECTOR)),
+        "item_ids": [el.get("data-item-id") for el in container.select(ITEM_ID_SELECTOR)],
+        "has_next": soup.select_one(NEXT_BUTTON_LOCATOR[1]) is not None,
+        "title": title,
+    }
+
+
+def save_items_html(driver, page_num, data_dir="data", snapshot=None):
     try:
-        # Подготовка
-        items_container = driver.find_element(By.CSS_SELECTOR, ITEMS_CONTAINER_SELECTOR)
-        items_html = items_container.get_attribute("outerHTML")
+        # Подготовка (снимок уже мог быть сделан конвейером)
+        snapshot = snapshot or snapshot_items_container(driver)
 
         # Сохранение
         with open(f"{data_dir}/items_page_{page_num}.html", "w", encoding="utf-8") as f:
-            f.write(items_html)
+            f.write(snapshot["html"])
 
-        items = driver.find_elements(By.CSS_SELECTOR, ITEM_SELECTOR)
-        print(f"Найдено и сохранено {len(items)} объявлений на странице {page_num}")
+        print(f"Найдено и сохранено {snapshot['count']} объявлений на странице {page_num}")
         
-        return len(items)
+        return snapshot["count"]
         
     except Exception as e:
         print(f"Ошибка при сохранении HTML: {e}")
         return 0
 
 
+def archive_items_html(driver, page_num, store, run, category, snapshot=None):
+    try:
+        snapshot = snapshot or snapshot_items_container(driver)
+        content_hash = store.put_page(run, category, page_num, snapshot["html"])
+        print(f"Найдено {snapshot['count']} объявлений на странице {page_num}, страница в архиве: {content_hash[:12]}")
+        return snapshot["count"]
+    except Exception as e:
+        print(f"Ошибка при сохранении HTML в архив: {e}")
+        return 0
+
+
+def collect_item_ids(driver):
+    try:
+        return driver.execute_script(
+            "return Array.from(document.querySelectorAll(arguments[0]), el => el.getAttribute('data-item-id'));",
+            ITEM_ID_SELECTOR,
+        ) or []
+    except Exception as e:
+        print(f"Ошибка при получении ID объявлений: {e}")
+        return []
+
+
+def extract_items_in_browser(driver):
+    try:
+        records = driver.execute_script(EXTRACT_ITEMS_SCRIPT, SELECTORS, ITEMS_CONTAINER_SELECTOR) or []
+    except Exception as e:
+        print(f"Ошибка при извлечении объявлений в браузере: {e}")
+        return []
+    timestamp = datetime.now().isoformat()
+    return [{"timestamp": timestamp, "data": record} for record in records if record]
+
+
+def append_items_jsonl(items, file_path):
+    with open(file_path, "a", encoding="utf-8") as f:
+        for item_data in items:
+            f.write(json.dumps(item_data, ensure_ascii=False) + "\n")
+
+
 def _save_full_page_html(driver, page_num, data_dir):
     full_page_html = driver.page_source
     with open(
@@ -1,16 +1,36 @@
 from avito_subscriber.client.selenium.selenium import SeleniumParser
+from avito_subscriber.client.selenium.pool import SessionPool
+from avito_subscriber.client.selenium.config import DEFAULT_BLOCKING_PROFILE
+from avito_subscriber.client.selenium.pacing import Pacer
 from avito_subscriber.scraper.config import *
-from avito_subscriber.scraper.utils import generate_data_directory, create_data_directory, check_and_cleanup_directory
-from avito_subscriber.scraper.saver import save_items_html
-from selenium.webdriver.common.by import By
+from avito_subscriber.scraper.utils import generate_data_directory, create_data_directory, check_and_cleanup_directory, build_page_url
+from avito_subscriber.scraper.fetcher import PageFetcher, HttpFetcher, SeleniumFetcher, ChallengePageError
+from avito_subscriber.scraper.saver import (
+    save_items_html, archive_items_html, snapshot_items_container, collect_item_ids, extract_items_in_browser, append_items_jsonl,
+)
+from avito_subscriber.client.archive.store import RawPageStore
+from avito_subscriber.parser.utils import get_parsed_file_path
+from avito_subscriber.client.sql.storage import StorageClient, create_storage_client
 from selenium.common.exceptions import TimeoutException
 import os
 import datetime
-from typing import Literal
+from typing import Callable, Literal, Optional
 
 # AvitoScraper
 # -- _initialize_session - создает директории и настройки
 # -- _process_all_pages - обрабатывает все страницы: первую и последующие через пагинацию
+# -- _process_click_pagination - листает страницы кликом по кнопке "Далее"
+# -- _process_page_urls - загружает страницы напрямую по URL с параметром p
+# -- _process_page_tabs - то же в нескольких вкладках одного браузера, страницы обрабатываются в порядке готовности
+# -- fetch_page - загружает одну страницу по номеру с повторами
+# -- _process_fetched_pages - страницы по URL через PageFetcher (без браузера), на странице проверки - переход на браузер
+# -- _fetch_snapshot - снимок страницы через PageFetcher с повторами
+# -- _save_raw_html - сохраняет HTML контейнера в файл или в архив страниц
+# -- _save_page - сохраняет страницу: HTML контейнера и/или объявления, извлеченные в браузере
+# -- _emit_page - в режиме конвейера передает страницу в page_sink вместо файлов
+# -- _wait_for_items - ждет готовности списка объявлений через Pacer
+# -- _is_page_known - в инкрементальном режиме проверяет, все ли объявления страницы уже есть в БД
+# -- _should_stop - решает, остановить ли пагинацию после N подряд известных страниц
 # -- _save_debug_screenshot - сохраняет скриншоты для диагностики
 # -- _finalize_scraping - завершает процесс скрейпинга: проверяет результаты и очищает директории
 # -- run - запускает процесс скрейпинга
@@ -22,21 +42,57 @@ MODE: Literal['Local', 'Container'] = os.environ.get('MODE', 'Local')
 
 class AvitoScraper:
     
-    def __init__(self, url_key: str, url: str, data_dir: str = DEFAULT_DATA_DIR, headless: bool = True, external_selenium_url: str = None, max_pages: int = MAX_PAGES):
+    def __init__(self, url_key: str, url: str, data_dir: str = DEFAULT_DATA_DIR, headless: bool = True, external_selenium_url: str = None, max_pages: int = MAX_PAGES,
+                 incremental: bool = False, known_pages_limit: int = INCREMENTAL_KNOWN_PAGES, session_pool: SessionPool = None,
+                 pagination_mode: Literal['url', 'click'] = PAGINATION_MODE, blocking_profile: str = DEFAULT_BLOCKING_PROFILE,
+                 extraction: Literal['html', 'browser'] = EXTRACTION_MODE, archive_html: bool = True,
+                 raw_storage: Literal['files', 'archive'] = RAW_STORAGE, page_sink: Callable = None, tabs: int = TABS_PER_SESSION,
+                 fetcher: Literal['selenium', 'http'] = FETCHER):
         self.url_key = url_key # category name
         self.headless = headless
         self.external_selenium_url = external_selenium_url
         self.data_dir = data_dir
         self.dir_suffix = None # timestamp + category name
+        self.parsing_dir = None
         self.working_url = url
         self.total_items = 0
         self.success = False
         self.max_pages = max_pages
+        self.incremental = incremental
+        self.known_pages_limit = known_pages_limit
+        self.known_pages_streak = 0 # подряд идущие страницы без новых объявлений
+        self.stopped_early = False
+        self.pagination_mode = pagination_mode
+        self.tabs = tabs # вкладок браузера для пагинации по URL
+        self.fetcher = fetcher # "http" - страницы без браузера, браузер только после страницы проверки
+        self.fetcher_metrics = []
+        if fetcher == "http" and extraction == "browser":
+            print("Загрузка без браузера: извлечение в браузере недоступно, используется режим html")
+            extraction = "html"
+        self.blocking_profile = blocking_profile
+        self.extraction = extraction # "browser" - извлечение объявлений одним JS-вызовом, без офлайн-парсинга
+        self.archive_html = archive_html # в режиме "browser" сохранять ли еще и HTML страниц
+        self.parsed_file = None
+        self.raw_storage = raw_storage # "archive" - сжатый архив страниц с дедупликацией вместо .html в data/raw
+        self.raw_store = None
+        self.time_marker = None
+        self.page_sink = page_sink # page_sink(page_num, html, items): конвейер вместо файлов результатов (pipeline.py)
+        self.pacer = Pacer(url_key, default_timeout=WAIT_TIME) # темп запросов и выученные ожидания категории
+        self.session_pool = session_pool # если задан, браузер берется из пула и не закрывается после запуска
         self.screenshots_dir = "/opt/airflow/screenshots" if MODE == "Container" else "screenshots"
     
     def _initialize_session(self):
         self.parsing_dir, self.dir_suffix = generate_data_directory(self.data_dir, self.url_key)
-        create_data_directory(self.parsing_dir)
+        self.time_marker = self.dir_suffix.removesuffix(f"_{self.url_key}")
+        if self.raw_storage == "archive":
+            self.raw_store = RawPageStore()
+        else:
+            create_data_directory(self.parsing_dir)
+
+        if self.extraction == "browser" and self.page_sink is None:
+            # Объявления пишутся сразу в результат парсинга: loader подхватит его без шага parse_html
+            self.parsed_file = get_parsed_file_path(self.time_marker, self.url_key)
+            create_data_directory(os.path.dirname(self.parsed_file))
         
         # Создаем директорию для скриншотов
         os.makedirs(self.screenshots_dir, exist_ok=True)
@@ -55,54 +111,310 @@ class AvitoScraper:
         except Exception as e:
             print(f"Ошибка создания скриншота: {e}")
     
-    def _process_all_pages(self, parser: SeleniumParser) -> tuple[int, int]:
+    def _is_page_known(self, driver, db_client: StorageClient, item_ids: list = None) -> Optional[bool]:
+        # Проверять до сохранения страницы: в режиме конвейера writer может записать ее объявления раньше,
+        # и новая страница выглядела бы известной
+        if db_client is None:
+            return None
+        item_ids = [item_id for item_id in (collect_item_ids(driver) if item_ids is None else item_ids) if item_id]
+        if not item_ids:
+            return False
+        known_ids = db_client.get_known_item_ids(item_ids)
+        print(f"Инкрементальный режим: известно {len(known_ids)} из {len(item_ids)} объявлений")
+        return len(known_ids) == len(set(item_ids))
+
+    def _should_stop(self, known: Optional[bool]) -> bool:
+        if known is None:
+            return False
+        return self._count_known_page(known)
+
+    def _count_known_page(self, known: bool) -> bool:
+        # Серия считается по страницам в порядке номеров: вызывать для 2, 3, 4... без пропусков
+        self.known_pages_streak = self.known_pages_streak + 1 if known else 0
+        if self.known_pages_streak >= self.known_pages_limit:
+            print(f"Инкрементальный режим: {self.known_pages_streak} страниц подряд без новых объявлений. Остановка пагинации.")
+            self.stopped_early = True
+            return True
+        return False
+
+    def _save_raw_html(self, driver, page_num: int, snapshot: dict = None) -> int:
+        if self.raw_store is not None:
+            return archive_items_html(driver, page_num, self.raw_store, self.time_marker, self.url_key, snapshot=snapshot)
+        return save_items_html(driver, page_num, data_dir=self.parsing_dir, snapshot=snapshot)
+
+    def _save_snapshot(self, page_num: int, snapshot: dict) -> int:
+        # Снимок уже снят (PageFetcher): HTML контейнера в конвейер, файл или архив
+        if self.page_sink is not None:
+            self.page_sink(page_num, snapshot["html"], None)
+            if self.archive_html:
+                self._save_raw_html(None, page_num, snapshot)
+            return snapshot["count"]
+        return self._save_raw_html(None, page_num, snapshot)
+
+    def _emit_page(self, driver, page_num: int) -> int:
+        # Страница уходит в конвейер сразу после загрузки; page_sink блокируется, пока парсеры не разберут очередь
+        if self.extraction == "browser":
+            items = extract_items_in_browser(driver)
+            self.page_sink(page_num, None, items)
+            if self.archive_html:
+                self._save_raw_html(driver, page_num)
+            return len(items)
+
+        try:
+            snapshot = snapshot_items_container(driver)
+        except Exception as e:
+            print(f"Ошибка при снимке HTML страницы {page_num}: {e}")
+            return 0
+        self.page_sink(page_num, snapshot["html"], None)
+        if self.archive_html:
+            self._save_raw_html(driver, page_num, snapshot)
+        return snapshot["count"]
+
+    def _save_page(self, driver, page_num: int) -> int:
+        if self.page_sink is not None:
+            return self._emit_page(driver, page_num)
+        if self.extraction != "browser":
+            return self._save_raw_html(driver, page_num)
+
+        items = extract_items_in_browser(driver)
+        append_items_jsonl(items, self.parsed_file)
+        if self.archive_html:
+            self._save_raw_html(driver, page_num)
+        print(f"Извлечено в браузере {len(items)} объявлений на странице {page_num}")
+        return len(items)
+
+    def _wait_for_items(self, parser: SeleniumParser) -> bool:
+        return self.pacer.wait_until_ready(parser.driver, ITEMS_CONTAINER_SELECTOR, ITEM_ID_SELECTOR)
+
+    def _process_all_pages(self, parser: SeleniumParser, db_client: StorageClient = None) -> tuple[int, int]:
         print("Загрузка и обработка всех страниц...")
         
         # Загружаем первую страницу
+        self.pacer.throttle()
         parser.go_to_page(self.working_url)
         parser.refresh_page()
         
-        try:
-            parser.wait_for_element(By.CSS_SELECTOR, ITEMS_CONTAINER_SELECTOR, timeout=WAIT_TIME)
-        except TimeoutException as e:
+        if not self._wait_for_items(parser):
             print(f"Таймаут при ожидании контейнера объявлений на первой странице")
             self._save_debug_screenshot(parser, "timeout_first_page")
-            raise
+            raise TimeoutException("Контейнер объявлений не найден на первой странице")
         
-        total_items = save_items_html(parser.driver, 1, data_dir=self.parsing_dir)
+        known = self._is_page_known(parser.driver, db_client)
+        total_items = self._save_page(parser.driver, 1)
         print(f"Страница 1: найдено {total_items} объявлений")
         
         # Проверяем есть ли возможность пагинации
         pages_processed = 1
+        if self._should_stop(known):
+            return total_items, pages_processed
+
+        if self.pagination_mode == "url":
+            if not parser.has_element(*NEXT_BUTTON_LOCATOR):
+                print("--- Кнопки 'Далее' нет: единственная страница ---")
+                return total_items, pages_processed
+            items_count, url_pages = self._process_page_urls(parser, db_client)
+            if url_pages or self.max_pages < 2:
+                return total_items + items_count, pages_processed + url_pages
+            # Страница 2 по URL не загрузилась: возвращаемся к первой и листаем кликами
+            print("Переход по URL страниц не сработал. Пагинация кликами по кнопке 'Далее'.")
+            self.pacer.throttle()
+            parser.go_to_page(self.working_url)
+            if not self._wait_for_items(parser):
+                raise TimeoutException("Контейнер объявлений не найден на первой странице")
+
+        items_count, click_pages = self._process_click_pagination(parser, db_client)
+        return total_items + items_count, pages_processed + click_pages
+
+    def _process_click_pagination(self, parser: SeleniumParser, db_client: StorageClient = None) -> tuple[int, int]:
+        total_items = 0
+        pages_processed = 0
         page_num = 2
         
         # Обрабатываем остальные страницы через пагинацию
         for driver_instance in parser.handle_pagination(
             NEXT_BUTTON_LOCATOR[0],
             NEXT_BUTTON_LOCATOR[1],
-            max_pages=self.max_pages
+            max_pages=self.max_pages,
+            pacer=self.pacer,
+            ready_selectors=(ITEMS_CONTAINER_SELECTOR, ITEM_ID_SELECTOR),
         ):
-            items_count = save_items_html(
-                driver_instance,
-                page_num,
-                data_dir=self.parsing_dir,
-            )
+            known = self._is_page_known(driver_instance, db_client)
+            items_count = self._save_page(driver_instance, page_num)
             total_items += items_count
             print(f"Страница {page_num}: {items_count} объявлений")
             page_num += 1
             pages_processed += 1
             print("-" * 30)
+            if self._should_stop(known):
+                break
         
-        print(f"--- Пагинация завершена: обработано {pages_processed} страниц ---")
+        print(f"--- Пагинация завершена: обработано {pages_processed + 1} страниц ---")
         
         return total_items, pages_processed
+
+    def fetch_page(self, parser: SeleniumParser, page_num: int, retries: int = PAGE_RETRIES) -> bool:
+        """
+        Загружает страницу page_num напрямую по URL (&p=N) и ждет контейнер объявлений.
+        Не зависит от предыдущей страницы: страницы можно грузить в любом порядке и в разных сессиях.
+        """
+        page_url = build_page_url(self.working_url, page_num)
+        for attempt in range(1, retries + 2):
+            self.pacer.throttle()
+            parser.go_to_page(page_url)
+            if self._wait_for_items(parser):
+                return True
+            print(f"Страница {page_num}: объявления не загрузились (попытка {attempt} из {retries + 1})")
+        self._save_debug_screenshot(parser, f"timeout_page_{page_num}")
+        return False
+
+    def _process_page_urls(self, parser: SeleniumParser, db_client: StorageClient = None) -> tuple[int, int]:
+        if self.tabs > 1:
+            return self._process_page_tabs(parser, db_client)
+        total_items = 0
+        pages_processed = 0
+
+        for page_num in range(2, self.max_pages + 1):
+            if not self.fetch_page(parser, page_num):
+                break
+
+            known = self._is_page_known(parser.driver, db_client)
+            items_count = self._save_page(parser.driver, page_num)
+            total_items += items_count
+            pages_processed += 1
+            print(f"Страница {page_num}: {items_count} объявлений")
+            print("-" * 30)
+
+            if self._should_stop(known):
+                break
+            if not parser.has_element(*NEXT_BUTTON_LOCATOR):
+                print("Кнопки 'Далее' нет: достигнута последняя страница.")
+                break
+
+        print(f"--- Пагинация по URL завершена: обработано {pages_processed + 1} страниц ---")
+
+        return total_items, pages_processed
+
+    def _process_page_tabs(self, parser: SeleniumParser, db_client: StorageClient = None) -> tuple[int, int]:
+        total_items = 0
+        pages_processed = 0
+        last_page = self.max_pages # сдвигается на первую страницу без кнопки "Далее" или не загрузившуюся
+
+        def pages():
+            # Номера выдаются лениво: после обнаружения последней страницы новые вкладки не открываются
+            page_num = 2
+            while page_num <= last_page:
+                yield page_num, build_page_url(self.working_url, page_num)
+                page_num += 1
+
+        ready_selectors = (ITEMS_CONTAINER_SELECTOR, ITEM_ID_SELECTOR)
+        handled = set()
+        # Вкладки отдают страницы в порядке готовности; серия известных страниц (known_pages_limit)
+        # применяется в порядке номеров, когда все предыдущие страницы уже проверены
+        known_pages = {}
+        next_counted = 2
+        for page_num, ready in parser.load_pages(pages(), ready_selectors, self.pacer, self.tabs):
+            handled.add(page_num)
+            # Не загрузившуюся во вкладке страницу повторяем обычным переходом, пока остальные вкладки грузятся
+            if page_num <= last_page and not ready and not self.fetch_page(parser, page_num, retries=PAGE_RETRIES - 1):
+                last_page = page_num - 1
+            elif page_num <= last_page:
+                known = self._is_page_known(parser.driver, db_client)
+                items_count = self._save_page(parser.driver, page_num)
+                total_items += items_count
+                pages_processed += 1
+                print(f"Страница {page_num}: {items_count} объявлений")
+                print("-" * 30)
+
+                if known is not None:
+                    known_pages[page_num] = known
+                    stop = False
+                    while next_counted in known_pages and not stop:
+                        stop = self._count_known_page(known_pages.pop(next_counted))
+                        next_counted += 1
+                    if stop:
+                        break
+                if not parser.has_element(*NEXT_BUTTON_LOCATOR):
+                    print(f"Кнопки 'Далее' нет: страница {page_num} последняя.")
+                    last_page = page_num
+
+            # Все страницы до последней обработаны: вкладки со страницами за ней не ждем до таймаута
+            if handled.issuperset(range(2, last_page + 1)):
+                break
+
+        print(f"--- Пагинация по URL в {self.tabs} вкладках завершена: обработано {pages_processed + 1} страниц ---")
+
+        return total_items, pages_processed
     
+    def _create_browser_fetcher(self) -> PageFetcher:
+        if self.session_pool:
+            session = self.session_pool.session()
+        else:
+            session = SeleniumParser(headless=self.headless, remote_selenium_url=self.external_selenium_url,
+                                     blocking_profile=self.blocking_profile)
+        return SeleniumFetcher(self.pacer, session)
+
+    def _fetch_snapshot(self, fetcher: PageFetcher, page_num: int, retries: int = PAGE_RETRIES):
+        page_url = build_page_url(self.working_url, page_num)
+        for attempt in range(1, retries + 2):
+            snapshot = fetcher.fetch(page_url)
+            if snapshot is not None:
+                return snapshot
+            print(f"Страница {page_num}: объявления не загрузились (попытка {attempt} из {retries + 1})")
+        return None
+
+    def _process_fetched_pages(self, db_client: StorageClient = None) -> tuple[int, int]:
+        print(f"Загрузка страниц без браузера (fetcher={self.fetcher})...")
+        total_items = 0
+        pages_processed = 0
+        fetcher = HttpFetcher(self.pacer)
+        try:
+            for page_num in range(1, self.max_pages + 1):
+                try:
+                    snapshot = self._fetch_snapshot(fetcher, page_num)
+                except ChallengePageError as e:
+                    # Дальше той же категории - браузером: cookies и проверку проходит он
+                    print(f"Страница {page_num}: {e}. Переход на загрузку через браузер.")
+                    self.fetcher_metrics.append(fetcher.get_metrics())
+                    fetcher.close()
+                    fetcher = self._create_browser_fetcher()
+                    snapshot = self._fetch_snapshot(fetcher, page_num)
+
+                if snapshot is None:
+                    if page_num == 1:
+                        raise TimeoutException("Контейнер объявлений не найден на первой странице")
+                    break
+
+                known = self._is_page_known(None, db_client, snapshot["item_ids"])
+                items_count = self._save_snapshot(page_num, snapshot)
+                total_items += items_count
+                pages_processed += 1
+                print(f"Страница {page_num}: {items_count} объявлений ({fetcher.name})")
+
+                if self._should_stop(known):
+                    break
+                if not snapshot["has_next"]:
+                    print("Кнопки 'Далее' нет: достигнута последняя страница.")
+                    break
+        finally:
+            self.fetcher_metrics.append(fetcher.get_metrics())
+            fetcher.close()
+
+        print(f"--- Загрузка по URL завершена: обработано {pages_processed} страниц ---")
+        return total_items, pages_processed
+
     def _finalize_scraping(self):
         print(f"\n=== Финализация скрейпинга ===")
         print(f"Успешность: {self.success}")
         print(f"Всего объявлений: {self.total_items}")
         
-        if not check_and_cleanup_directory(self.parsing_dir):
+        if self.raw_store is not None:
+            self.raw_store.close()
+            self.raw_store = None
+            has_raw = self.total_items > 0
+        else:
+            has_raw = check_and_cleanup_directory(self.parsing_dir)
+        has_parsed = (self.extraction == "browser" or self.page_sink is not None) and self.total_items > 0
+        if not (has_raw or has_parsed):
             print("Директория была удалена из-за недостатка данных")
             return None
         
@@ -113,11 +425,24 @@ class AvitoScraper:
         try:
             self._initialize_session()
             
-            with SeleniumParser(headless=self.headless, remote_selenium_url=self.external_selenium_url) as parser:
-                self.total_items, pages_processed = self._process_all_pages(parser)
-                print(f"\nИтого: {self.total_items} объявлений на {pages_processed} страницах")
-                
-                self.success = True
+            db_client = create_storage_client(self.url_key) if self.incremental else None
+            try:
+                if self.fetcher == "http":
+                    self.total_items, pages_processed = self._process_fetched_pages(db_client)
+                else:
+                    if self.session_pool:
+                        session = self.session_pool.session()
+                    else:
+                        session = SeleniumParser(headless=self.headless, remote_selenium_url=self.external_selenium_url,
+                                                 blocking_profile=self.blocking_profile, tabs=self.tabs)
+                    with session as parser:
+                        self.total_items, pages_processed = self._process_all_pages(parser, db_client)
+            finally:
+                if db_client:
+                    db_client.close()
+            print(f"\nИтого: {self.total_items} объявлений на {pages_processed} страницах")
+            
+            self.success = True
                 
         except TimeoutException as e:
             print(f"Таймаут: Не удалось загрузить страницу или найти контейнер с объявлениями")
@@ -127,6 +452,7 @@ class AvitoScraper:
             raise
         finally:
             # Финализация и очистка
+            self.pacer.save()
             result = self._finalize_scraping()
             print("\nРабота скрейпера завершена.")
             return result
@@ -138,17 +464,28 @@ class AvitoScraper:
             'success': self.success,
             'data_dir': self.parsing_dir,
             'dir_suffix': self.dir_suffix,
-            'max_pages': self.max_pages
+            'max_pages': self.max_pages,
+            'incremental': self.incremental,
+            'stopped_early': self.stopped_early,
+            'pagination_mode': self.pagination_mode,
+            'tabs': self.tabs,
+            'fetcher': self.fetcher,
+            'fetchers': self.fetcher_metrics,
+            'pacing': self.pacer.get_metrics(),
+            'extraction': self.extraction,
+            'parsed_file': self.parsed_file,
+            'raw_storage': self.raw_storage,
         }
 
 
-def scrape():
+def scrape(incremental: bool = False):
     url = "https://www.avito.ru/moskva_i_mo/noutbuki/apple-ASgBAgICAUSo5A302WY?cd=1&f=ASgBAQICAUSo5A302WYBQJ7kDcTWzK0QpprGEJjNrRCOza0QkqPEEbKjxBGc2O8R1NjvEbDY7xHCmZYVqOOXFbyxnhU&q=macbook+pro&user=1"
     scraper = AvitoScraper(
         "macbook_pro", 
         url, 
         "data/raw",
-        max_pages=10
+        max_pages=10,
+        incremental=incremental,
     )
     result = scraper.run()
     
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('.')
+
+import asyncio
+from urllib.parse import quote
+
+import pytest
+
+from avito_subscriber.client.cdp.browser import CDPBrowser, find_chrome_binary, websockets
+from avito_subscriber.client.cdp.config import CDP_ENDPOINT
+from avito_subscriber.parser.bench_parser import CARD_TEMPLATE, build_synthetic_page, run_node
+from avito_subscriber.parser.parser import SELECTORS
+from avito_subscriber.scraper.config import ITEMS_CONTAINER_SELECTOR
+from avito_subscriber.scraper.saver import EXTRACT_ITEMS_SCRIPT
+
+# Карточка вне контейнера выдачи (блок рекомендаций): ни HTML-путь, ни скрипт ее не берут
+RECOMMENDATION = CARD_TEMPLATE.format(item_id=4999999999, n=1, price=1000, price_text="1\xa0000", reviews=3)
+
+
+def build_page(page_num: int) -> str:
+    return (
+        "<html><head><meta charset='utf-8'><title>Купить MacBook Pro</title></head><body>"
+        f"{build_synthetic_page(page_num)}<div class='recommendations'>{RECOMMENDATION}</div></body></html>"
+    )
+
+
+async def extract_in_browser(html_content: str) -> list:
+    async with CDPBrowser(endpoint=CDP_ENDPOINT) as browser:
+        tab = await browser.new_tab()
+        await tab.goto("data:text/html;charset=utf-8," + quote(html_content))
+        return await tab.execute_script(EXTRACT_ITEMS_SCRIPT, SELECTORS, ITEMS_CONTAINER_SELECTOR)
+
+
+def test_extract_items_script_matches_parser():
+    """EXTRACT_ITEMS_SCRIPT в браузере возвращает те же записи, что extract_item_node для контейнера выдачи"""
+    if websockets is None:
+        pytest.skip("websockets не установлен")
+    if not CDP_ENDPOINT and not find_chrome_binary():
+        pytest.skip("Chrome/Chromium не найден: задайте AVITO_CHROME_BINARY или AVITO_CDP_ENDPOINT")
+
+    records = asyncio.run(extract_in_browser(build_page(1)))
+    expected = [item["data"] for item in run_node([build_synthetic_page(1)])]
+    assert len(records) == 50
+    assert records == expected
+    print("Извлечение в браузере совпадает с парсером")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('.')
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from avito_subscriber.client.http.session import HttpClient
+from avito_subscriber.client.sql.SQLight import DatabaseClient
+from avito_subscriber.client.selenium.pacing import Pacer
+from avito_subscriber.parser.bench_parser import build_synthetic_page
+from avito_subscriber.parser.loader import to_flat_item
+from avito_subscriber.parser.parser import parse_page_html
+from avito_subscriber.scraper.fetcher import PageFetcher, HttpFetcher, ChallengePageError
+from avito_subscriber.scraper.saver import snapshot_page_html
+from avito_subscriber.scraper.scraper import AvitoScraper
+
+LAST_PAGE = 3
+NEXT_BUTTON = '<a data-marker="pagination-button/nextPage" href="#">Далее</a>'
+
+
+def build_fixture_page(page_num: int, title: str = "Купить MacBook Pro") -> str:
+    next_button = NEXT_BUTTON if page_num < LAST_PAGE else ""
+    return f"<html><head><title>{title}</title></head><body>{build_synthetic_page(page_num)}{next_button}</body></html>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # Страницы выдачи как у Avito: /search?p=N; challenge_from=N - с N-й страницы страница проверки,
+    # fail=K - первые K запросов отвечают 503, limited=1 - ответ 429 с Retry-After
+    protocol_version = "HTTP/1.1"
+    state = {"requests": 0, "connections": set(), "cookies": []}
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        page_num = int(query.get("p", ["1"])[0])
+        state = self.state
+        state["requests"] += 1
+        state["connections"].add(self.client_address)
+        state["cookies"].append(self.headers.get("Cookie"))
+
+        if state["requests"] <= int(query.get("fail", ["0"])[0]):
+            return self._send(503, b"")
+        if query.get("limited"):
+            return self._send(429, b"", {"Retry-After": "5"})
+        if page_num >= int(query.get("challenge_from", ["999"])[0]):
+            html = "<html><head><title>Доступ ограничен: проблема с IP</title></head><body></body></html>"
+        else:
+            html = build_fixture_page(page_num)
+        body = html.encode("utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            return self._send(200, gzip.compress(body), {"Content-Encoding": "gzip"})
+        self._send(200, body)
+
+    def _send(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "u=fixture-session; Path=/")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    FixtureHandler.state = {"requests": 0, "connections": set(), "cookies": []}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/search", FixtureHandler.state
+    server.shutdown()
+    server.server_close()
+
+
+def make_pacer(tmp_path, category: str = "fetcher_test") -> Pacer:
+    return Pacer(category, settings={"requests_per_minute": 60000}, state_dir=str(tmp_path / "pacing"))
+
+
+def test_http_fetcher(fixture_server, tmp_path):
+    """HttpFetcher: одно keep-alive соединение, cookies, gzip, повтор на 503, страница проверки"""
+    base_url, state = fixture_server
+    client = HttpClient(cookies_name=None, backoff_factor=0)
+    with HttpFetcher(make_pacer(tmp_path), client) as fetcher:
+        first = fetcher.fetch(f"{base_url}?fail=1")
+        last = fetcher.fetch(f"{base_url}?p={LAST_PAGE}")
+        metrics = fetcher.get_metrics()
+
+        assert first["count"] == 50 and first["has_next"]
+        assert first["item_ids"][0] == "4000001000"
+        assert last["count"] == 50 and not last["has_next"]
+        assert metrics["retries"] == 1 and metrics["requests"] == 2
+        assert metrics["wire_bytes"] < metrics["bytes"] / 5
+        assert len(state["connections"]) == 1
+        assert state["cookies"][0] is None and state["cookies"][-1] == "u=fixture-session"
+
+        with pytest.raises(ChallengePageError):
+            fetcher.fetch(f"{base_url}?challenge_from=1")
+
+        # 429 не повторяется: сразу переход в браузер, без ожидания Retry-After
+        requests_before = state["requests"]
+        with pytest.raises(ChallengePageError):
+            fetcher.fetch(f"{base_url}?limited=1")
+        assert state["requests"] == requests_before + 1
+    print("HttpFetcher работает")
+
+
+class FixtureBrowserFetcher(PageFetcher):
+    # Браузер после страницы проверки: отдает те же страницы без проверки
+    name = "selenium"
+
+    def fetch(self, url: str):
+        self.pages += 1
+        page_num = int(parse_qs(urlsplit(url).query).get("p", ["1"])[0])
+        return snapshot_page_html(build_fixture_page(page_num))
+
+
+def test_scraper_http_fallback(fixture_server, tmp_path, monkeypatch):
+    """AvitoScraper(fetcher="http"): первая страница без браузера, после страницы проверки - браузер"""
+    base_url, _ = fixture_server
+    monkeypatch.chdir(tmp_path)
+    scraper = AvitoScraper("fetcher_test", f"{base_url}?q=macbook&challenge_from=2", data_dir=str(tmp_path / "raw"),
+                           fetcher="http")
+    scraper.pacer = make_pacer(tmp_path)
+    monkeypatch.setattr(scraper, "_create_browser_fetcher", lambda: FixtureBrowserFetcher(scraper.pacer))
+
+    assert scraper.run() is not None
+    stats = scraper.get_stats()
+    assert stats["total_items"] == 50 * LAST_PAGE
+    assert [(m["fetcher"], m["pages"]) for m in stats["fetchers"]] == [("http", 1), ("selenium", 2)]
+    assert sorted(p.name for p in (tmp_path / "raw" / scraper.dir_suffix).iterdir()) == [
+        f"items_page_{n}.html" for n in range(1, LAST_PAGE + 1)
+    ]
+    print("Переход на браузер работает")
+
+
+def test_incremental_pipeline_checks_before_write(fixture_server, tmp_path, monkeypatch):
+    """Конвейер с инкрементальным режимом: страница, записанная page_sink сразу, не считается известной"""
+    base_url, _ = fixture_server
+    monkeypatch.chdir(tmp_path)
+
+    with DatabaseClient(db_path=str(tmp_path / "avito.db"), name_marker="fetcher_test") as db:
+        def write_page(page_num, html, items):
+            # Писатель без очереди: объявления страницы в БД раньше, чем скрейпер вернется к пагинации
+            entries = parse_page_html(html, f"items_page_{page_num}.html")["items"]
+            db.upsert_items([to_flat_item(entry) for entry in entries])
+
+        def process_pages():
+            scraper = AvitoScraper("fetcher_test", f"{base_url}?q=macbook", data_dir=str(tmp_path / "raw"), fetcher="http",
+                                   incremental=True, known_pages_limit=1, page_sink=write_page, archive_html=False)
+            scraper.pacer = make_pacer(tmp_path)
+            return scraper._process_fetched_pages(db), scraper.stopped_early
+
+        assert process_pages() == ((50 * LAST_PAGE, LAST_PAGE), False)
+        # Повторный запуск: первая страница уже в БД, пагинация останавливается
+        assert process_pages() == ((50, 1), True)
+    print("Инкрементальная остановка в конвейере работает")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
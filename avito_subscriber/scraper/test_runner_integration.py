@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import sys
+sys.path.append('.')
+
+import argparse
+
+import pytest
+
+from avito_subscriber.scraper import runner
+
+URLS = {"macbook_pro": "https://avito.ru/macbook", "kindle": "https://avito.ru/kindle", "mac_mini": "https://avito.ru/mac_mini"}
+
+
+class FakeScraper:
+    # Запоминает, сколько вкладок (страниц в работе) получила каждая категория
+    tabs_by_category = {}
+
+    def __init__(self, url_key, url, tabs=1, **kwargs):
+        self.url_key = url_key
+        self.tabs = tabs
+        self.tabs_by_category[url_key] = tabs
+
+    def run(self):
+        pass
+
+    def get_stats(self):
+        return {'url_key': self.url_key, 'total_items': 0, 'success': True, 'tabs': self.tabs}
+
+
+class FakePool:
+    def get_stats(self):
+        return {}
+
+
+@pytest.fixture
+def fake_scraper(monkeypatch):
+    FakeScraper.tabs_by_category = {}
+    monkeypatch.setattr(runner, "AvitoScraper", FakeScraper)
+    return FakeScraper
+
+
+def test_category_tabs(fake_scraper):
+    """category_tabs ограничивает страницы в работе отдельных категорий, остальные получают tabs"""
+    report = runner.scrape_categories(URLS, max_sessions=3, session_pool=FakePool(), tabs=3, category_tabs={"kindle": 1})
+    assert fake_scraper.tabs_by_category == {"macbook_pro": 3, "kindle": 1, "mac_mini": 3}
+    assert report['categories']["kindle"]['tabs'] == 1
+
+    with pytest.raises(ValueError):
+        runner.scrape_categories(URLS, session_pool=FakePool(), category_tabs={"kindle": 0})
+    with pytest.raises(ValueError):
+        runner.scrape_categories(URLS, session_pool=FakePool(), category_tabs={"kindel": 1})
+    print("Лимит вкладок по категориям работает")
+
+
+def test_category_tabs_argument():
+    """--category-tabs разбирает пары ключ=N"""
+    assert runner._parse_category_tab("kindle=2") == ("kindle", 2)
+    for value in ("kindle", "kindle=", "kindle=-1"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            runner._parse_category_tab(value)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -2,10 +2,12 @@ import os
 import shutil
 import glob
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 # generate_data_directory - генерирует уникальное имя директории для хранения данных
 # create_data_directory - создает директорию для хранения данных
 # check_and_cleanup_directory - проверяет директорию и удаляет ее если она пуста
+# build_page_url - возвращает URL страницы поиска с номером страницы (параметр p)
 
 def generate_data_directory(base_dir, url_key):
     timestamp_marker = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -36,4 +38,12 @@ def check_and_cleanup_directory(data_dir):
         
     except Exception as e:
         print(f"Ошибка при проверке директории {data_dir}: {e}")
-        return False 
\ No newline at end of file
+        return False 
+
+
+def build_page_url(url, page_num):
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'p']
+    if page_num > 1:
+        query.append(('p', str(page_num)))
+    return urlunsplit(parts._replace(query=urlencode(query, safe='~')))